@@ -4,6 +4,7 @@ Abstraction layer to unify the handling of every actuator in the system
 '''
 from machine import Pin
 from sensors import Sensor
+import time
 
 class Actuator:
     '''
@@ -33,6 +34,10 @@ class Actuators:
     Class to control All Actuators and initialize them
     '''
     JAVASCRIPT_TO_PYTHON = {'on': 1, 'off': 0}
+    STATES = ('on', 'off', 1, 0)  # states update() accepts
+    # javascript ids of the actuators, the index is the bit in the dirty mask and the bitmap
+    IDS = ('psuControl', 'blueLight', 'uvLight', 'buzzer', 'humidifier')
+    MAX_TRANSITIONS = 32  # length of the kept transition history
     def __init__(self, main_psu_pin: int, blue_light_pin: int, uv_light_pin: int, buzzer_pin: int, humidifier_pin: int):
         '''
         Constructor for actuator objects
@@ -48,6 +53,21 @@ class Actuators:
 
         self.humidifier: Actuator = Actuator(Pin(humidifier_pin, Pin.OUT))
 
+        # javascript ids and their actuators, in the order of IDS
+        self.ids = self.IDS
+        self.actuators = (self.main_psu, self.blue_light, self.uv_light, self.buzzer, self.humidifier)
+        self._index = {actuator_id: i for i, actuator_id in enumerate(self.ids)}
+
+        # cached desired state, only outputs flagged in the dirty mask are written on apply
+        # everything starts dirty so the first apply sets every output
+        self.desired = bytearray(len(self.ids))
+        self.dirty = (1 << len(self.ids)) - 1
+        self.transition_ticks = [0] * len(self.ids)
+
+        # (ticks_ms, id, value) of the latest transitions, oldest first
+        self.transitions = []
+        self.on_transition: callable = None  # called with (ticks_ms, id, value) on every transition
+
     def buzzer_beep(self, sound_beep: int):
         '''
         :param sound_beep: the duration of the beep in ms
@@ -86,11 +106,70 @@ class Actuators:
         '''
         sets all the actuator values according to the global actuator_dict received from server
         '''
+        self.update(actuator_dict)
+
+    @property
+    def bitmap(self) -> int:
+        '''
+        desired states as one int, bit i is the actuator of ids[i]
+        '''
+        bitmap = 0
+        for i in range(len(self.ids)):
+            bitmap |= self.desired[i] << i
+        return bitmap
+
+    def set(self, actuator_id: str, state):
+        '''
+        sets the desired state of one actuator without writing it
+        :param state: 'on'/'off' like the javascript sends it, or 1/0
+        '''
+        i = self._index[actuator_id]
+        value = self.JAVASCRIPT_TO_PYTHON[state] if type(state) is str else state
+        if self.desired[i] != value:
+            self.desired[i] = value
+            self.dirty |= 1 << i
+
+    def update(self, changes: dict) -> int:
+        '''
+        sets several desired states then applies them as one batch
+        ids that aren't actuators (like 'autoManualSwitch') and states that aren't in STATES are ignored
+        returns the mask of the outputs that were written
+        '''
+        for actuator_id, state in changes.items():
+            if actuator_id in self._index and state in self.STATES:
+                self.set(actuator_id, state)
+
+        return self.apply()
+
+    def apply(self) -> int:
+        '''
+        writes only the outputs whose desired state changed since the last apply
+        returns the mask of the outputs that were written
+        '''
+        applied = self.dirty
+        if not applied:
+            return 0
+
+        now = time.ticks_ms()
+        for i in range(len(self.ids)):
+            if applied & (1 << i):
+                value = self.desired[i]
+                self.actuators[i].control(value)
+                self.transition_ticks[i] = now
+                self.record_transition(now, self.ids[i], value)
+
+        self.dirty = 0
+        return applied
+
+    def record_transition(self, ticks: int, actuator_id: str, value: int):
+        '''
+        keeps the transition in the bounded history and passes it to on_transition
+        '''
+        if len(self.transitions) >= self.MAX_TRANSITIONS:
+            self.transitions.pop(0)
+        self.transitions.append((ticks, actuator_id, value))
 
-        self.main_psu.control(self.JAVASCRIPT_TO_PYTHON[actuator_dict['psuControl']])
-        self.blue_light.control(self.JAVASCRIPT_TO_PYTHON[actuator_dict['blueLight']])
-        self.uv_light.control(self.JAVASCRIPT_TO_PYTHON[actuator_dict['uvLight']])
-        self.buzzer.control(self.JAVASCRIPT_TO_PYTHON[actuator_dict['buzzer']])
-        self.humidifier.control(self.JAVASCRIPT_TO_PYTHON[actuator_dict['humidifier']])
+        if self.on_transition is not None:
+            self.on_transition(ticks, actuator_id, value)
 
 
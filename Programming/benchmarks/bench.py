@@ -0,0 +1,88 @@
+'''
+Benchmark Helpers
+Run on the board and on the host
+    -   `ticks_us` is the wall clock, perf_counter on CPython so the simulation's virtual time isn't measured
+    -   `Stats` summarizes samples without the statistics module
+'''
+import time
+
+try:
+    from time import perf_counter_ns
+
+    def ticks_us() -> int:
+        return perf_counter_ns() // 1000
+
+    def ticks_diff(end: int, start: int) -> int:
+        return end - start
+except ImportError:
+    from time import ticks_us, ticks_diff
+
+class Stats:
+    '''
+    Samples of one metric in us
+    '''
+    def __init__(self):
+        self.samples = []
+
+    def add(self, value: int):
+        self.samples.append(value)
+
+    def summary(self) -> dict:
+        '''
+        n, min, mean, p50, p95, max and stdev of the samples
+        '''
+        samples = sorted(self.samples)
+        n = len(samples)
+        if not n:
+            return {'n': 0}
+        mean = sum(samples) / n
+        variance = sum((value - mean) ** 2 for value in samples) / n
+        return {
+            'n': n,
+            'min': samples[0],
+            'mean': round(mean, 1),
+            'p50': samples[n // 2],
+            'p95': samples[min(n * 95 // 100, n - 1)],
+            'max': samples[-1],
+            'stdev': round(variance ** 0.5, 1),
+        }
+
+def time_calls(func: callable, n: int, setup: callable=None) -> dict:
+    '''
+    calls func n times, returns the Stats summary of the call durations
+    :param setup: called before every call, outside the measurement
+    '''
+    stats = Stats()
+    for _ in range(n):
+        if setup is not None:
+            setup()
+        start = ticks_us()
+        func()
+        stats.add(ticks_diff(ticks_us(), start))
+    return stats.summary()
+
+class BenchClient:
+    '''
+    Socket stand-in for the request handlers, recv returns the given chunks, one per call, then nothing
+    '''
+    def __init__(self, chunks: tuple):
+        self.chunks = list(chunks)
+        self.sent = 0
+
+    def recv(self, bufsize: int) -> bytes:
+        if not self.chunks:
+            return b''
+        chunk = self.chunks[0]
+        if bufsize < len(chunk):
+            self.chunks[0] = chunk[bufsize:]
+            return chunk[:bufsize]
+        return self.chunks.pop(0)
+
+    def send(self, data) -> int:
+        self.sent += len(data)
+        return len(data)
+
+    sendall = send
+
+    def close(self):
+        pass
@@ -0,0 +1,118 @@
+'''
+Connections opened per minute by polling dashboards, with and without keep-alive
+
+    python benchmarks/keepalive.py --dashboards 4 --seconds 10
+
+Every dashboard polls /get_values like index.html does without EventSource, through
+http.client which reuses the connection while the server keeps it alive.
+The server runs on the simulated board, the dashboards in real time.
+The results go to --output, in the temp directory by default.
+'''
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROGRAMMING = os.path.dirname(HERE)
+DEFAULT_OUTPUT = os.path.join(tempfile.gettempdir(), 'keepalive_results.json')
+
+class CountingConnection(http.client.HTTPConnection):
+    '''
+    counts the TCP connections it opens
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened = 0
+
+    def connect(self):
+        self.opened += 1
+        super().connect()
+
+def dashboard(port: int, period: float, stop: threading.Event, totals: dict, lock: threading.Lock):
+    connection = CountingConnection('127.0.0.1', port, timeout=5)
+    requests = 0
+    errors = 0
+    latencies = []
+    next_poll = time.perf_counter()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            connection.request('GET', '/get_values')
+            response = connection.getresponse()
+            json.loads(response.read())
+            requests += 1
+            latencies.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException, ValueError):
+            errors += 1
+            connection.close()
+        next_poll += period
+        stop.wait(max(next_poll - time.perf_counter(), 0))
+    connection.close()
+    with lock:
+        totals['connections'] += connection.opened
+        totals['requests'] += requests
+        totals['errors'] += errors
+        totals['latencies'] += latencies
+
+def measure(server, port: int, dashboards: int, period: float, seconds: float) -> dict:
+    totals = {'connections': 0, 'requests': 0, 'errors': 0, 'latencies': []}
+    lock = threading.Lock()
+    stop = threading.Event()
+    threads = [threading.Thread(target=dashboard, args=(port, period, stop, totals, lock)) for _ in range(dashboards)]
+    for thread in threads:
+        thread.start()
+    stop.wait(seconds)  # time.sleep is the simulation's virtual sleep
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(totals.pop('latencies'))
+    scale = 60 / seconds
+    return {
+        'connections_per_min': round(totals['connections'] * scale, 1),
+        'requests_per_min': round(totals['requests'] * scale, 1),
+        'errors': totals['errors'],
+        'latency_p50_ms': round(1000 * latencies[len(latencies) // 2], 2) if latencies else None,
+        'latency_p95_ms': round(1000 * latencies[len(latencies) * 95 // 100], 2) if latencies else None,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='connections opened by polling dashboards')
+    parser.add_argument('--dashboards', type=int, default=4)
+    parser.add_argument('--period', type=float, default=1.0, help='seconds between polls of one dashboard')
+    parser.add_argument('--seconds', type=float, default=10, help='wall seconds per measurement')
+    parser.add_argument('--port', type=int, default=8181)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='results file')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, PROGRAMMING)
+    import sim
+    from sim.run import prepare_workdir
+    sim.install()
+    output = os.path.abspath(args.output)
+    os.chdir(prepare_workdir(PROGRAMMING))
+
+    import asyncio
+    from server2 import Server
+    server = Server(use_asyncio=True)
+    threading.Thread(target=asyncio.run, args=(server.run('127.0.0.1', args.port),), daemon=True).start()
+    threading.Event().wait(0.5)
+
+    results = {'dashboards': args.dashboards, 'period': args.period, 'max_keepalive': server.MAX_KEEPALIVE}
+    results['keep_alive'] = measure(server, args.port, args.dashboards, args.period, args.seconds)
+    server.MAX_KEEPALIVE = 0  # every response closes, like before keep-alive
+    results['close'] = measure(server, args.port, args.dashboards, args.period, args.seconds)
+
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=1)
+    for mode in ('keep_alive', 'close'):
+        print(f'{mode:10}', results[mode])
+    print('results written to', output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+'''
+Runs the benchmark suite and checks the results against the regression thresholds
+
+    python benchmarks/run.py                          # simulated board, from the Programming directory
+    python benchmarks/run.py --serial /dev/ttyACM0    # board with the firmware already on its flash
+
+Writes {"target", "platform", "results", "flat", "failures"} to --output, in the temp directory by default,
+exits with 1 if a threshold of the target is exceeded
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROGRAMMING = os.path.dirname(HERE)
+DEFAULT_THRESHOLDS = os.path.join(HERE, 'thresholds.json')
+DEFAULT_OUTPUT = os.path.join(tempfile.gettempdir(), 'bench_results.json')
+SUITE_FILES = ('bench.py', 'suite.py')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark the incubator firmware')
+    parser.add_argument('--serial', help='serial port of a board to run on through mpremote, the simulation otherwise')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='results file')
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS, help='regression thresholds file')
+    return parser.parse_args(argv)
+
+def run_simulated() -> dict:
+    sys.path[:0] = [PROGRAMMING, HERE]
+    import sim
+    from sim.run import prepare_workdir
+    sim.install()
+    os.chdir(prepare_workdir(PROGRAMMING))
+
+    import suite
+    return {'target': 'sim', 'platform': sys.platform, 'results': suite.run_all()}
+
+def run_serial(port: str) -> dict:
+    '''
+    copies the suite to the board, runs it and parses its RESULTS_PREFIX line
+    '''
+    command = ['mpremote', 'connect', port]
+    for name in SUITE_FILES:
+        command += ['cp', os.path.join(HERE, name), ':' + name, '+']
+    command += ['exec', 'import suite; suite.run()']
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+
+    sys.path.insert(0, HERE)
+    from suite import RESULTS_PREFIX  # only the constant, doesn't need the firmware modules
+    for line in output.splitlines():
+        if line.startswith(RESULTS_PREFIX):
+            report = json.loads(line[len(RESULTS_PREFIX):])
+            report['target'] = 'board'
+            return report
+    raise RuntimeError('no results in the board output:\n' + output)
+
+def flatten(results: dict) -> dict:
+    '''
+    {'metric.stat': value}, the keys the thresholds use
+    '''
+    return {metric + '.' + stat: value for metric, summary in results.items() for stat, value in summary.items()}
+
+def check(flat: dict, thresholds: dict) -> list:
+    '''
+    returns the failures, a missing metric counts as one
+    '''
+    failures = []
+    for key, bounds in thresholds.items():
+        value = flat.get(key, None)
+        if value is None:
+            failures.append(f'{key}: missing')
+            continue
+        if 'max' in bounds and value > bounds['max']:
+            failures.append(f"{key}: {value} > max {bounds['max']}")
+        if 'min' in bounds and value < bounds['min']:
+            failures.append(f"{key}: {value} < min {bounds['min']}")
+    return failures
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    with open(args.thresholds) as f:
+        thresholds = json.load(f)
+
+    report = run_serial(args.serial) if args.serial else run_simulated()
+    report['flat'] = flatten(report['results'])
+    report['failures'] = check(report['flat'], thresholds.get(report['target'], {}))
+
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+
+    for metric, summary in sorted(report['results'].items()):
+        print(f"{metric:32} p50 {summary.get('p50', '-'):>8} p95 {summary.get('p95', '-'):>8} us")
+    for failure in report['failures']:
+        print('REGRESSION', failure)
+    print('results written to', output)
+    return 1 if report['failures'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
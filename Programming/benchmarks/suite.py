@@ -0,0 +1,199 @@
+'''
+Benchmark Suite
+Measures the firmware on the board or on the simulated board of `run.py`
+    -   Per-sensor read latency
+    -   HTTP request parsing, whole and split in single bytes
+    -   JSON encoding of the values served on /get_values
+    -   Binary Telemetry encoding of the same values against json.dumps
+    -   Full request latency of every route, through the request parsing and the handler
+    -   Control loop rate, period jitter and work per iteration of main.controller_core
+
+On the board, with the firmware and this directory copied to the flash:
+    import suite; suite.run()
+'''
+import sys
+import json
+import time
+from bench import Stats, BenchClient, time_calls, ticks_us, ticks_diff
+
+import main as firmware
+from server2 import Server
+from httpparser import RequestParser
+
+SENSOR_READS = 200
+ENCODES = 500
+REQUESTS = 200
+LOOP_ITERATIONS = 400
+RESULTS_PREFIX = 'BENCH_RESULTS '
+
+# (name, request chunks as recv returns them), BOOT is replaced by the boot id of the server
+ROUTES = (
+    ('get_web', (b'GET / HTTP/1.1\r\nHost: pico\r\n\r\n',)),
+    ('get_values', (b'GET /get_values HTTP/1.1\r\nHost: pico\r\n\r\n',)),
+    # nothing is published before the routes run, the values are still at version 0
+    ('get_values_304', (b'GET /get_values HTTP/1.1\r\nHost: pico\r\nIf-None-Match: "BOOT-0"\r\n\r\n',)),
+    ('get_values_delta', (b'GET /get_values?since=BOOT-0 HTTP/1.1\r\nHost: pico\r\n\r\n',)),
+    ('post_switch', (b'POST /set_switch_state HTTP/1.1\r\nHost: pico\r\nContent-Length: 32\r\n\r\n',
+                     b'{"id": "buzzer", "state": "off"}')),
+    ('post_actuators', (b'POST /actuators HTTP/1.1\r\nHost: pico\r\nContent-Length: 35\r\n\r\n',
+                        b'{"buzzer": "off", "uvLight": "off"}')),
+    ('get_history', (b'GET /history?sensor=temperature&tier=0 HTTP/1.1\r\nHost: pico\r\n\r\n',)),
+    ('get_telemetry', (b'GET /telemetry.bin HTTP/1.1\r\nHost: pico\r\n\r\n',)),
+    ('get_history_json', (b'GET /history?sensor=temperature&tier=0&format=json HTTP/1.1\r\nHost: pico\r\n\r\n',)),
+)
+
+class StopLoop(Exception):
+    pass
+
+class LoopProbe:
+    '''
+    Replaces main.sleep_ms to time the iterations of controller_core and stop it
+    '''
+    def __init__(self, sleep_ms: callable, iterations: int):
+        self.sleep_ms = sleep_ms
+        self.iterations = iterations
+        self.count = 0
+        self.work = Stats()  # wall us between waking up and the next sleep
+        self.period = Stats()  # loop clock us between iterations
+        self.first_tick = None
+        self.last_tick = None
+        self.woke = None
+
+    def __call__(self, ms: int):
+        now = ticks_us()
+        if self.woke is not None:
+            self.work.add(ticks_diff(now, self.woke))
+
+        # the loop's own clock, virtual in the simulation
+        tick = time.ticks_us()
+        if self.last_tick is not None:
+            self.period.add(time.ticks_diff(tick, self.last_tick))
+        else:
+            self.first_tick = tick
+        self.last_tick = tick
+
+        self.count += 1
+        if self.count > self.iterations:
+            raise StopLoop()
+        self.sleep_ms(ms)
+        self.woke = ticks_us()
+
+def bench_sensors(results: dict, n: int=SENSOR_READS):
+    '''
+    read latency of every sensor, the DHT22 both measuring and from its cached measurement
+    '''
+    sensors = firmware.make_sensors()
+    dht22 = sensors._dht22_handler
+
+    def expire():
+        dht22.timestamp = None
+
+    for name in ('ntc3950_read', 'mq135_read', 'limit_switch_read', 'motion_sensor_read'):
+        results['sensor.' + name] = time_calls(getattr(sensors, name), n)
+    for name in ('dht22_temp_read', 'dht22_humidity_read'):
+        read = getattr(sensors, name)
+        # the DHT22 can't measure faster than every 2s, a few measurements are enough
+        results['sensor.' + name] = time_calls(read, max(n // 20, 5), expire)
+        results['sensor.' + name + '.cached'] = time_calls(read, n)
+
+def bench_parser(results: dict, n: int=REQUESTS):
+    '''
+    parse time of the requests of ROUTES, as sent and one byte per read
+    '''
+    parser = RequestParser()
+    for name, chunks in ROUTES:
+        if name not in ('get_values', 'post_switch'):
+            continue
+        request = b''.join(chunks)
+        for suffix, pieces in (('', (request,)), ('.split', tuple(request[i:i + 1] for i in range(len(request))))):
+            def parse():
+                parser.reset()
+                parser.read(BenchClient(pieces))
+            results['parser.' + name + suffix] = time_calls(parse, n)
+
+def bench_values_json(results: dict, server: Server, n: int=ENCODES):
+    results['values_json.encode'] = time_calls(server.values_json, n)
+    results['values_json.build_responses'] = time_calls(server.build_values_responses, n)
+
+def bench_telemetry(results: dict, server: Server, n: int=ENCODES):
+    '''
+    one Telemetry record against json.dumps of the same snapshots
+    '''
+    sensors_version, sensors = server.sensors_state.read()
+    actuators_version, actuators = server.actuators_state.read()
+    seq = sensors_version + actuators_version
+    results['telemetry.encode'] = time_calls(lambda: server.telemetry.encode(seq, sensors, actuators), n)
+    results['telemetry.json_dumps'] = time_calls(lambda: json.dumps({'sensors': sensors, 'actuators': actuators}), n)
+    results['telemetry.encode']['bytes'] = len(server.telemetry.buffer)
+    results['telemetry.json_dumps']['bytes'] = len(json.dumps({'sensors': sensors, 'actuators': actuators}))
+
+def bench_routes(results: dict, server: Server, n: int=REQUESTS):
+    '''
+    latency from the first recv of the request to the last byte of the response handed to the client
+    '''
+    for name, chunks in ROUTES:
+        chunks = tuple(chunk.replace(b'BOOT', server.boot_id.encode()) for chunk in chunks)
+        stats = Stats()
+        sent = 0
+        for _ in range(n):
+            server.client = BenchClient(chunks)
+            start = ticks_us()
+            server.handle_html_request(server.identify_html_request())
+            server.send_body()  # sent by handle_client in asyncio mode
+            stats.add(ticks_diff(ticks_us(), start))
+            sent = server.client.sent
+        summary = stats.summary()
+        summary['bytes'] = sent
+        results['route.' + name] = summary
+
+def bench_control_loop(results: dict, iterations: int=LOOP_ITERATIONS):
+    '''
+    runs controller_core for `iterations` iterations, leaves its timers running
+    '''
+    probe = LoopProbe(firmware.sleep_ms, iterations)
+    firmware.sleep_ms = probe
+    try:
+        firmware.controller_core()
+    except StopLoop:
+        pass
+    finally:
+        firmware.sleep_ms = probe.sleep_ms
+
+    elapsed = time.ticks_diff(probe.last_tick, probe.first_tick)
+    results['loop.work'] = probe.work.summary()
+    period = probe.period.summary()
+    period['rate_hz'] = round(1000000 * (probe.count - 2) / elapsed, 2) if elapsed > 0 else 0
+    results['loop.period'] = period
+
+def run_all() -> dict:
+    '''
+    runs every benchmark, returns {metric: summary} with every time in us
+    '''
+    results = {}
+    bench_sensors(results)
+    bench_parser(results)
+
+    server = Server(use_asyncio=True, sensors_state=firmware.sensors_state,
+                    actuators_state=firmware.actuators_state, history=firmware.history)
+    # a full finest tier, like after 10 minutes of uptime
+    now = int(time.time())
+    length = firmware.history.tiers[0][1]
+    for i in range(length):
+        firmware.history.add(firmware.sensors_state.snapshot, now - length + i)
+    bench_values_json(results, server)
+    bench_telemetry(results, server)
+    bench_routes(results, server)
+
+    # last, controller_core leaves the sampler and display timers running
+    bench_control_loop(results)
+    return results
+
+def run():
+    '''
+    prints the results as one RESULTS_PREFIX line of JSON, parsed by `run.py --serial`
+    '''
+    results = run_all()
+    print(RESULTS_PREFIX + json.dumps({'target': sys.implementation.name, 'platform': sys.platform, 'results': results}))
+
+if __name__ == '__main__':
+    run()
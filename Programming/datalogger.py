@@ -0,0 +1,201 @@
+'''
+Flash Data Logger
+Append-only log of sensor values and actuator states that survives power cuts
+    -   Fixed-size binary records are buffered in RAM and written in page-sized batches
+    -   Records go to rotating segment files, the oldest are deleted past the retention limit
+    -   On boot the segment headers are scanned and logging resumes at the end of the newest segment,
+        so reboots don't use up the retention limit, a torn record at its end is completed as an invalid one
+'''
+import os
+import struct
+import time
+
+class DataLogger:
+    '''
+    Buffers records and appends them to segment files under `root`
+    '''
+    # record: timestamp, the SENSOR_FIELDS scaled to int16, actuator bitmap, checksum
+    RECORD = '<IhhhhhhBB'
+    RECORD_SIZE = struct.calcsize(RECORD)
+    SENSOR_FIELDS = ('skinTemperature', 'coverClosed', 'humidity', 'temperature', 'motionSensor', 'o2Level')
+    SENSOR_SCALES = (10, 1, 10, 10, 1, 1)
+
+    # segment header: magic, format version, record size, reserved, sequence number, creation timestamp
+    HEADER = '<4sBBHII'
+    HEADER_SIZE = struct.calcsize(HEADER)
+    MAGIC = b'ILOG'
+    FORMAT_VERSION = 1
+    SEGMENT_PREFIX = 'seg'
+    SEGMENT_SUFFIX = '.bin'
+
+    DEFAULT_PAGE_SIZE = 512
+    DEFAULT_SEGMENT_SIZE = 64 * 1024
+    DEFAULT_MAX_SEGMENTS = 8
+
+    def __init__(self, root: str='log', page_size: int=DEFAULT_PAGE_SIZE, segment_size: int=DEFAULT_SEGMENT_SIZE, max_segments: int=DEFAULT_MAX_SEGMENTS):
+        '''
+        :param root: directory of the segment files
+        :param page_size: bytes buffered in RAM before a write, rounded down to whole records
+        :param segment_size: a new segment is started once the current one would grow past this
+        :param max_segments: retention limit, the oldest segments are deleted beyond it
+        '''
+        self.root = root
+        self.records_per_page = max(page_size // self.RECORD_SIZE, 1)
+        self.records_per_segment = max((segment_size - self.HEADER_SIZE) // self.RECORD_SIZE, self.records_per_page)
+        self.max_segments = max_segments
+
+        self.page = bytearray(self.records_per_page * self.RECORD_SIZE)
+        self.page_view = memoryview(self.page)
+        self.buffered = 0  # records in page
+        self.segment_records = 0  # records in the current segment
+
+        # statistics
+        self.records_logged = 0
+        self.flushes = 0
+        self.bytes_written = 0
+        self.segments_created = 0
+        self.segments_deleted = 0
+        self.recovery_ms = 0
+
+        self.recover()
+
+    def segment_path(self, seq: int) -> str:
+        return f'{self.root}/{self.SEGMENT_PREFIX}{seq:08d}{self.SEGMENT_SUFFIX}'
+
+    def segments(self) -> list:
+        '''
+        sorted sequence numbers of the segments whose header is valid
+        '''
+        seqs = []
+        for name in os.listdir(self.root):
+            if not (name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX)):
+                continue
+            try:
+                with open(f'{self.root}/{name}', 'rb') as f:
+                    header = f.read(self.HEADER_SIZE)
+                magic, version, record_size, _, seq, _ = struct.unpack(self.HEADER, header)
+            except (OSError, ValueError):
+                continue
+            if magic == self.MAGIC and version == self.FORMAT_VERSION and record_size == self.RECORD_SIZE:
+                seqs.append(seq)
+        seqs.sort()
+        return seqs
+
+    def recover(self):
+        '''
+        scans the existing segments and continues appending to the newest one,
+        a new segment is only started if there is none or the newest is full
+        '''
+        start = time.ticks_ms()
+        try:
+            os.mkdir(self.root)
+        except OSError:
+            pass  # already exists
+
+        seqs = self.segments()
+        if seqs:
+            self.seq = seqs[-1]
+            self.segment_records = self.seal(self.segment_path(self.seq))
+        if not seqs or self.segment_records >= self.records_per_segment:
+            self.open_segment(seqs[-1] + 1 if seqs else 1)
+        self.recovery_ms = time.ticks_diff(time.ticks_ms(), start)
+
+    def seal(self, path: str) -> int:
+        '''
+        pads a record torn by a power cut at the end of the segment to a whole record that fails its checksum,
+        the file can't be truncated on every filesystem, the next records are appended after it
+        returns the number of whole records in the segment
+        '''
+        size = os.stat(path)[6] - self.HEADER_SIZE
+        torn = size % self.RECORD_SIZE
+        if not torn:
+            return size // self.RECORD_SIZE
+
+        record = bytearray(self.RECORD_SIZE)
+        with open(path, 'rb') as f:
+            f.seek(self.HEADER_SIZE + size - torn)
+            f.readinto(memoryview(record)[:torn])
+        record[-1] = (self.checksum(record, 0, self.RECORD_SIZE - 1) + 1) & 0xff
+        with open(path, 'ab') as f:
+            f.write(memoryview(record)[torn:])
+        self.bytes_written += self.RECORD_SIZE - torn
+        return size // self.RECORD_SIZE + 1
+
+    def open_segment(self, seq: int):
+        '''
+        writes the header of a new segment then enforces the retention limit
+        '''
+        self.seq = seq
+        with open(self.segment_path(seq), 'wb') as f:
+            f.write(struct.pack(self.HEADER, self.MAGIC, self.FORMAT_VERSION, self.RECORD_SIZE, 0, seq, int(time.time())))
+        self.segment_records = 0
+        self.segments_created += 1
+        self.bytes_written += self.HEADER_SIZE
+
+        seqs = self.segments()
+        while len(seqs) > self.max_segments:
+            os.remove(self.segment_path(seqs.pop(0)))
+            self.segments_deleted += 1
+
+    def log(self, values: dict, actuator_bitmap: int, timestamp: int=None):
+        '''
+        buffers one record, writes the page once it's full
+        :param values: sensor values, keyed like SENSOR_FIELDS
+        :param actuator_bitmap: one bit per actuator, see Actuators.bitmap
+        :param timestamp: seconds, defaults to time.time()
+        '''
+        if timestamp is None:
+            timestamp = int(time.time())
+        fields = [min(max(int(values[name] * scale), -32768), 32767) for name, scale in zip(self.SENSOR_FIELDS, self.SENSOR_SCALES)]
+
+        offset = self.buffered * self.RECORD_SIZE
+        struct.pack_into(self.RECORD, self.page, offset, timestamp, *fields, actuator_bitmap & 0xff, 0)
+        self.page[offset + self.RECORD_SIZE - 1] = self.checksum(self.page, offset, offset + self.RECORD_SIZE - 1)
+        self.buffered += 1
+        self.records_logged += 1
+
+        if self.buffered == self.records_per_page:
+            self.flush()
+
+    def flush(self):
+        '''
+        appends the buffered records to the current segment in one write
+        '''
+        if not self.buffered:
+            return
+
+        if self.segment_records + self.buffered > self.records_per_segment:
+            self.open_segment(self.seq + 1)
+
+        length = self.buffered * self.RECORD_SIZE
+        with open(self.segment_path(self.seq), 'ab') as f:
+            f.write(self.page_view[:length])
+        self.segment_records += self.buffered
+        self.buffered = 0
+        self.flushes += 1
+        self.bytes_written += length
+
+    @staticmethod
+    def checksum(buf, start: int, end: int) -> int:
+        '''
+        8 bit sum of buf[start:end]
+        '''
+        total = 0
+        for i in range(start, end):
+            total += buf[i]
+        return total & 0xff
+
+    def records(self):
+        '''
+        yields (timestamp, sensor values tuple, actuator bitmap) of every valid record on flash, oldest first
+        torn or corrupted records are skipped
+        '''
+        record = bytearray(self.RECORD_SIZE)
+        for seq in self.segments():
+            with open(self.segment_path(seq), 'rb') as f:
+                f.seek(self.HEADER_SIZE)
+                while f.readinto(record) == self.RECORD_SIZE:
+                    if self.checksum(record, 0, self.RECORD_SIZE - 1) != record[-1]:
+                        continue
+                    fields = struct.unpack(self.RECORD, record)
+                    yield fields[0], tuple(value / scale for value, scale in zip(fields[1:7], self.SENSOR_SCALES)), fields[7]
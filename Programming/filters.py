@@ -0,0 +1,131 @@
+'''
+ADC Filtering
+Filters over raw read_u16 codes computed incrementally in integer math
+    -   Samples are kept in a preallocated array('H') ring buffer
+    -   Adding a sample or reading the filtered value allocates nothing
+'''
+from array import array
+
+class ADCFilter:
+    '''
+    Abstract filter over a ring buffer of raw ADC codes
+    '''
+    def __init__(self, size: int):
+        '''
+        :param size: number of samples kept in the ring buffer
+        '''
+        self.size = size
+        self.buffer = array('H', bytes(2 * size))
+        self.index = 0  # next slot to write
+        self.count = 0  # number of valid samples
+        self.value = 0  # latest filtered code
+
+    def add(self, code: int) -> int:
+        '''
+        pushes one code into the ring buffer, returns the filtered value
+        '''
+        old = self.buffer[self.index]
+        self.buffer[self.index] = code
+        self.index += 1
+        if self.index == self.size:
+            self.index = 0
+        full = self.count == self.size
+        if not full:
+            self.count += 1
+
+        self.value = self.update(code, old, full)
+        return self.value
+
+    def update(self, code: int, old: int, full: bool) -> int:
+        '''
+        returns the new filtered value after code replaced old, old is only valid if the buffer was full
+        '''
+        raise NotImplementedError
+
+    def sample(self, adc, num_samples: int=1) -> int:
+        '''
+        reads num_samples codes with adc.read_u16() into the filter, returns the filtered value
+        '''
+        for _ in range(num_samples):
+            self.add(adc.read_u16())
+
+        return self.value
+
+    def reset(self):
+        self.index = 0
+        self.count = 0
+        self.value = 0
+
+class MovingAverage(ADCFilter):
+    '''
+    Mean of the last `size` samples, kept as a running sum
+    '''
+    def __init__(self, size: int):
+        super().__init__(size)
+        self.total = 0
+
+    def update(self, code: int, old: int, full: bool) -> int:
+        self.total += code
+        if full:
+            self.total -= old
+        return self.total // self.count
+
+    def reset(self):
+        super().reset()
+        self.total = 0
+
+class Median(ADCFilter):
+    '''
+    Median of the last `size` samples, a sorted copy of the window is updated by insertion
+    '''
+    def __init__(self, size: int):
+        super().__init__(size)
+        self.sorted = array('H', bytes(2 * size))
+
+    def update(self, code: int, old: int, full: bool) -> int:
+        window = self.sorted
+        n = self.count - 1  # samples staying in the window
+
+        # drop the sample that left the window by shifting the ones above it down
+        if full:
+            i = 0
+            while window[i] != old:
+                i += 1
+            while i < n:
+                window[i] = window[i + 1]
+                i += 1
+
+        # insert the new sample in order
+        i = n
+        while i > 0 and window[i - 1] > code:
+            window[i] = window[i - 1]
+            i -= 1
+        window[i] = code
+
+        return window[self.count >> 1]
+
+class Exponential(ADCFilter):
+    '''
+    Exponential moving average y += (x - y) / 2**shift, kept in fixed point with FRACTION_BITS
+    Doesn't need a window, the ring buffer only keeps the latest raw samples
+    '''
+    FRACTION_BITS = 8
+    def __init__(self, shift: int, size: int=1):
+        '''
+        :param shift: smoothing, alpha = 1 / 2**shift
+        :param size: raw samples kept in the ring buffer
+        '''
+        super().__init__(size)
+        self.shift = shift
+        self.state = -1
+
+    def update(self, code: int, old: int, full: bool) -> int:
+        if self.state < 0:
+            self.state = code << self.FRACTION_BITS
+        else:
+            self.state += ((code << self.FRACTION_BITS) - self.state) >> self.shift
+        return self.state >> self.FRACTION_BITS
+
+    def reset(self):
+        super().reset()
+        self.state = -1
@@ -0,0 +1,229 @@
+'''
+Sensor History
+Fixed memory, multi-resolution time series of the sensor values
+    -   Every tier keeps min/max/mean buckets of one interval in array('h') ring buffers
+    -   Samples are accumulated into the open bucket of every tier as they arrive
+    -   Values are stored scaled, value * scale, buckets without samples hold EMPTY
+    -   Written by the controller core, read by the server without locking,
+        a read racing a write can see one bucket of the previous round
+'''
+from array import array
+import struct
+import time
+
+EMPTY = -32768
+INT16_MAX = 32767
+
+class HistoryTier:
+    '''
+    Ring of `length` buckets of `interval_s` seconds each
+    '''
+    def __init__(self, interval_s: int, length: int):
+        self.interval_s = interval_s
+        self.length = length
+        self.min = array('h', bytes(2 * length))
+        self.max = array('h', bytes(2 * length))
+        self.mean = array('h', bytes(2 * length))
+        self.head = 0  # next bucket to write
+        self.count = 0  # closed buckets stored
+        self.bucket = None  # index (time // interval_s) of the open bucket
+
+        # accumulator of the open bucket
+        self._min = INT16_MAX
+        self._max = EMPTY
+        self._sum = 0
+        self._n = 0
+
+    def add(self, value: int, now: int):
+        '''
+        accumulates one scaled value at time `now` in seconds, closing the open bucket if its interval passed
+        '''
+        bucket = now // self.interval_s
+        if self.bucket is None:
+            self.bucket = bucket
+        elif bucket != self.bucket:
+            self.close()
+            # buckets without any sample
+            for _ in range(min(bucket - self.bucket - 1, self.length)):
+                self.push(EMPTY, EMPTY, EMPTY)
+            self.bucket = bucket
+
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+        self._sum += value
+        self._n += 1
+
+    def close(self):
+        if self._n:
+            self.push(self._min, self._max, self._sum // self._n)
+        else:
+            self.push(EMPTY, EMPTY, EMPTY)
+        self._min = INT16_MAX
+        self._max = EMPTY
+        self._sum = 0
+        self._n = 0
+
+    def push(self, minimum: int, maximum: int, mean: int):
+        self.min[self.head] = minimum
+        self.max[self.head] = maximum
+        self.mean[self.head] = mean
+        self.head += 1
+        if self.head == self.length:
+            self.head = 0
+        if self.count < self.length:
+            self.count += 1
+
+    @property
+    def end(self) -> int:
+        '''
+        time in seconds where the latest closed bucket ends
+        '''
+        return 0 if self.bucket is None else self.bucket * self.interval_s
+
+    def ranges(self) -> tuple:
+        '''
+        (start, stop) index ranges of the closed buckets, oldest first
+        '''
+        start = self.head - self.count
+        if start >= 0:
+            return ((start, self.head),)
+        return ((start + self.length, self.length), (0, self.head))
+
+    def slices(self, values: array, ranges: tuple=None) -> tuple:
+        '''
+        memoryviews of values holding the closed buckets, oldest first
+        :param ranges: from an earlier `ranges()`, so several arrays are sliced alike
+        '''
+        view = memoryview(values)
+        return tuple(view[start:stop] for start, stop in ranges or self.ranges())
+
+class History:
+    '''
+    History tiers of every recorded sensor
+    '''
+    # (interval in seconds, number of buckets): 1s x 10min, 1min x 24h, 15min x 7days
+    DEFAULT_TIERS = ((1, 600), (60, 1440), (900, 672))
+    DEFAULT_SCALE = 10
+    HEADER = '<4sBBHHHI'  # magic, format version, tier, interval_s, count, scale, end
+    MAGIC = b'HIST'
+    FORMAT_VERSION = 1
+    JSON_CHUNK = 256
+
+    def __init__(self, names: tuple, tiers: tuple=DEFAULT_TIERS, scale: int=DEFAULT_SCALE):
+        '''
+        :param names: keys of the values dict that are recorded
+        :param tiers: (interval_s, length) of every tier, finest first
+        :param scale: values are stored as int(value * scale)
+        '''
+        self.names = names
+        self.tiers = tiers
+        self.scale = scale
+        self.series = {name: [HistoryTier(interval_s, length) for interval_s, length in tiers] for name in names}
+
+        self._header = bytearray(struct.calcsize(self.HEADER))
+        self._json = bytearray(self.JSON_CHUNK)
+
+    def memory(self) -> int:
+        '''
+        bytes of sample storage
+        '''
+        return len(self.names) * sum(6 * length for _, length in self.tiers)
+
+    def add(self, values: dict, now: int=None):
+        '''
+        records the recorded sensors of values at `now` in seconds, defaults to time.time()
+        '''
+        if now is None:
+            now = time.time()
+        for name in self.names:
+            value = int(values[name] * self.scale)
+            value = min(max(value, EMPTY + 1), INT16_MAX)
+            for tier in self.series[name]:
+                tier.add(value, now)
+
+    def get(self, name: str, tier: int) -> HistoryTier:
+        '''
+        returns the HistoryTier or None if name or tier isn't recorded
+        '''
+        tiers = self.series.get(name, None)
+        if tiers is None or not 0 <= tier < len(tiers):
+            return None
+        return tiers[tier]
+
+    def binary_chunks(self, history_tier: HistoryTier, tier: int, ranges: tuple, end: int):
+        '''
+        yields the HEADER then the int16 little endian min, max and mean arrays, oldest bucket first
+        :param ranges, end: history_tier.ranges() and history_tier.end read when the head was sent,
+                            buckets closed since then aren't included so the body matches binary_length
+        '''
+        count = sum(stop - start for start, stop in ranges)
+        struct.pack_into(self.HEADER, self._header, 0, self.MAGIC, self.FORMAT_VERSION, tier,
+                         history_tier.interval_s, count, self.scale, end)
+        yield self._header
+        for values in (history_tier.min, history_tier.max, history_tier.mean):
+            for view in history_tier.slices(values, ranges):
+                yield view
+
+    def binary_length(self, ranges: tuple) -> int:
+        '''
+        bytes of the binary_chunks of the buckets in ranges
+        '''
+        return len(self._header) + 6 * sum(stop - start for start, stop in ranges)
+
+    def json_chunks(self, name: str, history_tier: HistoryTier, tier: int):
+        '''
+        yields {"sensor", "tier", "interval", "end", "scale", "min", "max", "mean"},
+        the numbers are written straight into a reusable buffer, EMPTY buckets are null
+        the buffer is shared, each chunk must be sent before the next one is asked for
+        '''
+        ranges = history_tier.ranges()
+        yield f'{{"sensor": "{name}", "tier": {tier}, "interval": {history_tier.interval_s}, "end": {history_tier.end}, "scale": {self.scale}'
+        view = memoryview(self._json)
+        for key, values in (('min', history_tier.min), ('max', history_tier.max), ('mean', history_tier.mean)):
+            yield f', "{key}": ['
+            pos = 0
+            first = True
+            for start, stop in ranges:
+                for i in range(start, stop):
+                    value = values[i]
+                    if pos > self.JSON_CHUNK - 8:
+                        yield view[:pos]
+                        pos = 0
+                    if not first:
+                        self._json[pos] = 44  # ,
+                        pos += 1
+                    first = False
+                    pos = self._write_int(pos, value)
+            self._json[pos] = 93  # ]
+            pos += 1
+            yield view[:pos]
+        yield '}'
+
+    def _write_int(self, pos: int, value: int) -> int:
+        '''
+        writes value as ascii at pos of the json buffer, returns the position after it
+        '''
+        buf = self._json
+        if value == EMPTY:
+            buf[pos:pos + 4] = b'null'
+            return pos + 4
+        if value < 0:
+            buf[pos] = 45  # -
+            pos += 1
+            value = -value
+        start = pos
+        while True:
+            buf[pos] = 48 + value % 10
+            pos += 1
+            value //= 10
+            if not value:
+                break
+        # digits were written backwards
+        end = pos - 1
+        while start < end:
+            buf[start], buf[end] = buf[end], buf[start]
+            start += 1
+            end -= 1
+        return pos
@@ -0,0 +1,331 @@
+'''
+HTTP/1.1 Request Parser
+Incremental parser over one preallocated buffer
+    -   Bytes are read into the buffer as they arrive, the head is scanned as it arrives
+    -   The request line and the wanted headers are kept as offsets into the buffer,
+        strings are only made when a handler asks for a value
+    -   The body is read into the same buffer after the head, it may arrive in any number of pieces
+    -   Heads and bodies over the buffer sizes are rejected with 431 and 413
+'''
+CR = 13
+LF = 10
+SPACE = 32
+TAB = 9
+COLON = 58
+QUESTION = 63
+AMPERSAND = 38
+EQUALS = 61
+
+class HTTPError(Exception):
+    '''
+    Malformed or unsupported request, answered with `status` and the connection closed
+    '''
+    def __init__(self, status: int, reason: str):
+        super().__init__(status, reason)
+        self.status = status
+        self.reason = reason
+
+class RequestParser:
+    '''
+    Parses one request at a time, `reset()` before reusing it for a new connection,
+    `next()` for the next request of the same connection
+    '''
+    DEFAULT_HEAD_SIZE = 1024
+    DEFAULT_BODY_SIZE = 512
+    MAX_HEADERS = 32
+    # only these headers are kept, lowercase
+    HEADERS = (b'content-length', b'transfer-encoding', b'connection', b'if-none-match', b'accept-encoding')
+
+    def __init__(self, head_size: int=DEFAULT_HEAD_SIZE, body_size: int=DEFAULT_BODY_SIZE, headers: tuple=HEADERS):
+        '''
+        :param head_size: longest request line and headers, with the blank line
+        :param body_size: longest body
+        :param headers: lowercase names of the headers whose values are kept
+        '''
+        self.head_size = head_size
+        self.buffer = bytearray(head_size + body_size)
+        self.view = memoryview(self.buffer)
+        self.headers = headers
+        self.header_start = [-1] * len(headers)
+        self.header_end = [-1] * len(headers)
+        self.reset()
+
+    def reset(self):
+        self.length = 0  # bytes in the buffer
+        self.scanned = 0  # bytes of the head already scanned for line ends
+        self.line_start = 0
+        self.lines = 0
+        self.head_end = -1  # offset of the body once the blank line was seen
+        self.content_length = 0
+        self.method_start = -1
+        self.method_end = -1
+        self.target_start = -1
+        self.path_end = -1
+        self.target_end = -1
+        self.http11 = False
+        for i in range(len(self.headers)):
+            self.header_start[i] = -1
+            self.header_end[i] = -1
+
+    def next(self):
+        '''
+        prepares for the next request on a kept-alive connection,
+        bytes already read past the current request are kept and parsed
+        '''
+        end = self.head_end + self.content_length
+        extra = self.length - end if self.head_end >= 0 else 0
+        buf = self.buffer
+        for i in range(extra):
+            buf[i] = buf[end + i]
+        self.reset()
+        if extra > 0:
+            self.feed(extra)
+
+    @property
+    def complete(self) -> bool:
+        return self.head_end >= 0 and self.length >= self.head_end + self.content_length
+
+    def free(self) -> memoryview:
+        '''
+        the part of the buffer the next read goes into,
+        bounded by the head size until the head is complete, then by the end of the body
+        '''
+        if self.head_end < 0:
+            return self.view[self.length:self.head_size]
+        return self.view[self.length:self.head_end + self.content_length]
+
+    def feed(self, n: int) -> bool:
+        '''
+        takes n bytes read into `free()`, returns True once the whole request is in
+        raises HTTPError if the request is malformed or too large
+        '''
+        if n <= 0:
+            if self.length:
+                raise HTTPError(400, 'Bad Request')  # closed mid request
+            return False
+        self.length += n
+
+        if self.head_end < 0:
+            self.scan()
+            if self.head_end < 0:
+                if self.length >= self.head_size:
+                    raise HTTPError(431, 'Request Header Fields Too Large')
+                return False
+
+        return self.complete
+
+    def read(self, sock) -> bool:
+        '''
+        reads from a blocking socket with recv until the request is complete,
+        returns False if it closed before sending anything
+        MicroPython's socket readinto only returns once the view is full or the socket closed,
+        recv returns whatever arrived
+        '''
+        while not self.complete:
+            free = self.free()
+            data = sock.recv(len(free))
+            n = len(data)
+            free[:n] = data
+            if not n and not self.length:
+                return False
+            self.feed(n)
+        return True
+
+    def scan(self):
+        '''
+        parses the head lines completed since the last scan
+        '''
+        buf = self.buffer
+        i = self.scanned
+        while i < self.length:
+            if buf[i] == LF:
+                end = i - 1 if i > self.line_start and buf[i - 1] == CR else i
+                if end == self.line_start and self.method_end >= 0:
+                    self.end_head(i + 1)
+                    return
+                if end > self.line_start:  # empty lines before the request line are ignored
+                    self.parse_line(self.line_start, end)
+                self.line_start = i + 1
+            i += 1
+        self.scanned = i
+
+    def parse_line(self, start: int, end: int):
+        if self.method_end < 0:
+            self.parse_request_line(start, end)
+            return
+
+        self.lines += 1
+        if self.lines > self.MAX_HEADERS:
+            raise HTTPError(431, 'Request Header Fields Too Large')
+
+        buf = self.buffer
+        colon = start
+        while colon < end and buf[colon] != COLON:
+            colon += 1
+        if colon == end or colon == start:
+            raise HTTPError(400, 'Bad Request')
+
+        index = self.header_index(start, colon)
+        if index < 0:
+            return
+        value_start = colon + 1
+        while value_start < end and buf[value_start] in (SPACE, TAB):
+            value_start += 1
+        value_end = end
+        while value_end > value_start and buf[value_end - 1] in (SPACE, TAB):
+            value_end -= 1
+        if not self.visible(value_start, value_end, SPACE):
+            raise HTTPError(400, 'Bad Request')
+        self.header_start[index] = value_start
+        self.header_end[index] = value_end
+
+    def parse_request_line(self, start: int, end: int):
+        '''
+        METHOD SP target SP HTTP/1.x, the target must be an absolute path
+        '''
+        buf = self.buffer
+        first = start
+        while first < end and buf[first] != SPACE:
+            first += 1
+        second = first + 1
+        while second < end and buf[second] != SPACE:
+            second += 1
+        if first == start or second >= end or second == first + 1 or buf[first + 1] != 47:  # /
+            raise HTTPError(400, 'Bad Request')
+        if not self.visible(start, second, SPACE):
+            raise HTTPError(400, 'Bad Request')
+        if end - second != 9 or not self.matches(second + 1, b'HTTP/1.') or buf[end - 1] not in (48, 49):  # 0 1
+            raise HTTPError(505, 'HTTP Version Not Supported')
+
+        self.method_start = start
+        self.method_end = first
+        self.target_start = first + 1
+        self.target_end = second
+        self.path_end = self.target_start
+        while self.path_end < second and buf[self.path_end] != QUESTION:
+            self.path_end += 1
+        self.http11 = buf[end - 1] == 49  # 1
+
+    def visible(self, start: int, end: int, allowed: int=-1) -> bool:
+        '''
+        True if buf[start:end] is printable ascii, except the `allowed` byte which may appear too,
+        kept values are decoded so anything else is rejected
+        '''
+        buf = self.buffer
+        for i in range(start, end):
+            c = buf[i]
+            if not 32 < c < 127 and c != allowed:
+                return False
+        return True
+
+    def header_index(self, start: int, end: int) -> int:
+        '''
+        index in `headers` of the name at buf[start:end], compared case insensitively, -1 if not kept
+        '''
+        for index, name in enumerate(self.headers):
+            if len(name) == end - start and self.matches(start, name, True):
+                return index
+        return -1
+
+    def matches(self, start: int, value: bytes, fold: bool=False) -> bool:
+        '''
+        True if the buffer at start holds value, ascii letters compared case insensitively if fold,
+        value must be lowercase then
+        '''
+        buf = self.buffer
+        if start + len(value) > self.length:
+            return False
+        mask = 0x20 if fold else 0
+        for i in range(len(value)):
+            if buf[start + i] | mask != value[i]:
+                return False
+        return True
+
+    def end_head(self, head_end: int):
+        '''
+        validates the framing headers once the blank line was seen
+        '''
+        if self.header_start[self.headers.index(b'transfer-encoding')] >= 0:
+            raise HTTPError(501, 'Not Implemented')  # chunked bodies aren't supported
+
+        index = self.headers.index(b'content-length')
+        length = 0
+        start = self.header_start[index]
+        if start >= 0:
+            end = self.header_end[index]
+            if start == end:
+                raise HTTPError(400, 'Bad Request')
+            for i in range(start, end):
+                digit = self.buffer[i] - 48
+                if not 0 <= digit <= 9:
+                    raise HTTPError(400, 'Bad Request')
+                length = length * 10 + digit
+                if head_end + length > len(self.buffer):
+                    raise HTTPError(413, 'Payload Too Large')
+
+        self.head_end = head_end
+        self.content_length = length
+        self.scanned = head_end
+
+    # accessors, valid once the head is complete
+    def string(self, start: int, end: int) -> str:
+        return str(self.view[start:end], 'utf-8')
+
+    @property
+    def method(self) -> str:
+        return self.string(self.method_start, self.method_end)
+
+    @property
+    def route(self) -> str:
+        '''
+        'METHOD /path' without the query, the key of the routing tables
+        '''
+        return self.string(self.method_start, self.path_end)
+
+    @property
+    def path(self) -> str:
+        return self.string(self.target_start, self.path_end)
+
+    @property
+    def body(self) -> memoryview:
+        return self.view[self.head_end:self.head_end + self.content_length]
+
+    def header(self, name: bytes) -> str:
+        '''
+        value of a kept header by lowercase name, None if it wasn't sent
+        '''
+        index = self.headers.index(name)
+        if self.header_start[index] < 0:
+            return None
+        return self.string(self.header_start[index], self.header_end[index])
+
+    def header_equals(self, name: bytes, value: bytes) -> bool:
+        '''
+        compares a kept header to a lowercase value case insensitively, without making a string
+        '''
+        index = self.headers.index(name)
+        start = self.header_start[index]
+        if start < 0 or self.header_end[index] - start != len(value):
+            return False
+        return self.matches(start, value, True)
+
+    def query(self, name: str) -> str:
+        '''
+        value of query parameter `name`, '' if it has no value, None if it wasn't sent
+        values aren't percent-decoded
+        '''
+        buf = self.buffer
+        key = name.encode()
+        i = self.path_end + 1
+        end = self.target_end
+        while i < end:
+            pair_end = i
+            while pair_end < end and buf[pair_end] != AMPERSAND:
+                pair_end += 1
+            key_end = i
+            while key_end < pair_end and buf[key_end] != EQUALS:
+                key_end += 1
+            if key_end - i == len(key) and self.matches(i, key):
+                return self.string(min(key_end + 1, pair_end), pair_end)
+            i = pair_end + 1
+        return None
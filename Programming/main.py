@@ -10,50 +10,90 @@ from sensors import Sensors
 from actuators import Actuators
 from monitor import Monitor
 from server2 import Server
-from time import sleep
+from shared_state import SharedState
+from filters import Median, MovingAverage
+from sampler import Sampler
+from history import History
+from datalogger import DataLogger
+from time import sleep, sleep_ms, ticks_ms, ticks_diff
 import _thread
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
 
 print("All System Components Up!\n")
 
-sensors_dict = {
+# rate of the timer sampling the analog sensors
+SAMPLER_FREQ_HZ = 100
+
+# sensors with a trend history on /history, every one costs History.memory() / len(names) bytes
+HISTORY_SENSORS = ('skinTemperature', 'temperature', 'humidity')
+
+# period of the records written to flash, actuator changes are logged right away
+LOG_PERIOD_MS = 10000
+
+# longest the controller sleeps between ticks, bounds the reaction time to new actuator values
+CONTROL_PERIOD_MS = 50
+
+# Published by the controller core, read by the server core
+sensors_state = SharedState({
             'skinTemperature': 0,
             'coverClosed': 0,
             'humidity': 0,
             'temperature': 0,
             'motionSensor': 0,
             'o2Level': 0
-        }
+        })
+
+# Recorded by the controller core, served by the server core
+history = History(HISTORY_SENSORS)
 
-actuators_dict = {
+# Published by the server core, applied by the controller core
+actuators_state = SharedState({
            'autoManualSwitch': 'off',
            'psuControl': 'off',
            'blueLight': 'off',
            'uvLight': 'off',
            'buzzer': 'off',
            'humidifier': 'off'
-       }
+       })
+
+def make_sensors(sampler: Sampler=None) -> Sensors:
+    '''
+    Sensors as wired on the board, sampled by `sampler` if given
+    '''
+    return Sensors(
+            ntc3950_pin = 28,
+            ntc3950_bounds = (23, 28),
+            limit_switch_pin = 27,
+            limit_switch_bounds = (0 , 0),
+            dht22_pin = 16,
+            dht22_temp_bounds = (23, 28),
+            dht22_humidity_bounds = (40, 60),
+            motion_sensor_pin = 26,
+            motion_sensor_bounds = (0 ,0),
+            # the board only routes the module's digital output to GP8, which has no ADC,
+            # readings are -1 until its analog output is rewired to an ADC pin (GP26-28)
+            mq135_pin = 8,
+            mq135_bounds = (300, 1000),  # ppm CO2 equivalent
+            ntc3950_filter = Median(15),
+            mq135_filter = MovingAverage(16),
+            sampler = sampler
+            )
 
 def controller_core():
     '''
     Main Routine for the first core which reads the sensor data 
      and controls the actuators
     '''
-    global sensors_dict
-    global actuators_dict
-
-    sensors = Sensors(
-                ntc3950_pin = 28,
-                ntc3950_bounds = (23, 28),
-                limit_switch_pin = 27,
-                limit_switch_bounds = (0 , 0),
-                dht22_pin = 16,
-                dht22_temp_bounds = (23, 28),
-                dht22_humidity_bounds = (40, 60),
-                motion_sensor_pin = 26,
-                motion_sensor_bounds = (0 ,0),
-                mq135_pin = 8,
-                mq135_bounds = (1 , 100)  #TODO
-                )
+    global sensors_state
+    global actuators_state
+    global history
+
+    sampler = Sampler(SAMPLER_FREQ_HZ)
+    sensors = make_sensors(sampler)
+    sampler.start()
     actuators = Actuators(
                     main_psu_pin = 1,
                     blue_light_pin = 3, 
@@ -62,43 +102,50 @@ def controller_core():
                     humidifier_pin = 7
                     )
     monitor = Monitor(sensors, 19, 18)
+    logger = DataLogger()
+    actuators_version = -1
+    last_log = ticks_ms()
 
     while True:
 
-        # Always read all sensors
-        sensors.read_all()
-        sensors_dict.update(sensors.all_values)
+        # Read the sensors that are due
+        wait_ms = sensors.read_all()
+        sensors_values = sensors.all_values
+        sensors_state.publish(sensors_values)
+        history.add(sensors_values)
+
+        # Update Actuators only when the server published new values
+        log_now = ticks_diff(ticks_ms(), last_log) >= LOG_PERIOD_MS
+        version, actuators_values = actuators_state.read()
+        if version != actuators_version:
+            if actuators.update(actuators_values):
+                log_now = True
+            actuators_version = version
+
+        # Persist to flash, written in page-sized batches
+        if log_now:
+            logger.log(sensors_values, actuators.bitmap)
+            last_log = ticks_ms()
+
+        # Send part of the pending display frame
+        monitor.tick()
+
+        # Sleep until the next sensor deadline
+        sleep_ms(min(wait_ms, CONTROL_PERIOD_MS))
 
-        # Update Actuators
-        actuators.all_values = actuators_dict
-        
 
 def server_core():
     '''
     Main Routine for the second core which is hosts a web app to control and monitor the whole system
 
     '''
-    global sensors_dict
-    global actuators_dict
+    global sensors_state
+    global actuators_state
+    global history
 
-    server = Server()
+    server = Server(use_asyncio=True, sensors_state=sensors_state, actuators_state=actuators_state, history=history)
     # display = ssd1306.SSD1306_I2C(128, 64, I2C(1, scl=Pin(19), sda=Pin(18)))
-    while True:
-
-        # Send latest sensor data
-        server.sensors_dict.update(sensors_dict)
-
-        # Run Server
-        server.wait_for_client()
-        server.handle_html_request(server.identify_html_request())
-
-        # Receive latest Actuator values
-        actuators_dict.update(server.actuators_dict)
-
-        # Toggle LED for User to see
-        server.led.toggle()
-
-        print('\n')
+    asyncio.run(server.run())
 
 def main():
     ### Main Routine  ###
@@ -108,9 +155,7 @@ def main():
     server_core()
 
 
-# ### Main Routine  ###
-sleep(5)
-_thread.start_new_thread(controller_core, ())
-sleep(2)
-server_core()
+# skipped when imported, like by the host simulation
+if __name__ == '__main__':
+    main()
 
@@ -1,28 +1,104 @@
 '''
 Monitor Sensor Values and Actuator States
+    -   Screens are declared as data, a list of Fields per screen
+    -   Labels are rendered once into cached framebuffers and blitted
+    -   Only the value fields that changed are reformatted and redrawn
+    -   The timer only flags a refresh, the drawing and flushing run in `tick()` on the controller core,
+        the timer callbacks and scheduled functions run on the other core and would race the flush
 '''
 from machine import Timer, I2C, Pin
+import framebuf
 import ssd1306
 
+class Field:
+    '''
+    One 'label value' line of a screen
+    '''
+    def __init__(self, label: str, x: int, y: int, sensor: str, fmt):
+        '''
+        :param label: constant text, rendered once
+        :param x, y: position of the label, the value follows it after one space
+        :param sensor: name of the Sensor attribute of Sensors whose latest_value is shown
+        :param fmt: format string for the value, or a tuple indexed by the value
+        '''
+        self.label = label
+        self.x = x
+        self.y = y
+        self.sensor = sensor
+        self.fmt = fmt
+        self.value_x = x + 8 * (len(label) + 1)
+
+    def format(self, value) -> str:
+        if type(self.fmt) is tuple:
+            return self.fmt[1 if value else 0]
+        return self.fmt.format(value)
+
+class Label(framebuf.FrameBuffer):
+    '''
+    Cached rendering of a constant text
+    '''
+    def __init__(self, text: str):
+        self.width = 8 * len(text)
+        self.height = 8
+        self.buffer = bytearray(self.width)
+        super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
+        self.text(text, 0, 0, 1)
+
 class Monitor:
     '''
     Class to Monitor the system sensors and actuators.
     '''
     DEFAULT_TIME_BTW_SCREEN = 5000
-    def __init__(self, sensors, ssd1306_scl_pin: int, ssd1306_sda_pin: int):
-        self.display = ssd1306.SSD1306_I2C(128, 64, I2C(1, scl=Pin(ssd1306_scl_pin), sda=Pin(ssd1306_sda_pin)))
+    DEFAULT_REFRESH_PERIOD = 1000
+    DEFAULT_I2C_FREQ = 400000
+    DEFAULT_FLUSH_BUDGET_US = 3000
+
+    SCREENS = (
+        # First Screen
+        (Field("Skin Temp:", 0, 0, 'ntc3950', "{:.1f}'C"),
+         Field("Cover:", 0, 16, 'limit_switch', ('Closed', 'Opened')),
+         Field("Movement:", 0, 32, 'motion_sensor', ('No', 'Yes')),
+         Field("Air:", 0, 48, 'mq135', "{:.0f}ppm")),
+
+        # Second Screen
+        (Field("Temp:", 0, 0, 'dht22_temp', "{:.1f}'C"),
+         Field("Humidity:", 0, 32, 'dht22_humidity', "{:.1f}%")),
+    )
+
+    def __init__(self, sensors, ssd1306_scl_pin: int, ssd1306_sda_pin: int, refresh_period: int=DEFAULT_REFRESH_PERIOD,
+                 i2c_freq: int=DEFAULT_I2C_FREQ, incremental: bool=True, flush_budget_us: int=DEFAULT_FLUSH_BUDGET_US):
+        '''
+        :param refresh_period: ms between value refreshes, screens switch every DEFAULT_TIME_BTW_SCREEN
+        :param i2c_freq: I2C clock rate of the display bus
+        :param incremental: frames are queued and sent page by page from `tick()` instead of all at once
+        :param flush_budget_us: longest a `tick()` may spend sending pages, one page is always sent
+        '''
+        self.display = ssd1306.SSD1306_I2C(128, 64, I2C(1, scl=Pin(ssd1306_scl_pin), sda=Pin(ssd1306_sda_pin), freq=i2c_freq))
+        self.display.incremental = incremental
+        self.flush_budget_us = flush_budget_us
 
         self.sensors = sensors
+        self.refresh_period = refresh_period
+
+        # labels rendered once for all screens
+        self.labels = [[Label(field.label) for field in screen] for screen in self.SCREENS]
 
-        self._current_screen = True  # two screen
+        # last drawn value and text of every field of the current screen
+        self._values = []
+        self._texts = []
+
+        self._current_screen = len(self.SCREENS) - 1
+        self._ticks = 0
+        self._refresh_due = False  # set by the timer, cleared by tick()
 
         self.run()
 
     def run(self):
         '''
-        prints stuff on screen 
-        ''' 
-        self.timer = Timer(period=self.DEFAULT_TIME_BTW_SCREEN, mode=Timer.PERIODIC, callback=self.show_screen)
+        prints stuff on screen
+        '''
+        self.show_screen(None)
+        self.timer = Timer(period=self.refresh_period, mode=Timer.PERIODIC, callback=self._on_timer)
 
     def stop(self):
         '''
@@ -30,30 +106,67 @@ class Monitor:
         '''
         self.timer.deinit()
 
+    def tick(self) -> bool:
+        '''
+        runs a refresh if the timer flagged one, then sends the queued part of the frame that fits the budget,
+        call every control loop iteration, from the core that created the Monitor
+        returns True once the frame is complete
+        '''
+        if self._refresh_due:
+            self._refresh_due = False
+            self.refresh(None)
+        if self.display.frame_complete:
+            return True
+        return self.display.flush_step(self.flush_budget_us)
+
+    def _on_timer(self, t):
+        '''
+        timer callback, possibly in IRQ context and on the other core, only flags the refresh,
+        a flag set again before tick() cleared it merges the two refreshes
+        '''
+        self._refresh_due = True
+
+    def refresh(self, _):
+        '''
+        switches screen every DEFAULT_TIME_BTW_SCREEN, otherwise redraws the changed values
+        runs from tick()
+        '''
+        self._ticks += self.refresh_period
+        if self._ticks >= self.DEFAULT_TIME_BTW_SCREEN:
+            self._ticks = 0
+            self.show_screen(None)
+        else:
+            self.update_values()
+
     def show_screen(self, t):
         '''
-        Setting First screen with newest saved sensor values
+        Draws the next screen: cached labels and current values
         '''
-        self._current_screen = not self._current_screen
-        if self._current_screen:
+        self._current_screen = (self._current_screen + 1) % len(self.SCREENS)
+        screen = self.SCREENS[self._current_screen]
 
-            # First Screen
-            self.display.fill(0)
+        self.display.fill(0)
+        for field, label in zip(screen, self.labels[self._current_screen]):
+            self.display.blit(label, field.x, field.y)
 
-            self.display.text(f"Skin Temp: {self.sensors.ntc3950.latest_value}'C", 0, 0, 1)
-            cover_state = 'Opened' if self.sensors.limit_switch.latest_value else 'Closed'
-            self.display.text(f"Cover: {cover_state}", 0, 16, 1)
-            motion_sensor_state = 'Yes' if self.sensors.motion_sensor.latest_value else 'No'
-            self.display.text(f"Movement: {motion_sensor_state}", 0, 32, 1)
-            self.display.text(f"O2: {self.sensors.mq135.latest_value}%", 0, 48, 1)
+        self._values = [None] * len(screen)
+        self._texts = [''] * len(screen)
+        self.update_values()
 
-            self.display.show()
+    def update_values(self):
+        '''
+        reformats and redraws only the fields whose value changed, then flushes (or queues) the changed regions
+        '''
+        screen = self.SCREENS[self._current_screen]
+        for i, field in enumerate(screen):
+            value = getattr(self.sensors, field.sensor).latest_value
+            if value == self._values[i]:
+                continue
 
-        else:
+            text = field.format(value)
+            self.display.fill_rect(field.value_x, field.y, 8 * max(len(text), len(self._texts[i])), 8, 0)
+            self.display.text(text, field.value_x, field.y, 1)
+            self._values[i] = value
+            self._texts[i] = text
 
-            # Second Screen
-            self.display.fill(0)
-        
-            self.display.text(f"Temp: {self.sensors.dht22_temp.latest_value} 'C", 0, 0, 1)
-            self.display.text(f"Humidity: {self.sensors.dht22_humidity.latest_value}%", 0, 32, 1)
-            self.display.show()
+        self.display.show()
@@ -10,7 +10,7 @@ More info:
 
 import math
 import time
-from machine import ADC
+from machine import ADC, Pin
 
 class MQ135(object):
     """ Class for dealing with MQ13 Gas Sensors """
@@ -34,9 +34,53 @@ class MQ135(object):
     # Atmospheric CO2 level for calibration purposes
     ATMOCO2 = 397.13
 
+    # Full scale of read_u16
+    ADC_MAX = 65535.
 
-    def __init__(self, pin):
+    # Precomputed terms of the ppm and rzero equations
+    NEG_PARB = -PARB
+    RZERO_FACTOR = math.pow((ATMOCO2/PARA), (1./PARB))
+
+
+    def __init__(self, pin, adc_filter=None, num_samples=1):
+        """
+        pin: ADC pin of the sensor, the ADC object is created once
+             on a pin without ADC only the module's digital output can be read, see gas_detected
+        adc_filter: filters.ADCFilter the raw read_u16 codes go through, None uses the plain average
+        num_samples: number of codes sampled per reading
+        """
         self.pin = pin
+        self.digital = None
+        try:
+            self.adc = ADC(pin)
+        except ValueError:
+            # only GP26-29 have an ADC, readings return -1
+            self.adc = None
+            self.digital = Pin(pin, Pin.IN)
+        self.adc_filter = adc_filter
+        self.num_samples = num_samples
+        self.sample_channel = None  # sampler.SampleChannel, if set readings drain it instead of reading the ADC
+
+    def read_code(self):
+        """Returns the raw read_u16 code, filtered or averaged over num_samples"""
+        if self.sample_channel is not None:
+            return self.sample_channel.drain(self.adc_filter)
+
+        if self.adc_filter is not None:
+            return self.adc_filter.sample(self.adc, self.num_samples)
+
+        total = 0
+        for _ in range(self.num_samples):
+            total += self.adc.read_u16()
+        return total // self.num_samples
+
+    def gas_detected(self):
+        """True while the module's digital output is past the threshold set by its potentiometer,
+        None if the sensor is read through the ADC"""
+        if self.digital is None:
+            return None
+        # the comparator output is active low
+        return self.digital.value() == 0
 
     def get_correction_factor(self, temperature, humidity):
         """Calculates the correction factor for ambient air temperature and relative humidity
@@ -52,13 +96,16 @@ class MQ135(object):
         return self.CORE * temperature + self.CORF * humidity + self.CORG
 
     def get_resistance(self):
-        """Returns the resistance of the sensor in kOhms // -1 if not value got in pin"""
-        adc = ADC(self.pin)
-        value = adc.read()
-        if value == 0:
+        """Returns the resistance of the sensor in kOhms // -1 if not value got in pin
+        or the code is at full scale, where the resistance is 0"""
+        if self.adc is None:
             return -1
 
-        return (1023./value - 1.) * self.RLOAD
+        value = self.read_code()
+        if value <= 0 or value >= self.ADC_MAX:
+            return -1
+
+        return (self.ADC_MAX/value - 1.) * self.RLOAD
 
     def get_corrected_resistance(self, temperature, humidity):
         """Gets the resistance of the sensor corrected for temperature/humidity"""
@@ -66,21 +113,32 @@ class MQ135(object):
 
     def get_ppm(self):
         """Returns the ppm of CO2 sensed (assuming only CO2 in the air)"""
-        return self.PARA * math.pow((self.get_resistance()/ self.RZERO), -self.PARB)
+        return self.PARA * math.pow((self.get_resistance()/ self.RZERO), self.NEG_PARB)
 
     def get_corrected_ppm(self, temperature, humidity):
         """Returns the ppm of CO2 sensed (assuming only CO2 in the air)
         corrected for temperature/humidity"""
-        return self.PARA * math.pow((self.get_corrected_resistance(temperature, humidity)/ self.RZERO), -self.PARB)
+        return self.PARA * math.pow((self.get_corrected_resistance(temperature, humidity)/ self.RZERO), self.NEG_PARB)
+
+    def read_corrected_ppm(self, temperature, humidity):
+        """Samples the sensor once and returns the ppm corrected for temperature/humidity,
+        -1 if no value got in pin or the reading is out of the range of the curve"""
+        resistance = self.get_resistance()
+        correction = self.get_correction_factor(temperature, humidity)
+        if resistance < 0 or correction <= 0:
+            return -1
+
+        resistance /= correction
+        return self.PARA * math.pow((resistance/ self.RZERO), self.NEG_PARB)
 
     def get_rzero(self):
         """Returns the resistance RZero of the sensor (in kOhms) for calibratioin purposes"""
-        return self.get_resistance() * math.pow((self.ATMOCO2/self.PARA), (1./self.PARB))
+        return self.get_resistance() * self.RZERO_FACTOR
 
     def get_corrected_rzero(self, temperature, humidity):
         """Returns the resistance RZero of the sensor (in kOhms) for calibration purposes
         corrected for temperature/humidity"""
-        return self.get_corrected_resistance(temperature, humidity) * math.pow((self.ATMOCO2/self.PARA), (1./self.PARB))
+        return self.get_corrected_resistance(temperature, humidity) * self.RZERO_FACTOR
 
 
 def mq135lib_example():
@@ -89,7 +147,7 @@ def mq135lib_example():
     temperature = 21.0
     humidity = 25.0
 
-    mq135 = MQ135(0) # analog PIN 0
+    mq135 = MQ135(26) # analog PIN 0 (GP26)
 
     # loop
     while True:
@@ -3,12 +3,19 @@ Interfacing the NTC3950
 '''
 from machine import Pin, ADC
 from math import log
+from array import array
 
 class Thermistor:
     '''
     Class to read and process Thermistor
     '''
-    def __init__(self, adc_pin, R_divider, Vcc, num_samples, B_factor, R_nominal, room_temp):
+    ADC_MAX = 65534  # full scale used by read_V
+    LUT_MAX_BITS = 10
+    LUT_TEMP_RANGE = (-40, 125)  # rated range of the NTC3950, the LUT error bound is checked inside it
+    # the boot check samples every interval at its quarters, which catches the interpolation error
+    # but not the codes where the integer interpolation rounds down, by less than 1 centi 'C
+    LUT_FLOOR_ERROR = 0.01
+    def __init__(self, adc_pin, R_divider, Vcc, num_samples, B_factor, R_nominal, room_temp, lut_bits=None, lut_max_error=0.05, adc_filter=None):
         '''
 
         :param Vcc: Vcc of micropython board, measure with multimeter to get exact value for more accuracy
@@ -16,6 +23,12 @@ class Thermistor:
         :param num_samples: the number of samples to average for every average_reading
         :param B_factor: also known as thermistor factor, value from datasheet
         :param R_nominal: Thermistor resistance value at room temperature
+        :param lut_bits: enables the lookup table mode with 2**lut_bits intervals over the raw read_u16 range,
+                         None computes every reading with Steinhart-Hart
+        :param lut_max_error: max allowed LUT error in 'C inside LUT_TEMP_RANGE,
+                              the table is doubled in size up to LUT_MAX_BITS until it's met
+        :param adc_filter: filters.ADCFilter the 'num_samples' raw codes of every reading go through,
+                           None takes their plain average
         '''
         # User defined attributes
         self.adc = ADC(Pin(adc_pin))
@@ -25,6 +38,8 @@ class Thermistor:
         self.Vcc = Vcc
         self.R_divider = R_divider
         self.num_samples = num_samples
+        self.adc_filter = adc_filter
+        self.sample_channel = None  # sampler.SampleChannel, if set readings drain it instead of reading the ADC
         self.B_factor = B_factor
         self.R_nominal = R_nominal
         self.room_temp = room_temp + 273.15
@@ -33,6 +48,69 @@ class Thermistor:
         self.room_temp_inv = 1/self.room_temp
         self.B_factor_inv = 1/self.B_factor
 
+        # lookup table mode
+        self.lut = None
+        self.lut_error_bound = None
+        if lut_bits is not None:
+            self.init_lut(lut_bits, lut_max_error)
+
+    def init_lut(self, lut_bits: int, lut_max_error: float):
+        '''
+        builds the smallest table from lut_bits up to LUT_MAX_BITS that stays within lut_max_error
+        '''
+        while True:
+            self.build_lut(lut_bits)
+            self.lut_error_bound = self.lut_error(self.lut_step >> 2) + self.LUT_FLOOR_ERROR
+            if self.lut_error_bound <= lut_max_error or lut_bits >= self.LUT_MAX_BITS:
+                break
+            lut_bits += 1
+
+        if self.lut_error_bound > lut_max_error:
+            print(f"NTC LUT error {self.lut_error_bound}'C above bound {lut_max_error}'C")
+
+    def build_lut(self, lut_bits: int):
+        '''
+        table of temperatures in centi 'C at every lut_step raw code, one extra entry for interpolating the last interval
+        '''
+        self.lut_shift = 16 - lut_bits
+        self.lut_step = 1 << self.lut_shift
+        self.lut_mask = self.lut_step - 1
+
+        size = (1 << lut_bits) + 1
+        self.lut = array('i', bytes(4 * size))
+        for i in range(size):
+            self.lut[i] = int(round(self.code_to_T(i << self.lut_shift) * 100))
+
+    def code_to_T(self, code: int) -> float:
+        '''
+        exact simplified Steinhart-Hart temperature of a raw read_u16 code, codes are clamped to the valid range
+        '''
+        code = min(max(code, 1), self.ADC_MAX - 1)
+        R = (self.R_divider*code)/(self.ADC_MAX-code)
+        return 1/(self.room_temp_inv + self.B_factor_inv*log(R/self.R_nominal)) - 273.15
+
+    def lookup_T(self, code: int) -> int:
+        '''
+        temperature in centi 'C of a raw read_u16 code by linear interpolation between the LUT entries
+        '''
+        i = code >> self.lut_shift
+        T0 = self.lut[i]
+        return T0 + (((self.lut[i + 1] - T0) * (code & self.lut_mask)) >> self.lut_shift)
+
+    def lut_error(self, stride: int=1) -> float:
+        '''
+        max abs difference in 'C between the LUT and the exact equation
+        over every stride-th raw code whose exact temperature is inside LUT_TEMP_RANGE
+        '''
+        T_min, T_max = self.LUT_TEMP_RANGE
+        error = 0
+        for code in range(0, 65536, max(stride, 1)):
+            T = self.code_to_T(code)
+            if T_min <= T <= T_max:
+                error = max(error, abs(self.lookup_T(code)/100 - T))
+
+        return error
+
     def read_V(self):
         '''
         returns voltage value read 
@@ -41,13 +119,9 @@ class Thermistor:
 
     def read_V_averaged(self):
         '''
-        reads 'num_samples' voltage samples then return average V
+        reads 'num_samples' voltage samples then return average (or filtered) V
         '''
-        samples = []
-        for _ in range(self.num_samples):
-            samples.append(self.read_V())
-
-        return sum(samples)/self.num_samples
+        return ((self.read_code_averaged()*self.Vcc)/self.ADC_MAX)
 
     def read_R(self):
         '''
@@ -63,10 +137,31 @@ class Thermistor:
         Vi = self.read_V_averaged()
         return ((self.R_divider*Vi)/(self.Vcc-Vi))
 
+    def read_code_averaged(self) -> int:
+        '''
+        reads 'num_samples' raw read_u16 codes then return their integer average,
+        or the output of adc_filter if one is set
+        '''
+        if self.sample_channel is not None:
+            return self.sample_channel.drain(self.adc_filter)
+
+        if self.adc_filter is not None:
+            return self.adc_filter.sample(self.adc, self.num_samples)
+
+        total = 0
+        for _ in range(self.num_samples):
+            total += self.adc.read_u16()
+
+        return total // self.num_samples
+
     def read_T(self):
         '''
-        reads temperature using simplified B parameter Steinhard-Hart equations
+        reads temperature using simplified B parameter Steinhard-Hart equations,
+        or the lookup table if enabled
         '''
+        if self.lut is not None:
+            return self.lookup_T(self.read_code_averaged()) / 100
+
         try:
             T_inverse = self.room_temp_inv + self.B_factor_inv*log(self.read_R_averaged()/self.R_nominal)
             T_celcuis = 1/T_inverse - 273.15
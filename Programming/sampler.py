@@ -0,0 +1,136 @@
+'''
+Timer Driven Sampling
+    -   A machine.Timer fires at a fixed rate and schedules the capture with micropython.schedule
+    -   Each channel captures raw ADC codes or pin values into a preallocated ring buffer,
+        at the timer rate divided by its divider
+    -   Consumers drain the samples in bulk, samples overwritten before being drained are counted
+    -   Captures run on the core that runs the scheduler, drains on the controller core,
+        the ring position and count are only changed under the channel lock
+'''
+from machine import Timer
+from array import array
+import micropython
+import _thread
+
+ITEM_SIZES = {'b': 1, 'B': 1, 'h': 2, 'H': 2, 'i': 4, 'I': 4}
+
+class SampleChannel:
+    '''
+    Ring buffer filled by the Sampler with one source
+    '''
+    def __init__(self, read: callable, size: int, divider: int=1, typecode: str='H'):
+        '''
+        :param read: returns one raw sample, like ADC.read_u16 or Pin.value
+        :param size: number of samples the ring buffer holds
+        :param divider: captures on every divider-th timer tick
+        :param typecode: array typecode of the samples
+        '''
+        self.read = read
+        self.size = size
+        self.divider = divider
+        self.buffer = array(typecode, bytes(ITEM_SIZES[typecode] * size))
+        self.head = 0  # next slot to write
+        self.count = 0  # samples not drained yet
+        self.captured = 0  # total samples captured
+        self.overflows = 0  # samples overwritten before being drained
+        self.value = 0  # latest drained value
+        self._lock = _thread.allocate_lock()
+
+    def capture(self):
+        '''
+        stores one sample, overwrites the oldest undrained one if the buffer is full
+        '''
+        self.buffer[self.head] = self.read()
+        with self._lock:
+            self.head += 1
+            if self.head == self.size:
+                self.head = 0
+            self.captured += 1
+
+            if self.count == self.size:
+                self.overflows += 1
+            else:
+                self.count += 1
+
+    def drain(self, adc_filter=None) -> int:
+        '''
+        consumes every undrained sample, oldest first
+        returns the value of adc_filter after adding them, or their integer mean without a filter
+        returns the previous value if nothing was captured since the last drain
+        '''
+        with self._lock:
+            n = self.count
+            head = self.head
+        if not n:
+            return self.value
+
+        i = head - n
+        if i < 0:
+            i += self.size
+        total = 0
+        for _ in range(n):
+            if adc_filter is not None:
+                adc_filter.add(self.buffer[i])
+            else:
+                total += self.buffer[i]
+            i += 1
+            if i == self.size:
+                i = 0
+
+        # samples captured meanwhile stay in count
+        with self._lock:
+            self.count -= n
+        self.value = adc_filter.value if adc_filter is not None else total // n
+        return self.value
+
+class Sampler:
+    '''
+    Captures every channel at an exact rate from a periodic timer
+    '''
+    def __init__(self, freq_hz: int, timer=None):
+        '''
+        :param freq_hz: timer rate, the fastest channel rate
+        :param timer: object with the machine.Timer init/deinit API, defaults to a new virtual machine.Timer
+        '''
+        self.freq_hz = freq_hz
+        self.timer = timer
+        self.channels = []
+        self.ticks = 0
+        self.missed = 0  # timer ticks lost because the schedule queue was full
+
+        # bound method allocated once, the timer callback must not allocate
+        self._capture_ref = self.capture
+
+    def add_channel(self, read: callable, size: int, divider: int=1, typecode: str='H') -> SampleChannel:
+        '''
+        adds a source sampled at freq_hz / divider, returns its channel to drain
+        '''
+        channel = SampleChannel(read, size, divider, typecode)
+        self.channels.append(channel)
+        return channel
+
+    def start(self):
+        if self.timer is None:
+            self.timer = Timer()
+        self.timer.init(freq=self.freq_hz, mode=Timer.PERIODIC, callback=self._on_timer)
+
+    def stop(self):
+        self.timer.deinit()
+
+    def _on_timer(self, t):
+        '''
+        timer callback, possibly in IRQ context, defers the capture
+        '''
+        try:
+            micropython.schedule(self._capture_ref, None)
+        except RuntimeError:
+            self.missed += 1
+
+    def capture(self, _):
+        '''
+        one timer tick in scheduled context
+        '''
+        self.ticks += 1
+        for channel in self.channels:
+            if self.ticks % channel.divider == 0:
+                channel.capture()
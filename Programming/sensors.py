@@ -7,18 +7,20 @@ import time
 from dht import DHT22
 from mq135 import MQ135
 from ntc3950 import Thermistor
-import random
+from filters import ADCFilter
+from sampler import Sampler
 
 class Sensor:
     '''
     Abstract Sensor Object
     '''
-    def __init__(self, handler, read: callable, limits: tuple[int, int]):
+    def __init__(self, handler, read: callable, limits: tuple[int, int], period_ms: int=0):
         '''
         Constructor for any sensor object to unify usage
         : param handler could be any object that is responsible to process the sensor
         :param read: the unified read function that reads whatever sensor it is
         :param limits: the lower and uppoer bounds that the sensor should be in
+        :param period_ms: sampling period, the sensor is read by `Sensors.read_all` only once its deadline passed
         '''
         self.handler = handler 
         self.read = read
@@ -27,6 +29,25 @@ class Sensor:
         self.lower_limit = limits[0]
         self.upper_limit = limits[1]
 
+        self.period_ms = period_ms
+        self.deadline = time.ticks_ms()
+
+    def due(self, now: int) -> bool:
+        '''
+        True if the deadline passed at ticks_ms `now`
+        '''
+        return time.ticks_diff(self.deadline, now) <= 0
+
+    def tick(self, now: int):
+        '''
+        reads the sensor and moves the deadline one period ahead,
+        a sensor that fell more than a period behind is rescheduled from now instead of catching up
+        '''
+        self.read()
+        self.deadline = time.ticks_add(self.deadline, self.period_ms)
+        if time.ticks_diff(self.deadline, now) <= 0:
+            self.deadline = time.ticks_add(now, self.period_ms)
+
     def keep_reading(self, delay_ms: int=200):
         '''
         keep printing sensor values, usually for testing
@@ -43,13 +64,58 @@ class Sensor:
         except Exception as e:
             print(f"Error: {e}")
 
+class SharedMeasurement:
+    '''
+    Handler shared by several Sensor channels, like the DHT22 temperature and humidity
+    One measurement populates all channels and is reused until it is older than ttl_ms
+    '''
+    def __init__(self, handler, measure: callable, ttl_ms: int):
+        '''
+        :param handler: the device object the channels read their values from
+        :param measure: func that makes the device take a new measurement
+        :param ttl_ms: how long a measurement is reused, usually the minimum interval of the device
+        '''
+        self.handler = handler
+        self.measure = measure
+        self.ttl_ms = ttl_ms
+        self.timestamp = None
+
+    def refresh(self):
+        '''
+        measures again if the cached measurement expired, returns the handler to read the channels from
+        '''
+        now = time.ticks_ms()
+        if self.timestamp is None or time.ticks_diff(now, self.timestamp) >= self.ttl_ms:
+            self.measure()
+            self.timestamp = now
+
+        return self.handler
+
 class Sensors:
     '''
     Sensors Object to read all sensor objects
     '''
-    def __init__(self, ntc3950_pin: int, ntc3950_bounds: tuple[int, int], limit_switch_pin: int, limit_switch_bounds: tuple[int, int], dht22_pin: int, dht22_temp_bounds: tuple[int, int], dht22_humidity_bounds: tuple[int, int], motion_sensor_pin: int, motion_sensor_bounds: tuple[int, int], mq135_pin: int, mq135_bounds: tuple[int, int]):
+    # sampling periods
+    NTC3950_PERIOD_MS = 250
+    LIMIT_SWITCH_PERIOD_MS = 50
+    DHT22_MIN_INTERVAL_MS = 2000  # DHT22 can't be measured more often than every 2s
+    DHT22_PERIOD_MS = 2500  # margin over the min interval so a late tick doesn't hit a still valid cached measurement
+    MOTION_SENSOR_PERIOD_MS = 50
+    MQ135_PERIOD_MS = 1000
+    MQ135_NUM_SAMPLES = 4
+
+    # timer sampling, dividers of the sampler rate and ring buffer sizes
+    NTC3950_SAMPLE_DIVIDER = 1
+    NTC3950_SAMPLE_BUFFER = 64
+    MQ135_SAMPLE_DIVIDER = 10
+    MQ135_SAMPLE_BUFFER = 32
+    MAX_IDLE_MS = 1000
+    def __init__(self, ntc3950_pin: int, ntc3950_bounds: tuple[int, int], limit_switch_pin: int, limit_switch_bounds: tuple[int, int], dht22_pin: int, dht22_temp_bounds: tuple[int, int], dht22_humidity_bounds: tuple[int, int], motion_sensor_pin: int, motion_sensor_bounds: tuple[int, int], mq135_pin: int, mq135_bounds: tuple[int, int], ntc3950_filter: ADCFilter=None, mq135_filter: ADCFilter=None, sampler: Sampler=None):
         '''
         constructor of all sensors
+        :param ntc3950_filter: filters.ADCFilter for the raw thermistor codes, None averages every reading's samples
+        :param mq135_filter: filters.ADCFilter for the raw MQ135 codes, None averages every reading's samples
+        :param sampler: if given the analog sensors are sampled by its timer and their reads drain the captured samples
         '''
         self.ntc3950 = Sensor(Thermistor(ntc3950_pin,
                                          100200,
@@ -57,30 +123,55 @@ class Sensors:
                                          5,
                                          3950,
                                          100000,
-                                         25),
+                                         25,
+                                         lut_bits=8,
+                                         adc_filter=ntc3950_filter),
                                 self.ntc3950_read,
-                                ntc3950_bounds)
+                                ntc3950_bounds,
+                                self.NTC3950_PERIOD_MS)
+
+        self.limit_switch = Sensor(Pin(limit_switch_pin, Pin.IN, Pin.PULL_DOWN), self.limit_switch_read, limit_switch_bounds, self.LIMIT_SWITCH_PERIOD_MS)
 
-        self.limit_switch = Sensor(Pin(limit_switch_pin, Pin.IN, Pin.PULL_DOWN), self.limit_switch_read, limit_switch_bounds)
+        # two sensors sharing one measurement
+        dht22 = DHT22(Pin(dht22_pin))
+        self._dht22_handler = SharedMeasurement(dht22, dht22.measure, self.DHT22_MIN_INTERVAL_MS)
+        self.dht22_temp = Sensor(self._dht22_handler, self.dht22_temp_read, dht22_temp_bounds, self.DHT22_PERIOD_MS)
+        self.dht22_humidity = Sensor(self._dht22_handler, self.dht22_humidity_read, dht22_humidity_bounds, self.DHT22_PERIOD_MS)
 
-        # two sensors sharing one handler
-        self._dht22_handler = DHT22(Pin(dht22_pin))
-        self.dht22_temp = Sensor(self._dht22_handler, self.dht22_temp_read, dht22_temp_bounds)
-        self.dht22_humidity = Sensor(self._dht22_handler, self.dht22_humidity_read, dht22_humidity_bounds)
+        self.motion_sensor = Sensor(Pin(motion_sensor_pin, Pin.IN), self.motion_sensor_read, motion_sensor_bounds, self.MOTION_SENSOR_PERIOD_MS)
 
-        self.motion_sensor = Sensor(Pin(motion_sensor_pin, Pin.IN), self.motion_sensor_read, motion_sensor_bounds)
+        self.mq135 = Sensor(MQ135(mq135_pin, mq135_filter, self.MQ135_NUM_SAMPLES), self.mq135_read, mq135_bounds, self.MQ135_PERIOD_MS)
 
-        self.mq135 = Sensor(MQ135(mq135_pin), self.mq135_read, mq135_bounds)
+        if sampler is not None:
+            self.ntc3950.handler.sample_channel = sampler.add_channel(self.ntc3950.handler.adc.read_u16, self.NTC3950_SAMPLE_BUFFER, self.NTC3950_SAMPLE_DIVIDER)
+            if self.mq135.handler.adc is not None:
+                self.mq135.handler.sample_channel = sampler.add_channel(self.mq135.handler.adc.read_u16, self.MQ135_SAMPLE_BUFFER, self.MQ135_SAMPLE_DIVIDER)
 
         # Grouping the sensors
         self.all_sensors = [self.ntc3950, self.limit_switch, self.dht22_temp, self.dht22_humidity, self.motion_sensor, self.mq135]
 
-    def read_all(self):
+    def read_all(self) -> int:
         '''
-        reads all sensor data and saves them to the latest_value variable
+        one scheduler tick, reads the sensors that are due and saves them to the latest_value variable
+        returns the ms until the next deadline, so the caller can sleep until then
         '''
+        now = time.ticks_ms()
         for sensor in self.all_sensors:
-            sensor.read()
+            if sensor.due(now):
+                sensor.tick(now)
+
+        return self.time_to_next_deadline()
+
+    def time_to_next_deadline(self) -> int:
+        '''
+        ms until the earliest sensor deadline, 0 if one is already due
+        '''
+        now = time.ticks_ms()
+        wait = self.MAX_IDLE_MS
+        for sensor in self.all_sensors:
+            wait = min(wait, time.ticks_diff(sensor.deadline, now))
+
+        return max(wait, 0)
 
     def ntc3950_read(self):
         '''
@@ -100,16 +191,14 @@ class Sensors:
         '''
         DHT22 Temperature reading
         '''
-        self.dht22_temp.handler.measure()
-        self.dht22_temp.latest_value = self.dht22_temp.handler.temperature()
+        self.dht22_temp.latest_value = self.dht22_temp.handler.refresh().temperature()
         return self.dht22_temp.latest_value
         
     def dht22_humidity_read(self):
         '''
         DHT22 Humidity reading
         '''
-        self.dht22_humidity.handler.measure()
-        self.dht22_humidity.latest_value = self.dht22_humidity.handler.humidity()
+        self.dht22_humidity.latest_value = self.dht22_humidity.handler.refresh().humidity()
         return self.dht22_humidity.latest_value
  
     def motion_sensor_read(self):
@@ -121,9 +210,11 @@ class Sensors:
 
     def mq135_read(self):
         '''
-        MQ135 reading
+        MQ135 reading, air quality in ppm CO2 equivalent
+        corrected with the cached DHT22 temperature and humidity, -1 without an analog reading
         '''
-        self.mq135.latest_value = (random.getrandbits(3) + 201)/10
+        ppm = self.mq135.handler.read_corrected_ppm(self.dht22_temp.latest_value, self.dht22_humidity.latest_value)
+        self.mq135.latest_value = round(ppm, 1)
         return self.mq135.latest_value
 
     @property
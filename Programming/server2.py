@@ -12,11 +12,27 @@ import socket
 import json
 from time import sleep, sleep_ms
 import random
+from static import StaticAssets
+from shared_state import SharedState
+from history import History
+from httpparser import RequestParser, HTTPError
+from telemetry import Telemetry
+from actuators import Actuators
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
 
 class HTML_REQUEST:
     GET_SENSOR_ACTUATOR = 0
     POST_SWITCH = 1
     GET_WEB = 2
+    GET_EVENTS = 3
+    GET_HISTORY = 4
+    BAD_REQUEST = 5
+    GET_TELEMETRY = 6
+    GET_TELEMETRY_SCHEMA = 7
+    POST_ACTUATORS = 8
 
 class Server:
     # Access Point Parameters
@@ -25,47 +41,202 @@ class Server:
 
     JAVASCRIPT_TO_PYTHON = {'on': 1, 'off': 0}
     DEFAULT_WEB_NAME = 'index.html'
-    def __init__(self):
+    WEB_FILES = (DEFAULT_WEB_NAME,)
+    STATIC_RAM_BUDGET = 8192
+    DEFAULT_BACKLOG = 4
+    REQUEST_TIMEOUT = 5  # seconds a client gets to send its whole request in asyncio mode
+    REQUEST_PARSERS = 4  # requests read concurrently in asyncio mode, each parser holds its own buffer
+    # kept-alive connections hold a parser and an lwIP pcb with its buffers while idle,
+    # one parser is always left for new connections
+    MAX_KEEPALIVE = REQUEST_PARSERS - 1
+    KEEPALIVE_TIMEOUT = 5  # seconds a kept-alive connection may stay idle, above the 1s dashboard poll
+    KEEPALIVE_MAX_REQUESTS = 100  # requests served on one connection before it's closed
+    VALUES_BUFFER_SIZE = 1024  # holds the cached /get_values responses, grown if they ever need more
+    # ids POST /actuators accepts, the outputs and the mode switch, and their states
+    ACTUATOR_IDS = Actuators.IDS + ('autoManualSwitch',)
+    ACTUATOR_STATES = ('on', 'off')
+    MAX_EVENT_STREAMS = 4
+    EVENTS_POLL_PERIOD = 0.1  # seconds between checks for newly published values
+    EVENTS_KEEPALIVE = 15  # seconds of silence before a comment line is sent to detect dead clients
+    def __init__(self, backlog: int=DEFAULT_BACKLOG, use_asyncio: bool=False, sensors_state: SharedState=None, actuators_state: SharedState=None, history: History=None):
         '''
         initiate server
+        :param backlog: number of pending connections the listening socket queues
+        :param use_asyncio: serve many clients concurrently through `run()` instead of
+                            the blocking `wait_for_client()` loop
+        :param sensors_state: sensor values published by the controller core
+        :param actuators_state: actuator values the server publishes to the controller core
+        :param history: sensor history recorded by the controller core, served on /history
         '''
+        self.backlog = backlog
+        self.use_asyncio = use_asyncio
+
         self.led = Pin("LED", Pin.OUT)  # on-board LED to show state
         self.led.off()
 
+        # only these files can ever be served
+        self.assets = StaticAssets(self.WEB_FILES, self.STATIC_RAM_BUDGET)
+
         self.reset()
         #TODO: implement try except block to avoid redefining socket
         self.init_access_point()
-        self.init_socket()
+        if not self.use_asyncio:
+            # asyncio mode binds its own listening socket in `start()`
+            self.init_socket()
 
-        self.sensors_dict = {
+        self.sensors_state = sensors_state if sensors_state is not None else SharedState({
                     'skinTemperature': 0,
                     'coverClosed': 0,
                     'humidity': 0,
                     'temperature': 0,
                     'motionSensor': 0,
                     'o2Level': 0
-                }
+                })
 
-        self.actuators_dict = {
+        self.actuators_state = actuators_state if actuators_state is not None else SharedState({
                'autoManualSwitch': 'off',
                'psuControl': 'off',
                'blueLight': 'off',
                'uvLight': 'off',
                'buzzer': 'off',
                'humidifier': 'off'
-               }
+               })
+
+        self.history = history
+        self.event_streams = 0
+
+        # request of the blocking mode, in asyncio mode the one being handled
+        self.parser = RequestParser()
+        self.error: HTTPError = None
+        self.keep_alive = False  # whether the connection stays open after the current response
+        self.keepalive_connections = 0
+        # rest of the current response, set by handlers whose body is sent in chunks after the head,
+        # asyncio mode drains the writer after every chunk so big bodies never pile up in RAM
+        self.body_chunks = None
+
+        # new on every boot, in the ETags and seqs so the ones handed out before a reboot never match
+        self.boot = random.getrandbits(32)
+        self.boot_id = f'{self.boot:08x}'
+
+        # /get_values responses, serialized once per values version and sent as they are
+        self.values_buffer = bytearray(self.VALUES_BUFFER_SIZE)
+        self.values_cache_version = -1
+        self.values_etag = b''
+        self.values_responses = None  # memoryviews of (200, 304) x (keep-alive, close) responses
+
+        # values version every field last changed at, for /get_values?since=<seq>
+        self.values_seen = {}
+        self.values_changed = {}
+        self.values_seen_version = -1
+        self.values_base_version = -1  # changes before it aren't known, older clients get a full snapshot
+        self.delta_cache = (None, None, None)  # (since, version, body) of the latest delta
+
+        self.telemetry = Telemetry(self.boot)
+        self.free_parsers = [RequestParser() for _ in range(self.REQUEST_PARSERS)] if self.use_asyncio else []
 
         self.IDENTIFY_HTML_REQUEST = {
                 'GET /': HTML_REQUEST.GET_WEB,
                 'GET /get_values': HTML_REQUEST.GET_SENSOR_ACTUATOR,
-                'POST /set_switch_state': HTML_REQUEST.POST_SWITCH
+                'POST /set_switch_state': HTML_REQUEST.POST_SWITCH,
+                'POST /actuators': HTML_REQUEST.POST_ACTUATORS,
+                'GET /telemetry.bin': HTML_REQUEST.GET_TELEMETRY,
+                'GET /telemetry/schema': HTML_REQUEST.GET_TELEMETRY_SCHEMA
                 } 
+        for web_name in self.assets.names:
+            self.IDENTIFY_HTML_REQUEST['GET /' + web_name] = HTML_REQUEST.GET_WEB
 
         self.HANDLE_HTML_REQUEST = {
                 HTML_REQUEST.GET_SENSOR_ACTUATOR: self.handle_get_values,
                 HTML_REQUEST.POST_SWITCH: self.handle_post_switch,
-                HTML_REQUEST.GET_WEB: self.handle_get_web
+                HTML_REQUEST.POST_ACTUATORS: self.handle_post_actuators,
+                HTML_REQUEST.GET_WEB: self.handle_get_web,
+                HTML_REQUEST.BAD_REQUEST: self.handle_bad_request,
+                HTML_REQUEST.GET_TELEMETRY: self.handle_get_telemetry,
+                HTML_REQUEST.GET_TELEMETRY_SCHEMA: self.handle_get_telemetry_schema
                 }
+
+        if self.history is not None:
+            self.IDENTIFY_HTML_REQUEST['GET /history'] = HTML_REQUEST.GET_HISTORY
+            self.HANDLE_HTML_REQUEST[HTML_REQUEST.GET_HISTORY] = self.handle_get_history
+
+        # long lived requests, only served in asyncio mode
+        self.HANDLE_STREAM_REQUEST = {}
+        if self.use_asyncio:
+            self.IDENTIFY_HTML_REQUEST['GET /events'] = HTML_REQUEST.GET_EVENTS
+            self.HANDLE_STREAM_REQUEST[HTML_REQUEST.GET_EVENTS] = self.handle_get_events
+
+    @property
+    def sensors_dict(self) -> dict:
+        '''
+        latest published sensor values, read only
+        '''
+        return self.sensors_state.snapshot
+
+    @property
+    def actuators_dict(self) -> dict:
+        '''
+        latest actuator values, read only, changed through actuators_state
+        '''
+        return self.actuators_state.snapshot
+
+    @property
+    def values_version(self) -> int:
+        '''
+        changes whenever sensor or actuator values change
+        '''
+        return self.sensors_state.version + self.actuators_state.version
+
+    def all_values(self) -> dict:
+        '''
+        returns a new dict with all sensor and actuator values
+        '''
+        values = dict(self.sensors_dict)
+        values.update(self.actuators_dict)
+        return values
+
+    def values_json(self, sensors: dict=None, actuators: dict=None) -> str:
+        '''
+        JSON of all sensor and actuator values, serialized straight from the two snapshots
+        :param sensors, actuators: snapshots to serialize, default to the latest
+        '''
+        sensors = json.dumps(self.sensors_dict if sensors is None else sensors)
+        actuators = json.dumps(self.actuators_dict if actuators is None else actuators)
+        return sensors[:-1] + ', ' + actuators[1:]
+
+    def build_values_responses(self):
+        '''
+        serializes the /get_values responses of the current values into values_buffer,
+        the ETag is the boot id and the values version they were read at
+        '''
+        sensors_version, sensors = self.sensors_state.read()
+        actuators_version, actuators = self.actuators_state.read()
+        version = sensors_version + actuators_version
+        etag = f'"{self.boot_id}-{version}"'
+        body = self.values_json(sensors, actuators).encode()
+
+        parts = []
+        for head, content in ((f'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nETag: {etag}\r\nCache-Control: no-cache\r\nContent-Length: {len(body)}\r\n', body),
+                              (f'HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\n', b'')):
+            head = head.encode()
+            for connection in (b'Connection: keep-alive\r\n\r\n', b'Connection: close\r\n\r\n'):
+                parts.append((head, connection, content))
+
+        size = sum(len(head) + len(connection) + len(content) for head, connection, content in parts)
+        if size > len(self.values_buffer):
+            self.values_buffer = bytearray(size)
+        view = memoryview(self.values_buffer)
+        responses = []
+        offset = 0
+        for response in parts:
+            start = offset
+            for part in response:
+                view[offset:offset + len(part)] = part
+                offset += len(part)
+            responses.append(view[start:offset])
+
+        self.values_responses = tuple(responses)
+        self.values_etag = etag.encode()
+        self.values_cache_version = version
  
     def reset(self):
         '''
@@ -104,7 +275,7 @@ class Server:
             self.s = socket.socket()
             self.s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.s.bind(self.addr)
-            self.s.listen(1)  # Reduce the backlog to minimize memory usage
+            self.s.listen(self.backlog)
             print('Listening on', self.addr)
         except OSError as e:
             print(f"Caught: {e}")
@@ -131,77 +302,235 @@ class Server:
         return what HTML request is given. 
         Every HTML request must be mapped to a function that handles it.
         '''
-        # try:
-        self.request = self.client.recv(1024).decode()
-        
-        tmp = self.request.split(' ')
+        self.parser.reset()
+        self.error = None
+        self.keep_alive = False  # one client at a time, the connection is closed after every response
+        try:
+            if not self.parser.read(self.client):
+                return HTML_REQUEST.BAD_REQUEST
+        except HTTPError as e:
+            self.error = e
+            return HTML_REQUEST.BAD_REQUEST
 
-        if len(tmp) > 1:
-            tmp = tmp[0] + ' ' + tmp[1]
-        else:
-            tmp = tmp[0]
+        return self.identify_request(self.parser)
 
-        return self.IDENTIFY_HTML_REQUEST.get(tmp, None)
-        # except Exception as e:
-        #     print(f"Caught in identify html: {e}")
-        #     print(f"on Request {self.request}")
+    def identify_request(self, parser: RequestParser) -> HTML_REQUEST:
+        '''
+        maps an already parsed request to its HTML_REQUEST, the query string isn't part of the route
+        '''
+        return self.IDENTIFY_HTML_REQUEST.get(parser.route, None)
 
     def handle_html_request(self, html_request: HTML_REQUEST):
         '''
         handles the identified html request
         '''
         try:
+            self.body_chunks = None
             if html_request is not None:
                 self.HANDLE_HTML_REQUEST[html_request]()
         
             else:
                 self.handle_unkonwn_request()
-                print(f"Got unkonwn Request:\n{self.request}")
+                print(f"Got unkonwn Request: {self.parser.route}")
+
+            if not self.use_asyncio:
+                self.send_body()
 
         except Exception as e:
             print(f"Error in handle web get request: {e}")
+            # the response may be incomplete
+            self.keep_alive = False
+            self.body_chunks = None
 
         finally:
             self.client.close()
 
+    def send_head(self, status: str, headers: str='', length: int=0):
+        '''
+        sends the status line, headers, Content-Length and Connection of a response
+        :param headers: extra header lines, each ending with \r\n
+        :param length: body length, None leaves Content-Length out like on 304
+        '''
+        connection = 'keep-alive' if self.keep_alive else 'close'
+        content_length = '' if length is None else f'Content-Length: {length}\r\n'
+        self.client.send(f'HTTP/1.1 {status}\r\n{headers}{content_length}Connection: {connection}\r\n\r\n')
+
+    def send_body(self):
+        '''
+        sends the pending body_chunks to a blocking client
+        '''
+        body, self.body_chunks = self.body_chunks, None
+        if body is not None:
+            for chunk in body:
+                self.client.sendall(chunk)
+
+    def get_header(self, name: str) -> str:
+        '''
+        returns the value of header `name` of the current request or None,
+        only the headers in RequestParser.HEADERS are kept
+        '''
+        return self.parser.header(name.lower().encode())
+
+    def get_query(self, name: str) -> str:
+        '''
+        returns the value of query parameter `name` of the current request or None
+        '''
+        return self.parser.query(name)
+
     def handle_get_web(self):
         '''
         Handles GET_ACTUATORS_WEB HTML GET Request
         '''
-        web_name = self.request.split(' ')
-        web_name = web_name[1]
+        web_name = self.parser.path
         if web_name == '/':
             # default web
             web_name = self.DEFAULT_WEB_NAME
 
-        else:
-            web_name = web_name[1:]
-
-        with open(web_name, 'r') as f:
-            web_page = f.read()
-
-        self.client.send('HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n')
-        # self.client.send('HTTP/1.1 200 OK\n')
-        # self.client.send('Content-Type: text/html\n')
-        # self.client.send('Connection: close\n\n')
-        self.client.sendall(web_page)
+        asset = self.assets.get(web_name)
+        if asset is None:
+            self.handle_unkonwn_request()
+            return
+
+        # the gzip variant is only sent to clients that accept it, caches must key on the header
+        vary = 'Vary: Accept-Encoding\r\n' if asset.gzipped else ''
+        asset = self.assets.select(asset, self.get_header('Accept-Encoding'))
+        if asset is None:
+            body = 'Not Acceptable'
+            self.send_head('406 Not Acceptable', f'Content-Type: text/plain\r\n{vary}', len(body))
+            self.client.send(body)
+            return
+
+        if self.get_header('If-None-Match') == asset.etag:
+            self.send_head('304 Not Modified', f'ETag: {asset.etag}\r\n{vary}', None)
+            return
+
+        headers = f'Content-Type: {asset.content_type}\r\nETag: {asset.etag}\r\nCache-Control: no-cache\r\n{vary}'
+        if asset.gzipped:
+            headers += 'Content-Encoding: gzip\r\n'
+        self.send_head('200 OK', headers, asset.size)
+        self.body_chunks = self.assets.chunks(asset)
 
     def handle_post_switch(self):
         '''
+        Handles POST /set_switch_state with a JSON object {"id", "state"} of one actuator,
+        validated like POST /actuators, 400 and nothing applied on a bad one
+        '''
+        try:
+            body = json.loads(bytes(self.parser.body))
+            if type(body) is not dict or type(body.get('id')) is not str:
+                raise ValueError('expected an object of {"id", "state"}')
+            changes = self.actuator_changes({body['id']: body.get('state')})
+        except ValueError as e:
+            self.send_bad_actuators(e)
+            return
+
+        self.actuators_state.update(changes)
 
+        self.send_head('200 OK')
+
+    def actuator_changes(self, changes) -> dict:
+        '''
+        validates {id: 'on'/'off'} changes decoded from JSON, raises ValueError naming the first bad entry
+        '''
+        if type(changes) is not dict:
+            raise ValueError('expected an object of {id: state}')
+        for actuator_id, state in changes.items():
+            if actuator_id not in self.ACTUATOR_IDS:
+                raise ValueError(f'unknown actuator {actuator_id}')
+            if state not in self.ACTUATOR_STATES:
+                raise ValueError(f'invalid state of {actuator_id}')
+        return changes
+
+    def send_bad_actuators(self, error: ValueError):
         '''
-        length = int(self.request.split('Content-Length: ')[1].split('\r\n')[0])
-        body = json.loads(self.client.recv(length).decode('utf-8'))
+        400 with the JSON {"error"} of rejected actuator changes
+        '''
+        body = json.dumps({'error': str(error)}).encode()
+        self.send_head('400 Bad Request', 'Content-Type: application/json\r\n', len(body))
+        self.client.send(body)
 
-        self.actuators_dict[body['id']] = body['state']
+    def handle_post_actuators(self):
+        '''
+        Handles POST /actuators with a JSON object of {id: 'on'/'off'} changes
+        the whole batch is validated first, then published as one actuators version,
+        which the controller core applies in a single pass
+        responds with the committed version and actuator states, or 400 and nothing applied
+        '''
+        try:
+            changes = self.actuator_changes(json.loads(bytes(self.parser.body)))
+        except ValueError as e:
+            self.send_bad_actuators(e)
+            return
+
+        version = self.actuators_state.update(changes)
+        _, actuators = self.actuators_state.read()
+        body = json.dumps({'version': version, 'actuators': actuators}).encode()
+        self.send_head('200 OK', 'Content-Type: application/json\r\nCache-Control: no-store\r\n', len(body))
+        self.client.send(body)
+
+    def track_values(self) -> tuple:
+        '''
+        records the version every field changed at since the last call, from snapshots of the same version
+        returns (version, sensors snapshot, actuators snapshot)
+        '''
+        sensors_version, sensors = self.sensors_state.read()
+        actuators_version, actuators = self.actuators_state.read()
+        version = sensors_version + actuators_version
+        if version != self.values_seen_version:
+            for snapshot in (sensors, actuators):
+                for key, value in snapshot.items():
+                    if key not in self.values_seen or self.values_seen[key] != value:
+                        self.values_seen[key] = value
+                        self.values_changed[key] = version
+            if self.values_base_version < 0:
+                self.values_base_version = version
+            self.values_seen_version = version
+        return version, sensors, actuators
+
+    def seq_version(self, seq: str) -> int:
+        '''
+        values version of a seq handed out by this boot, -1 for any other seq
+        '''
+        parts = seq.split('-')
+        if len(parts) != 2 or parts[0] != self.boot_id:
+            return -1
+        try:
+            return int(parts[1])
+        except ValueError:
+            return -1
 
-        response = 'HTTP/1.1 200 OK\r\n\r\n'
-        self.client.send(response)
+    def values_delta(self, since: int) -> bytes:
+        '''
+        {"seq", "full", "values"} with the fields changed after version `since`,
+        all of them if since is before the tracked changes, -1 for a seq of another boot
+        '''
+        version, sensors, actuators = self.track_values()
+        cached_since, cached_version, body = self.delta_cache
+        if cached_since == since and cached_version == version:
+            return body
+
+        full = since < self.values_base_version or since > version
+        if full:
+            values = self.values_json(sensors, actuators)
+        else:
+            changed = self.values_changed
+            values = json.dumps({key: value for key, value in self.values_seen.items() if changed[key] > since})
+        body = f'{{"seq": "{self.boot_id}-{version}", "full": {"true" if full else "false"}, "values": {values}}}'.encode()
+        self.delta_cache = (since, version, body)
+        return body
 
     def handle_get_values(self):
         '''
-
+        sends the cached JSON of all values, 304 if the client already has the current version
+        with ?since=<seq> only the fields changed after seq, see values_delta
         '''
+        since = self.get_query('since')
+        if since is not None:
+            body = self.values_delta(self.seq_version(since))
+            self.send_head('200 OK', 'Content-Type: application/json\r\nCache-Control: no-store\r\n', len(body))
+            self.client.send(body)
+            return
+
         # switch_values = [b'on', b'off']
         # self.all_values = {
         #         'skinTemperature': random.getrandbits(4),
@@ -218,18 +547,283 @@ class Server:
         #         'humidifier': switch_values[random.getrandbits(1)],
         # }
 
-        tmp = self.sensors_dict
-        tmp.update(self.actuators_dict)
+        if self.values_version != self.values_cache_version:
+            self.build_values_responses()
+
+        # 200 keep-alive, 200 close, 304 keep-alive, 304 close
+        index = 0 if self.keep_alive else 1
+        if self.parser.header_equals(b'if-none-match', self.values_etag):
+            index += 2
+        self.client.send(self.values_responses[index])
+
+    def handle_get_telemetry(self):
+        '''
+        sends all values as one Telemetry record
+        '''
+        sensors_version, sensors = self.sensors_state.read()
+        actuators_version, actuators = self.actuators_state.read()
+        record = self.telemetry.encode(sensors_version + actuators_version, sensors, actuators)
+        self.send_head('200 OK', 'Content-Type: application/octet-stream\r\nCache-Control: no-store\r\n', len(record))
+        self.client.send(record)
+
+    def handle_get_telemetry_schema(self):
+        '''
+        sends the JSON layout of the /telemetry.bin record
+        '''
+        self.send_head('200 OK', 'Content-Type: application/json\r\n', len(self.telemetry.schema_json))
+        self.client.send(self.telemetry.schema_json)
 
-        response = json.dumps(tmp)
-        self.client.send('HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n')
-        self.client.send(response)
+    def handle_get_history(self):
+        '''
+        Handles GET /history?sensor=<id>&tier=<index>[&format=json]
+        packed binary by default, see History.binary_chunks
+        '''
+        name = self.get_query('sensor')
+        try:
+            tier = int(self.get_query('tier') or 0)
+        except ValueError:
+            tier = -1
+        history_tier = self.history.get(name, tier)
+        if history_tier is None:
+            self.handle_unkonwn_request()
+            return
+
+        if self.get_query('format') == 'json':
+            # the json is written on the fly, its length isn't known before it's sent
+            chunks = self.history.json_chunks(name, history_tier, tier)
+            if self.parser.http11:
+                self.send_head('200 OK', 'Content-Type: application/json\r\nTransfer-Encoding: chunked\r\n', None)
+                self.body_chunks = chunked(chunks)
+            else:
+                # HTTP/1.0 has no chunked coding, closing the connection ends the body
+                self.keep_alive = False
+                self.send_head('200 OK', 'Content-Type: application/json\r\n', None)
+                self.body_chunks = chunks
+        else:
+            # the buckets of the head, the controller core may close another one before the body is sent
+            ranges = history_tier.ranges()
+            end = history_tier.end
+            self.send_head('200 OK', 'Content-Type: application/octet-stream\r\n', self.history.binary_length(ranges))
+            # the int16 arrays are sent as views of them, flattened for the stream writers
+            self.body_chunks = (chunk if type(chunk) is bytearray else bytes(chunk)
+                                for chunk in self.history.binary_chunks(history_tier, tier, ranges, end))
+
+    def handle_bad_request(self):
+        '''
+        answers a request the parser rejected, nothing if the client closed without sending one
+        '''
+        self.keep_alive = False
+        if self.error is None:
+            return
+        self.send_head(f'{self.error.status} {self.error.reason}')
 
     def handle_unkonwn_request(self):
         '''
         Handles unknown request
         '''
-        self.client.send('HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n')
-        self.client.send('HTTP/1.1 404 Not Found\r\n\r\nFile Not Found')
+        body = 'File Not Found'
+        self.send_head('404 Not Found', 'Content-Type: text/html\r\n', len(body))
+        self.client.send(body)
 
+    ### asyncio mode ###
+    async def start(self, host: str='0.0.0.0', port: int=80):
+        '''
+        bind the listening socket and start accepting clients concurrently
+        '''
+        self.async_server = await asyncio.start_server(self.handle_client, host, port, backlog=self.backlog)
+        print('Listening on', (host, port))
+        return self.async_server
 
+    async def run(self, host: str='0.0.0.0', port: int=80):
+        '''
+        start the server and keep the event loop alive
+        '''
+        await self.start(host, port)
+        while True:
+            await asyncio.sleep(1)
+
+    async def read_request(self, reader, parser: RequestParser) -> bool:
+        '''
+        reads one request into parser, returns False if the client closed before sending anything
+        raises HTTPError if the parser rejects it, the caller resets the parser or moves it to the next request
+        '''
+        readinto = getattr(reader, 'readinto', None)
+        while not parser.complete:
+            buf = parser.free()
+            if readinto is not None:
+                n = await readinto(buf)
+            else:
+                # CPython streams have no readinto
+                data = await reader.read(len(buf))
+                n = len(data)
+                buf[:n] = data
+            if not n and not parser.length:
+                return False
+            parser.feed(n)
+        return True
+
+    def wants_keep_alive(self, parser: RequestParser, served: int) -> bool:
+        '''
+        HTTP/1.1 keeps the connection unless the client asks to close, HTTP/1.0 only if it asks to keep it
+        '''
+        if served >= self.KEEPALIVE_MAX_REQUESTS:
+            return False
+        if parser.http11:
+            return not parser.header_equals(b'connection', b'close')
+        return parser.header_equals(b'connection', b'keep-alive')
+
+    async def handle_client(self, reader, writer):
+        '''
+        serves the requests of one connection, kept alive between them while under MAX_KEEPALIVE,
+        the routing tables and handlers are shared with the blocking mode
+        '''
+        client = StreamClient(writer)
+        parser = self.free_parsers.pop() if self.free_parsers else None
+        kept = False  # counted in keepalive_connections
+        try:
+            if parser is None:
+                client.send('HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                await writer.drain()
+                return
+
+            parser.reset()
+            served = 0
+            while True:
+                timeout = self.KEEPALIVE_TIMEOUT if served else self.REQUEST_TIMEOUT
+                try:
+                    if served:
+                        parser.next()
+                    received = await asyncio.wait_for(self.read_request(reader, parser), timeout)
+                    error = None
+                    html_request = self.identify_request(parser) if received else HTML_REQUEST.BAD_REQUEST
+                except HTTPError as e:
+                    error = e
+                    html_request = HTML_REQUEST.BAD_REQUEST
+                except asyncio.TimeoutError:
+                    break  # idle, or the request never completed
+                if html_request == HTML_REQUEST.BAD_REQUEST and error is None:
+                    break  # closed by the client
+
+                if html_request in self.HANDLE_STREAM_REQUEST:
+                    # streams don't need the request anymore
+                    self.free_parsers.append(parser)
+                    parser = None
+                    await self.HANDLE_STREAM_REQUEST[html_request](client)
+                    await writer.drain()
+                    break
+
+                served += 1
+                keep_alive = self.wants_keep_alive(parser, served)
+                if keep_alive and not kept:
+                    keep_alive = self.keepalive_connections < self.MAX_KEEPALIVE
+                    kept = keep_alive
+                    if kept:
+                        self.keepalive_connections += 1
+
+                # handlers don't await, so nothing else runs between here and the drain
+                self.client = client
+                self.parser = parser
+                self.error = error
+                self.keep_alive = keep_alive
+                self.handle_html_request(html_request)
+                keep_alive = self.keep_alive
+                body, self.body_chunks = self.body_chunks, None
+
+                await writer.drain()
+                if body is not None:
+                    # other connections are served during the drains, the chunks only depend on the generator
+                    try:
+                        for chunk in body:
+                            client.send(chunk)
+                            await writer.drain()
+                    finally:
+                        body.close()  # closes a file streamed from flash if the client went away
+                self.led.toggle()
+                if not keep_alive:
+                    break
+
+        except Exception as e:
+            print(f"Error in handle client: {e}")
+
+        finally:
+            if kept:
+                self.keepalive_connections -= 1
+            if parser is not None:
+                self.free_parsers.append(parser)
+            writer.close()
+            await writer.wait_closed()
+
+    async def handle_get_events(self, client):
+        '''
+        Server-Sent Events stream, pushes the changed values every time a new version is published
+        '''
+        if self.event_streams >= self.MAX_EVENT_STREAMS:
+            client.send('HTTP/1.1 503 Service Unavailable\r\nRetry-After: 5\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            return
+
+        self.event_streams += 1
+        try:
+            client.send('HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n\r\n')
+            sent = {}
+            version = -1
+            idle = 0
+            while True:
+                if version != self.values_version:
+                    version = self.values_version
+                    values = self.all_values()
+                    changes = {key: value for key, value in values.items() if sent.get(key) != value}
+                    sent = values
+                    client.send(f'id: {version}\ndata: {json.dumps(changes)}\n\n')
+                    idle = 0
+
+                elif idle >= self.EVENTS_KEEPALIVE:
+                    client.send(':\n\n')
+                    idle = 0
+
+                # raises once the client is gone
+                await client.writer.drain()
+                await asyncio.sleep(self.EVENTS_POLL_PERIOD)
+                idle += self.EVENTS_POLL_PERIOD
+
+        finally:
+            self.event_streams -= 1
+
+
+def chunked(chunks):
+    '''
+    frames the chunks of a body of unknown length with the HTTP/1.1 chunked transfer coding
+    '''
+    separator = ''  # the CRLF ending a chunk goes out with the size of the next one
+    for chunk in chunks:
+        if len(chunk):
+            yield f'{separator}{len(chunk):x}\r\n'
+            yield chunk
+            separator = '\r\n'
+    yield separator + '0\r\n\r\n'
+
+class StreamClient:
+    '''
+    Gives an asyncio stream the part of the socket API the request handlers use,
+    the request itself is read by `Server.read_request`
+    '''
+    def __init__(self, writer):
+        self.writer = writer
+
+    def send(self, data):
+        '''
+        hands data to the writer without copying, which buffers what it can't send right away,
+        memoryviews must be of bytes, the writers count and slice them in bytes
+        '''
+        if isinstance(data, str):
+            data = data.encode()
+        self.writer.write(data)
+        return len(data)
+
+    def sendall(self, data):
+        self.send(data)
+
+    def close(self):
+        '''
+        the connection is drained and closed by `Server.handle_client`
+        '''
+        pass
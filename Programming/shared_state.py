@@ -0,0 +1,63 @@
+'''
+State Exchange between the two cores
+    -   The writer publishes a new snapshot dict, readers always get a complete one
+    -   Published snapshots are never mutated, so readers use them without copying
+    -   The lock only guards swapping the reference, never any I/O
+    -   The version counter lets readers skip work when nothing changed
+'''
+import _thread
+
+class SharedState:
+    '''
+    Versioned snapshot of a dict shared between threads
+    '''
+    def __init__(self, initial: dict):
+        '''
+        :param initial: the first snapshot, version 0
+        '''
+        self._lock = _thread.allocate_lock()
+        self._snapshot = dict(initial)
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def snapshot(self) -> dict:
+        '''
+        latest snapshot, must be treated as read only
+        '''
+        return self._snapshot
+
+    def read(self) -> tuple:
+        '''
+        returns (version, snapshot) of the same publish
+        '''
+        with self._lock:
+            return self._version, self._snapshot
+
+    def publish(self, values: dict) -> int:
+        '''
+        swaps in values as the new snapshot if they differ from the current one
+        values must not be mutated by the caller afterwards
+        returns the version after the publish
+        '''
+        with self._lock:
+            if values != self._snapshot:
+                self._snapshot = values
+                self._version += 1
+            return self._version
+
+    def update(self, changes: dict) -> int:
+        '''
+        publishes a copy of the current snapshot with changes applied, as one version
+        returns the version after the update
+        '''
+        with self._lock:
+            values = dict(self._snapshot)
+            values.update(changes)
+            if values != self._snapshot:
+                self._snapshot = values
+                self._version += 1
+            return self._version
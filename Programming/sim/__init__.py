@@ -0,0 +1,63 @@
+'''
+Host Simulation
+Runs the firmware modules unmodified under CPython, faster than real time
+    -   Stand-ins for machine, network, dht, framebuf and micropython are injected into sys.modules
+    -   The time module gets the MicroPython functions, driven by a VirtualClock
+    -   Sensors read a ThermalChamber model that responds to the PSU and humidifier pins
+
+    import sim
+    board = sim.install(end_s=600)
+    import main   # any firmware module, after install
+'''
+import sys
+import time
+
+from sim import board
+from sim.board import Board
+from sim.chamber import ThermalChamber
+from sim.clock import VirtualClock, SimulationEnd
+
+MODULES = ('machine', 'network', 'dht', 'framebuf', 'micropython')
+TIME_FUNCTIONS = ('sleep', 'sleep_ms', 'sleep_us', 'ticks_ms', 'ticks_us', 'ticks_cpu', 'ticks_diff', 'ticks_add', 'time')
+
+_saved_time = {}
+
+def install(clock: VirtualClock=None, chamber: ThermalChamber=None, end_s: float=None, speed: float=0, **board_options) -> Board:
+    '''
+    installs the stand-in modules and the virtual time, returns the simulated Board
+    must run before the firmware modules are imported, they bind `from time import sleep` at import
+    :param clock: defaults to a new VirtualClock(speed=speed, end_s=end_s)
+    :param chamber: defaults to a ThermalChamber at room conditions
+    :param board_options: wiring, adc_noise and seed of the Board
+    '''
+    if clock is None:
+        clock = VirtualClock(speed=speed, end_s=end_s)
+    if chamber is None:
+        chamber = ThermalChamber()
+    board.current = Board(clock, chamber, **board_options)
+
+    for name in MODULES:
+        module = __import__('sim.' + name, None, None, [name])
+        sys.modules[name] = module
+    clock.scheduled = sys.modules['micropython'].scheduler
+
+    for name in TIME_FUNCTIONS:
+        if name not in _saved_time:
+            _saved_time[name] = getattr(time, name, None)
+        setattr(time, name, getattr(clock, name))
+
+    return board.current
+
+def uninstall():
+    '''
+    restores the time module and removes the stand-ins, firmware modules already imported keep them
+    '''
+    for name, function in _saved_time.items():
+        if function is None:
+            delattr(time, name)
+        else:
+            setattr(time, name, function)
+    _saved_time.clear()
+    for name in MODULES:
+        sys.modules.pop(name, None)
+    board.current = None
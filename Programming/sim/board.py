@@ -0,0 +1,123 @@
+'''
+Simulated Board
+Wires the pins of main.py to the chamber model
+    -   Output pins drive the model, input pins and ADC channels are computed from it
+    -   The analog front ends invert the conversions of Thermistor and MQ135,
+        so the firmware reads back the model values
+    -   The MQ135 module's digital output, the only one wired to the MCU, is low above MQ135_THRESHOLD_PPM
+'''
+import math
+import random
+
+# Board instance used by the stand-in modules, set by sim.install
+current = None
+
+class Board:
+    '''
+    Pin registry and sensor front ends of one simulated Pico
+    '''
+    # pins as wired in main.controller_core
+    DEFAULT_WIRING = {
+        'ntc3950': 28,
+        'limit_switch': 27,
+        'dht22': 16,
+        'motion_sensor': 26,
+        'mq135': 8,
+        'psu': 1,
+        'humidifier': 7,
+    }
+
+    # thermistor divider as configured in Sensors
+    NTC_R_DIVIDER = 100200
+    NTC_B_FACTOR = 3950
+    NTC_R_NOMINAL = 100000
+    NTC_ROOM_TEMP = 25
+    NTC_ADC_MAX = 65534
+    NTC_READ_OFFSET = 54  # Sensors.ntc3950_read adds it to the thermistor reading
+
+    # CO2 level the potentiometer of the MQ135 module sets its digital output at
+    MQ135_THRESHOLD_PPM = 1000
+
+    def __init__(self, clock, chamber, wiring: dict=None, adc_noise: float=0., seed: int=0):
+        '''
+        :param clock: sim.clock.VirtualClock stepping the chamber
+        :param chamber: sim.chamber.ThermalChamber read by the sensors
+        :param wiring: overrides of DEFAULT_WIRING
+        :param adc_noise: standard deviation in codes of the noise added to every ADC reading
+        :param seed: of the noise generator, runs are reproducible
+        '''
+        self.clock = clock
+        self.chamber = chamber
+        self.wiring = dict(self.DEFAULT_WIRING)
+        if wiring:
+            self.wiring.update(wiring)
+        self.adc_noise = adc_noise
+        self.random = random.Random(seed)
+
+        self.pins = {}  # pin id: machine.Pin
+        self.adc_sources = {
+            self.wiring['ntc3950']: self.ntc3950_code,
+            self.wiring['mq135']: self.mq135_code,
+        }
+        self.i2c_buses = []
+        self.spi_buses = []
+
+        clock.add_model(self.step)
+
+    def pin_value(self, name: str) -> int:
+        pin = self.pins.get(self.wiring[name], None)
+        return 0 if pin is None else pin.level
+
+    def step(self, dt: float):
+        '''
+        steps the chamber with the current outputs, then updates the input pins
+        '''
+        self.chamber.step(dt, self.pin_value('psu'), self.pin_value('humidifier'))
+        self.set_input('limit_switch', self.chamber.cover_open)  # the Monitor reads high as opened
+        self.set_input('motion_sensor', self.chamber.motion)
+        # the comparator output of the MQ135 module is active low, only driven if wired to a digital pin
+        self.set_input('mq135', self.chamber.co2_ppm < self.MQ135_THRESHOLD_PPM)
+
+    def set_input(self, name: str, value):
+        pin = self.pins.get(self.wiring[name], None)
+        if pin is not None:
+            pin.level = 1 if value else 0
+
+    def read_adc(self, pin_id) -> int:
+        source = self.adc_sources.get(pin_id, None)
+        code = source() if source is not None else 0
+        if self.adc_noise:
+            code += int(self.random.gauss(0., self.adc_noise))
+        return min(max(code, 0), 65535)
+
+    def ntc3950_code(self) -> int:
+        '''
+        divider code of the thermistor at the skin temperature
+        '''
+        T = self.chamber.skin_temp - self.NTC_READ_OFFSET + 273.15
+        R = self.NTC_R_NOMINAL * math.exp(self.NTC_B_FACTOR * (1 / T - 1 / (self.NTC_ROOM_TEMP + 273.15)))
+        return int(self.NTC_ADC_MAX * R / (R + self.NTC_R_DIVIDER))
+
+    def mq135_code(self) -> int:
+        '''
+        load resistor code of the MQ135 at the chamber CO2, temperature and humidity
+        '''
+        from mq135 import MQ135
+        # get_correction_factor only uses class constants
+        correction = MQ135.get_correction_factor(MQ135, self.chamber.air_temp, self.chamber.humidity)
+        resistance = correction * MQ135.RZERO * math.pow(self.chamber.co2_ppm / MQ135.PARA, -1 / MQ135.PARB)
+        return int(MQ135.ADC_MAX / (resistance / MQ135.RLOAD + 1))
+
+    def dht22_values(self) -> tuple:
+        '''
+        (temperature, humidity) rounded to the DHT22 resolution
+        '''
+        return round(self.chamber.air_temp, 1), round(self.chamber.humidity, 1)
+
+    def stats(self) -> dict:
+        return {
+            'i2c_bytes': sum(bus.bytes_written for bus in self.i2c_buses),
+            'i2c_transactions': sum(bus.transactions for bus in self.i2c_buses),
+            'spi_bytes': sum(bus.bytes_written for bus in self.spi_buses),
+            'pin_writes': sum(pin.writes for pin in self.pins.values()),
+        }
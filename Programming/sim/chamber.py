@@ -0,0 +1,84 @@
+'''
+Thermal Chamber Model
+Lumped model of the incubator the simulated sensors read from
+    -   The air is heated by the PSU and loses heat to the room, faster with the cover open
+    -   The skin temperature follows the air with a first order lag
+    -   The humidifier raises the humidity, which leaks back towards the room's
+'''
+import math
+
+class ThermalChamber:
+    '''
+    State of the chamber, advanced by `step(dt)` with the actuator outputs
+    '''
+    DEFAULT_AMBIENT_TEMP = 22.0  # 'C
+    DEFAULT_AMBIENT_HUMIDITY = 40.0  # %RH
+
+    def __init__(self, ambient_temp: float=DEFAULT_AMBIENT_TEMP, ambient_humidity: float=DEFAULT_AMBIENT_HUMIDITY,
+                 heater_power: float=40.0, heat_capacity: float=2000.0, heat_loss: float=1.2, cover_open_loss: float=4.0,
+                 skin_time_constant: float=120.0, humidifier_rate: float=0.08, humidity_leak: float=0.004,
+                 co2_ppm: float=420.0):
+        '''
+        :param heater_power: W delivered to the air while the PSU is on
+        :param heat_capacity: J/'C of the air and walls
+        :param heat_loss: W/'C lost to the room with the cover closed
+        :param cover_open_loss: multiplier of heat_loss and humidity_leak while the cover is open
+        :param skin_time_constant: s for the skin temperature to reach 63% of a step of the air temperature
+        :param humidifier_rate: %RH/s added while the humidifier is on
+        :param humidity_leak: fraction of the difference to the room humidity lost every second
+        :param co2_ppm: CO2 concentration seen by the MQ135
+        '''
+        self.ambient_temp = ambient_temp
+        self.ambient_humidity = ambient_humidity
+        self.heater_power = heater_power
+        self.heat_capacity = heat_capacity
+        self.heat_loss = heat_loss
+        self.cover_open_loss = cover_open_loss
+        self.skin_time_constant = skin_time_constant
+        self.humidifier_rate = humidifier_rate
+        self.humidity_leak = humidity_leak
+        self.co2_ppm = co2_ppm
+
+        # state
+        self.air_temp = ambient_temp
+        self.skin_temp = ambient_temp
+        self.humidity = ambient_humidity
+        self.cover_open = False
+        self.motion = False
+
+        # energy spent, for the run summary
+        self.heater_on_s = 0.
+        self.humidifier_on_s = 0.
+
+    def step(self, dt: float, heater_on: bool, humidifier_on: bool):
+        '''
+        advances the model dt seconds with the given outputs held constant
+        '''
+        leak = self.cover_open_loss if self.cover_open else 1.
+
+        power = self.heater_power if heater_on else 0.
+        power -= self.heat_loss * leak * (self.air_temp - self.ambient_temp)
+        self.air_temp += power * dt / self.heat_capacity
+
+        # exact solution of the first order lag, stable for any dt
+        self.skin_temp += (self.air_temp - self.skin_temp) * (1. - math.exp(-dt / self.skin_time_constant))
+
+        rate = self.humidifier_rate if humidifier_on else 0.
+        rate -= self.humidity_leak * leak * (self.humidity - self.ambient_humidity)
+        self.humidity = min(max(self.humidity + rate * dt, 0.), 100.)
+
+        if heater_on:
+            self.heater_on_s += dt
+        if humidifier_on:
+            self.humidifier_on_s += dt
+
+    def state(self) -> dict:
+        return {
+            'air_temp': round(self.air_temp, 2),
+            'skin_temp': round(self.skin_temp, 2),
+            'humidity': round(self.humidity, 2),
+            'cover_open': self.cover_open,
+            'motion': self.motion,
+            'heater_on_s': round(self.heater_on_s, 1),
+            'humidifier_on_s': round(self.humidifier_on_s, 1),
+        }
@@ -0,0 +1,123 @@
+'''
+Virtual Clock
+Time source of the simulation, advanced by the simulated code sleeping
+    -   Provides the MicroPython time functions (sleep_ms, ticks_ms, ticks_diff, ...)
+    -   Fires the simulated machine.Timer callbacks and the micropython.schedule queue as time passes
+    -   Steps the physical models registered with `add_model`
+'''
+import threading
+# bound before sim.install patches the time module
+from time import perf_counter as _perf_counter, sleep as _real_sleep
+
+TICKS_PERIOD = 1 << 30  # MicroPython ticks wrap at 2**30
+TICKS_HALF = TICKS_PERIOD >> 1
+
+class SimulationEnd(BaseException):
+    '''
+    Raised from a sleep once the clock passed its end, BaseException so `except Exception` in the code under test doesn't catch it
+    '''
+
+class VirtualClock:
+    '''
+    Nanosecond clock that only moves when the simulated code sleeps or calls `advance`
+    '''
+    DEFAULT_EPOCH = 1700000000  # time.time() at the start of the simulation
+    MODEL_STEP_US = 100000  # models are stepped at most this far at once
+
+    def __init__(self, epoch: int=DEFAULT_EPOCH, speed: float=0, end_s: float=None):
+        '''
+        :param epoch: value of time.time() at virtual time 0
+        :param speed: 0 runs as fast as possible, otherwise virtual seconds per wall second
+        :param end_s: virtual time in seconds after which sleeps raise SimulationEnd
+        '''
+        self.epoch = epoch
+        self.speed = speed
+        self.end_us = None if end_s is None else int(end_s * 1000000)
+        self.now_us = 0
+        self.timers = []
+        self.models = []
+        self.scheduled = None  # sim.micropython scheduler, set by sim.install
+        self.sleeps = 0
+        self._lock = threading.RLock()
+        self._wall_start = _perf_counter()
+
+    # models and timers
+    def add_model(self, step: callable):
+        '''
+        step(dt_s) is called as virtual time passes, in steps of at most MODEL_STEP_US
+        '''
+        self.models.append(step)
+
+    def add_timer(self, timer):
+        if timer not in self.timers:
+            self.timers.append(timer)
+
+    def remove_timer(self, timer):
+        if timer in self.timers:
+            self.timers.remove(timer)
+
+    def advance(self, us: int):
+        '''
+        moves the clock us microseconds forward, firing due timers and stepping the models on the way
+        '''
+        with self._lock:
+            target = self.now_us + max(int(us), 0)
+            while True:
+                due = [timer.deadline_us for timer in self.timers if timer.deadline_us <= target]
+                step_to = min(due) if due else target
+                step_to = min(step_to, self.now_us + self.MODEL_STEP_US)
+                if step_to > self.now_us:
+                    dt = (step_to - self.now_us) / 1000000
+                    self.now_us = step_to
+                    for step in self.models:
+                        step(dt)
+                for timer in list(self.timers):
+                    if timer.deadline_us <= self.now_us:
+                        timer.fire()
+                if self.scheduled is not None:
+                    self.scheduled.run()
+                if self.now_us >= target:
+                    break
+
+        if self.speed:
+            wall_target = self._wall_start + self.now_us / 1000000 / self.speed
+            delay = wall_target - _perf_counter()
+            if delay > 0:
+                _real_sleep(delay)
+
+    # MicroPython time API
+    def sleep_us(self, us: int):
+        self.sleeps += 1
+        self.advance(us)
+        if self.end_us is not None and self.now_us >= self.end_us:
+            raise SimulationEnd()
+
+    def sleep_ms(self, ms: int):
+        self.sleep_us(ms * 1000)
+
+    def sleep(self, s: float):
+        self.sleep_us(s * 1000000)
+
+    def ticks_us(self) -> int:
+        return self.now_us % TICKS_PERIOD
+
+    def ticks_ms(self) -> int:
+        return (self.now_us // 1000) % TICKS_PERIOD
+
+    def ticks_cpu(self) -> int:
+        return self.ticks_us()
+
+    @staticmethod
+    def ticks_diff(ticks1: int, ticks2: int) -> int:
+        return ((ticks1 - ticks2 + TICKS_HALF) % TICKS_PERIOD) - TICKS_HALF
+
+    @staticmethod
+    def ticks_add(ticks: int, delta: int) -> int:
+        return (ticks + delta) % TICKS_PERIOD
+
+    def time(self) -> int:
+        return self.epoch + self.now_us // 1000000
+
+    @property
+    def seconds(self) -> float:
+        return self.now_us / 1000000
@@ -0,0 +1,30 @@
+'''
+Stand-in for the MicroPython dht module, measures the chamber of sim.board.current
+'''
+from sim import board
+
+class DHT22:
+    MIN_INTERVAL_US = 2000000  # the sensor returns its previous reading when polled faster
+
+    def __init__(self, pin):
+        self.pin = pin
+        self._temperature = 0.
+        self._humidity = 0.
+        self.measured_us = None
+        self.measurements = 0
+        self.too_soon = 0  # measurements requested before MIN_INTERVAL_US
+
+    def measure(self):
+        clock = board.current.clock
+        if self.measured_us is not None and clock.now_us - self.measured_us < self.MIN_INTERVAL_US:
+            self.too_soon += 1
+            return
+        self.measured_us = clock.now_us
+        self.measurements += 1
+        self._temperature, self._humidity = board.current.dht22_values()
+
+    def temperature(self) -> float:
+        return self._temperature
+
+    def humidity(self) -> float:
+        return self._humidity
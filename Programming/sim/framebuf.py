@@ -0,0 +1,107 @@
+'''
+Stand-in for the MicroPython framebuf module, MONO_VLSB only
+Text is drawn with a stand-in glyph per character, not the real 8x8 font,
+so what changes on the display is right but not what it reads
+'''
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+
+class FrameBuffer:
+    def __init__(self, buffer, width: int, height: int, format: int=MONO_VLSB, stride: int=None):
+        if format != MONO_VLSB:
+            raise ValueError('only MONO_VLSB is simulated')
+        self._buf = buffer
+        self._width = width
+        self._height = height
+
+    def fill(self, c: int):
+        value = 0xff if c else 0
+        for i in range(self._width * ((self._height + 7) // 8)):
+            self._buf[i] = value
+
+    def pixel(self, x: int, y: int, c: int=None):
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            return None
+        i = (y >> 3) * self._width + x
+        bit = 1 << (y & 7)
+        if c is None:
+            return 1 if self._buf[i] & bit else 0
+        if c:
+            self._buf[i] |= bit
+        else:
+            self._buf[i] &= ~bit & 0xff
+
+    def fill_rect(self, x: int, y: int, w: int, h: int, c: int):
+        for yy in range(max(y, 0), min(y + h, self._height)):
+            for xx in range(max(x, 0), min(x + w, self._width)):
+                self.pixel(xx, yy, c)
+
+    def hline(self, x: int, y: int, w: int, c: int):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x: int, y: int, h: int, c: int):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x: int, y: int, w: int, h: int, c: int, f: bool=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def line(self, x0: int, y0: int, x1: int, y1: int, c: int):
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x0, y0, c)
+            if x0 == x1 and y0 == y1:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+    def ellipse(self, x: int, y: int, xr: int, yr: int, c: int, f: bool=False, m: int=0xf):
+        # bounding box stand-in
+        self.rect(x - xr, y - yr, 2 * xr + 1, 2 * yr + 1, c, f)
+
+    def poly(self, x: int, y: int, coords, c: int, f: bool=False):
+        n = len(coords) // 2
+        for i in range(n):
+            j = (i + 1) % n
+            self.line(x + coords[2 * i], y + coords[2 * i + 1], x + coords[2 * j], y + coords[2 * j + 1], c)
+
+    def text(self, s: str, x: int, y: int, c: int=1):
+        for n, char in enumerate(s):
+            code = ord(char)
+            for col in range(8):
+                # stand-in glyph: a pattern unique enough per character, blank for spaces
+                bits = 0 if char == ' ' or col == 7 else ((code * (col + 3) * 37) >> 2) & 0x7e
+                for row in range(8):
+                    if bits & (1 << row):
+                        self.pixel(x + 8 * n + col, y + row, c)
+
+    def blit(self, fbuf, x: int, y: int, key: int=-1, palette=None):
+        for yy in range(fbuf._height):
+            for xx in range(fbuf._width):
+                c = fbuf.pixel(xx, yy)
+                if c != key:
+                    self.pixel(x + xx, y + yy, c)
+
+    def scroll(self, xstep: int, ystep: int):
+        pixels = [[self.pixel(x, y) for x in range(self._width)] for y in range(self._height)]
+        for y in range(self._height):
+            for x in range(self._width):
+                sx = x - xstep
+                sy = y - ystep
+                if 0 <= sx < self._width and 0 <= sy < self._height:
+                    self.pixel(x, y, pixels[sy][sx])
@@ -0,0 +1,151 @@
+'''
+Stand-in for the MicroPython machine module
+Pins, ADC channels and buses of sim.board.current, timers on its virtual clock
+'''
+from sim import board
+
+def freq() -> int:
+    return 125000000
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode: int=-1, pull: int=-1, value: int=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self.writes = 0
+        # a pin constructed twice keeps its level, like the hardware
+        previous = board.current.pins.get(id, None)
+        self.level = previous.level if previous is not None else 0
+        board.current.pins[id] = self
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode: int=-1, pull: int=-1, value: int=None):
+        if mode != -1:
+            self.mode = mode
+        if pull != -1:
+            self.pull = pull
+        if value is not None:
+            self.value(value)
+
+    def value(self, value=None):
+        if value is None:
+            return self.level
+        self.level = 1 if value else 0
+        self.writes += 1
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(not self.level)
+
+    def irq(self, handler=None, trigger: int=IRQ_FALLING | IRQ_RISING):
+        self.handler = handler
+
+class ADC:
+    # like the rp2 port, ints 0-4 are ADC channels, any other pin must be one of GP26-29
+    CORE_TEMP = 4
+    ADC_PINS = (26, 27, 28, 29)
+
+    def __init__(self, pin):
+        pin_id = pin.id if isinstance(pin, Pin) else pin
+        if not isinstance(pin, Pin) and 0 <= pin_id <= self.CORE_TEMP:
+            pin_id = self.ADC_PINS[0] + pin_id if pin_id < self.CORE_TEMP else None
+        elif pin_id not in self.ADC_PINS:
+            raise ValueError("Pin doesn't have ADC capabilities")
+        self.pin_id = pin_id  # None for the core temperature sensor
+
+    def read_u16(self) -> int:
+        return board.current.read_adc(self.pin_id)
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id: int=-1, **kwargs):
+        self.id = id
+        self.deadline_us = 0
+        self.period_us = 0
+        self.mode = self.PERIODIC
+        self.callback = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode: int=PERIODIC, freq: float=None, period: int=None, callback=None):
+        '''
+        period is in ms, freq in Hz takes precedence
+        '''
+        self.mode = mode
+        self.period_us = int(1000000 / freq) if freq else int(period * 1000)
+        self.callback = callback
+        clock = board.current.clock
+        self.deadline_us = clock.now_us + self.period_us
+        clock.add_timer(self)
+
+    def deinit(self):
+        board.current.clock.remove_timer(self)
+
+    def fire(self):
+        if self.mode == self.PERIODIC:
+            self.deadline_us += self.period_us
+        else:
+            self.deinit()
+        if self.callback is not None:
+            self.callback(self)
+
+class I2C:
+    def __init__(self, id: int, scl=None, sda=None, freq: int=400000):
+        self.id = id
+        self.freq = freq
+        self.bytes_written = 0
+        self.transactions = 0
+        board.current.i2c_buses.append(self)
+
+    def scan(self) -> list:
+        return [0x3c]
+
+    def writeto(self, addr: int, buf, stop: bool=True) -> int:
+        self.bytes_written += len(buf)
+        self.transactions += 1
+        return 1
+
+    def writevto(self, addr: int, vector, stop: bool=True) -> int:
+        self.bytes_written += sum(len(buf) for buf in vector)
+        self.transactions += 1
+        return 1
+
+    def readfrom(self, addr: int, nbytes: int, stop: bool=True) -> bytes:
+        self.transactions += 1
+        return bytes(nbytes)
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id: int, baudrate: int=1000000, polarity: int=0, phase: int=0, **kwargs):
+        self.id = id
+        self.baudrate = baudrate
+        self.bytes_written = 0
+        self.transactions = 0
+        board.current.spi_buses.append(self)
+
+    def init(self, baudrate: int=1000000, polarity: int=0, phase: int=0, **kwargs):
+        self.baudrate = baudrate
+
+    def write(self, buf):
+        self.bytes_written += len(buf)
+        self.transactions += 1
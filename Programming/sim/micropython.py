@@ -0,0 +1,33 @@
+'''
+Stand-in for the MicroPython micropython module
+Scheduled callbacks are queued and run by the virtual clock after firing the timers
+'''
+SCHEDULE_DEPTH = 8  # MICROPY_SCHEDULER_DEPTH of the rp2 port
+
+def const(value):
+    return value
+
+def alloc_emergency_exception_buf(size: int):
+    pass
+
+class Scheduler:
+    def __init__(self, depth: int=SCHEDULE_DEPTH):
+        self.depth = depth
+        self.queue = []
+        self.runs = 0
+
+    def schedule(self, func, arg):
+        if len(self.queue) >= self.depth:
+            raise RuntimeError('schedule queue full')
+        self.queue.append((func, arg))
+
+    def run(self):
+        while self.queue:
+            func, arg = self.queue.pop(0)
+            self.runs += 1
+            func(arg)
+
+scheduler = Scheduler()
+
+def schedule(func, arg):
+    scheduler.schedule(func, arg)
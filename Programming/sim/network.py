@@ -0,0 +1,30 @@
+'''
+Stand-in for the MicroPython network module, the interfaces are always up
+'''
+STA_IF = 0
+AP_IF = 1
+
+class WLAN:
+    def __init__(self, interface: int=STA_IF):
+        self.interface = interface
+        self._active = False
+        self.settings = {}
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        self._active = bool(value)
+
+    def config(self, *args, **kwargs):
+        if args:
+            return self.settings.get(args[0], None)
+        self.settings.update(kwargs)
+
+    def connect(self, ssid: str=None, key: str=None):
+        self.settings['ssid'] = ssid
+
+    def isconnected(self) -> bool:
+        return self._active
+
+    def ifconfig(self) -> tuple:
+        return ('127.0.0.1', '255.255.255.0', '127.0.0.1', '127.0.0.1')
@@ -0,0 +1,83 @@
+'''
+Runs main.controller_core, and optionally the web server, on the simulated board
+
+    python -m sim.run --seconds 3600 --set psuControl=on
+    python -m sim.run --port 8080 --speed 10
+
+Run from the Programming directory, the log segments are written to a temporary directory
+'''
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import sim
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='run the incubator firmware on a simulated board')
+    parser.add_argument('--seconds', type=float, default=600, help='virtual seconds to run, 0 runs until interrupted')
+    parser.add_argument('--speed', type=float, default=0, help='virtual seconds per wall second, 0 runs as fast as possible')
+    parser.add_argument('--port', type=int, default=0, help='also serve the web app on this port of localhost')
+    parser.add_argument('--set', action='append', default=[], metavar='ID=STATE', help='actuator state published before starting, like psuControl=on')
+    parser.add_argument('--ambient', type=float, default=sim.ThermalChamber.DEFAULT_AMBIENT_TEMP, help="room temperature in 'C")
+    parser.add_argument('--cover-open', action='store_true', help='start with the cover open')
+    parser.add_argument('--adc-noise', type=float, default=0, help='standard deviation of the ADC noise in codes')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+def prepare_workdir(source: str) -> str:
+    '''
+    copies the web files to a temporary directory standing for the flash filesystem
+    '''
+    workdir = tempfile.mkdtemp(prefix='incubator-sim-')
+    for name in os.listdir(source):
+        if name.endswith(('.html', '.js', '.css', '.ico', '.gz')):
+            shutil.copy(os.path.join(source, name), workdir)
+    return workdir
+
+def main(argv=None):
+    args = parse_args(argv)
+    source = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if source not in sys.path:
+        sys.path.insert(0, source)
+
+    chamber = sim.ThermalChamber(ambient_temp=args.ambient)
+    chamber.cover_open = args.cover_open
+    board = sim.install(chamber=chamber, end_s=args.seconds or None, speed=args.speed,
+                        adc_noise=args.adc_noise, seed=args.seed)
+
+    workdir = prepare_workdir(source)
+    os.chdir(workdir)
+
+    import main as firmware  # after install, main.py binds the time functions at import
+
+    for assignment in args.set:
+        actuator_id, _, state = assignment.partition('=')
+        firmware.actuators_state.update({actuator_id: state})
+
+    if args.port:
+        from server2 import Server
+        import asyncio
+        server = Server(use_asyncio=True, sensors_state=firmware.sensors_state,
+                        actuators_state=firmware.actuators_state, history=firmware.history)
+        threading.Thread(target=asyncio.run, args=(server.run('127.0.0.1', args.port),), daemon=True).start()
+
+    wall_start = time.perf_counter()
+    try:
+        firmware.controller_core()
+    except (sim.SimulationEnd, KeyboardInterrupt):
+        pass
+    wall_s = time.perf_counter() - wall_start
+
+    clock = board.clock
+    print(f'simulated {clock.seconds:.1f}s in {wall_s:.2f}s wall, {clock.seconds / max(wall_s, 1e-9):.0f}x real time')
+    print('chamber', chamber.state())
+    print('sensors', firmware.sensors_state.snapshot)
+    print('board', board.stats())
+    print('log segments in', os.path.join(workdir, 'log'))
+
+if __name__ == '__main__':
+    main()
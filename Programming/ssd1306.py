@@ -2,6 +2,7 @@
 
 from micropython import const
 import framebuf
+import time
 
 
 # register definitions
@@ -32,11 +33,109 @@ class SSD1306(framebuf.FrameBuffer):
         self.external_vcc = external_vcc
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
+        self.buffer_view = memoryview(self.buffer)
+        # changed column range of every page since the last show, empty when x0 > x1
+        self.dirty_x0 = bytearray(self.pages)
+        self.dirty_x1 = bytearray(self.pages)
+        self.mark_all()
+
+        # incremental flush: show() copies the changed regions into the back buffer,
+        # flush_step() sends them a page at a time
+        self.incremental = False
+        self.back_buffer = bytearray(len(self.buffer))
+        self.back_view = memoryview(self.back_buffer)
+        self.pending_x0 = bytearray(b'\xff' * self.pages)
+        self.pending_x1 = bytearray(self.pages)
+        self.frame_complete = True
+        self.page_us = 0  # duration of the latest page transfer
+
+        # address window command sequence, rewritten in place for every window
+        self.window_cmds = bytearray((SET_COL_ADDR, 0, 0, SET_PAGE_ADDR, 0, 0))
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
         self.init_display()
 
+    # dirty region tracking
+    def mark(self, x, y, w, h):
+        x0 = max(x, 0)
+        x1 = min(x + w, self.width) - 1
+        y0 = max(y, 0)
+        y1 = min(y + h, self.height) - 1
+        if x0 > x1 or y0 > y1:
+            return
+        for page in range(y0 >> 3, (y1 >> 3) + 1):
+            if x0 < self.dirty_x0[page]:
+                self.dirty_x0[page] = x0
+            if x1 > self.dirty_x1[page]:
+                self.dirty_x1[page] = x1
+
+    def mark_all(self):
+        for page in range(self.pages):
+            self.dirty_x0[page] = 0
+            self.dirty_x1[page] = self.width - 1
+
+    def clear_dirty(self):
+        for page in range(self.pages):
+            self.dirty_x0[page] = 255
+            self.dirty_x1[page] = 0
+
+    def fill(self, c):
+        super().fill(c)
+        self.mark_all()
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return super().pixel(x, y)
+        super().pixel(x, y, c)
+        self.mark(x, y, 1, 1)
+
+    def hline(self, x, y, w, c):
+        super().hline(x, y, w, c)
+        self.mark(x, y, w, 1)
+
+    def vline(self, x, y, h, c):
+        super().vline(x, y, h, c)
+        self.mark(x, y, 1, h)
+
+    def line(self, x0, y0, x1, y1, c):
+        super().line(x0, y0, x1, y1, c)
+        self.mark(min(x0, x1), min(y0, y1), abs(x1 - x0) + 1, abs(y1 - y0) + 1)
+
+    def rect(self, x, y, w, h, c, *args):
+        super().rect(x, y, w, h, c, *args)
+        self.mark(x, y, w, h)
+
+    def fill_rect(self, x, y, w, h, c):
+        super().fill_rect(x, y, w, h, c)
+        self.mark(x, y, w, h)
+
+    def text(self, s, x, y, c=1):
+        super().text(s, x, y, c)
+        self.mark(x, y, 8 * len(s), 8)
+
+    def blit(self, fbuf, x, y, *args):
+        '''
+        only the blitted area is marked if fbuf has width and height attributes
+        '''
+        super().blit(fbuf, x, y, *args)
+        if hasattr(fbuf, 'width') and hasattr(fbuf, 'height'):
+            self.mark(x, y, fbuf.width, fbuf.height)
+        else:
+            self.mark_all()
+
+    def scroll(self, xstep, ystep):
+        super().scroll(xstep, ystep)
+        self.mark_all()
+
+    def ellipse(self, *args):
+        super().ellipse(*args)
+        self.mark_all()
+
+    def poly(self, *args):
+        super().poly(*args)
+        self.mark_all()
+
     def init_display(self):
-        for cmd in (
+        self.write_cmds(bytes((
             SET_DISP | 0x00,  # off
             # address setting
             SET_MEM_ADDR,
@@ -66,9 +165,8 @@ class SSD1306(framebuf.FrameBuffer):
             # charge pump
             SET_CHARGE_PUMP,
             0x10 if self.external_vcc else 0x14,
-            SET_DISP | 0x01,
-        ):  # on
-            self.write_cmd(cmd)
+            SET_DISP | 0x01,  # on
+        )))
         self.fill(0)
         self.show()
 
@@ -85,20 +183,112 @@ class SSD1306(framebuf.FrameBuffer):
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
-    def show(self):
-        x0 = 0
-        x1 = self.width - 1
+    def set_window(self, x0, x1, page0, page1):
         if self.width == 64:
             # displays with width of 64 pixels are shifted by 32
             x0 += 32
             x1 += 32
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_data(self.buffer)
+        cmds = self.window_cmds
+        cmds[1] = x0
+        cmds[2] = x1
+        cmds[4] = page0
+        cmds[5] = page1
+        self.write_cmds(cmds)
+
+    def write_cmds(self, cmds):
+        '''
+        sends a sequence of command bytes, drivers override it to send them in one transfer
+        '''
+        for cmd in cmds:
+            self.write_cmd(cmd)
+
+    def show(self):
+        '''
+        sends only the changed column range of every changed page,
+        runs of fully changed pages are sent as one transfer
+        in incremental mode the changes are only queued for flush_step()
+        '''
+        if self.incremental:
+            self.queue()
+            return
+
+        last = self.width - 1
+        page = 0
+        while page < self.pages:
+            x0 = self.dirty_x0[page]
+            x1 = self.dirty_x1[page]
+            if x0 > x1:
+                page += 1
+                continue
+
+            end = page
+            if x0 == 0 and x1 == last:
+                while end + 1 < self.pages and self.dirty_x0[end + 1] == 0 and self.dirty_x1[end + 1] == last:
+                    end += 1
+
+            self.set_window(x0, x1, page, end)
+            start = page * self.width
+            if end == page:
+                self.write_data(self.buffer_view[start + x0:start + x1 + 1])
+            else:
+                self.write_data(self.buffer_view[start:(end + 1) * self.width])
+            page = end + 1
+
+        self.clear_dirty()
+
+    def queue(self):
+        '''
+        copies the changed regions into the back buffer as the next frame,
+        drawing can continue on the framebuffer while the frame is flushed
+        '''
+        for page in range(self.pages):
+            x0 = self.dirty_x0[page]
+            x1 = self.dirty_x1[page]
+            if x0 > x1:
+                continue
+            start = page * self.width
+            self.back_view[start + x0:start + x1 + 1] = self.buffer_view[start + x0:start + x1 + 1]
+            if x0 < self.pending_x0[page]:
+                self.pending_x0[page] = x0
+            if x1 > self.pending_x1[page]:
+                self.pending_x1[page] = x1
+            self.frame_complete = False
+
+        self.clear_dirty()
+
+    def flush_step(self, budget_us=0):
+        '''
+        sends queued pages, one at least, while the next page is expected to fit in budget_us
+        returns frame_complete
+        '''
+        start = time.ticks_us()
+        sent = False
+        for page in range(self.pages):
+            x0 = self.pending_x0[page]
+            x1 = self.pending_x1[page]
+            if x0 > x1:
+                continue
+            if sent and time.ticks_diff(time.ticks_us(), start) + self.page_us > budget_us:
+                return False
+
+            page_start = time.ticks_us()
+            self.set_window(x0, x1, page, page)
+            offset = page * self.width
+            self.write_data(self.back_view[offset + x0:offset + x1 + 1])
+            self.pending_x0[page] = 255
+            self.pending_x1[page] = 0
+            self.page_us = time.ticks_diff(time.ticks_us(), page_start)
+            sent = True
+
+        self.frame_complete = True
+        return True
+
+    def show_all(self):
+        '''
+        sends the whole buffer regardless of the tracked changes
+        '''
+        self.mark_all()
+        self.show()
 
 
 class SSD1306_I2C(SSD1306):
@@ -107,6 +297,7 @@ class SSD1306_I2C(SSD1306):
         self.addr = addr
         self.temp = bytearray(2)
         self.write_list = [b"\x40", None]  # Co=0, D/C#=1
+        self.cmd_list = [b"\x00", None]  # Co=0, D/C#=0, every following byte is a command
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
@@ -114,13 +305,20 @@ class SSD1306_I2C(SSD1306):
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
 
+    def write_cmds(self, cmds):
+        self.cmd_list[1] = cmds
+        self.i2c.writevto(self.addr, self.cmd_list)
+
     def write_data(self, buf):
         self.write_list[1] = buf
         self.i2c.writevto(self.addr, self.write_list)
 
 
 class SSD1306_SPI(SSD1306):
-    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False):
+    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False, shared_bus=False):
+        """
+        shared_bus: set if other devices reconfigure the SPI bus, it is then configured before every transfer
+        """
         self.rate = 10 * 1024 * 1024
         dc.init(dc.OUT, value=0)
         res.init(res.OUT, value=0)
@@ -129,8 +327,11 @@ class SSD1306_SPI(SSD1306):
         self.dc = dc
         self.res = res
         self.cs = cs
+        self.shared_bus = shared_bus
+        self.cmd = bytearray(1)
         import time
 
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
         self.res(1)
         time.sleep_ms(1)
         self.res(0)
@@ -139,15 +340,21 @@ class SSD1306_SPI(SSD1306):
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.cmd[0] = cmd
+        self.write_cmds(self.cmd)
+
+    def write_cmds(self, cmds):
+        if self.shared_bus:
+            self.spi.init(baudrate=self.rate, polarity=0, phase=0)
         self.cs(1)
         self.dc(0)
         self.cs(0)
-        self.spi.write(bytearray([cmd]))
+        self.spi.write(cmds)
         self.cs(1)
 
     def write_data(self, buf):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        if self.shared_bus:
+            self.spi.init(baudrate=self.rate, polarity=0, phase=0)
         self.cs(1)
         self.dc(1)
         self.cs(0)
@@ -0,0 +1,184 @@
+'''
+Static Web Assets
+    -   Indexes the files the web app may serve once at boot
+    -   Keeps small files in RAM, streams bigger ones from flash in fixed-size chunks
+    -   Prefers the gzip variant (<name>.gz) produced at deploy time by tools/compress_assets.py,
+        the plain file is kept for clients that don't accept gzip
+    -   ETag per file so returning browsers get a 304
+'''
+import os
+try:
+    from binascii import crc32
+except ImportError:
+    crc32 = None
+
+class StaticAsset:
+    '''
+    One servable file
+    '''
+    def __init__(self, path: str, content_type: str, gzipped: bool, size: int, etag: str):
+        '''
+        :param path: file path on flash
+        :param content_type: value of the Content-Type header
+        :param gzipped: True if the file is the gzip variant produced at deploy time
+        :param size: size in bytes of the file
+        :param etag: quoted ETag value
+        '''
+        self.path = path
+        self.content_type = content_type
+        self.gzipped = gzipped
+        self.size = size
+        self.etag = etag
+        self.data = None  # set when the whole file is cached in RAM
+        self.plain = None  # StaticAsset of the plain file of a gzip variant, if it was deployed too
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    '''
+    True if an Accept-Encoding value lists gzip, or *, without q=0
+    '''
+    if accept_encoding is None:
+        return False
+    gzip_q = None
+    any_q = None
+    for coding in accept_encoding.split(','):
+        params = coding.split(';')
+        name = params[0].strip().lower()
+        if name not in ('gzip', 'x-gzip', '*'):
+            continue
+        q = 1.0
+        for param in params[1:]:
+            param = param.strip()
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if name == '*':
+            any_q = q
+        else:
+            gzip_q = q
+    q = gzip_q if gzip_q is not None else any_q
+    return q is not None and q > 0
+
+class StaticAssets:
+    '''
+    Index of the files the server is allowed to serve
+    '''
+    DEFAULT_RAM_BUDGET = 8192
+    CHUNK_SIZE = 512
+    GZIP_SUFFIX = '.gz'
+    CONTENT_TYPES = {
+            'html': 'text/html',
+            'css': 'text/css',
+            'js': 'application/javascript',
+            'json': 'application/json',
+            'ico': 'image/x-icon',
+            'png': 'image/png',
+            'svg': 'image/svg+xml'
+            }
+    DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+
+    def __init__(self, names: tuple, ram_budget: int=DEFAULT_RAM_BUDGET, chunk_size: int=CHUNK_SIZE):
+        '''
+        :param names: file names that may be served, urls are '/' + name
+        :param ram_budget: total bytes of file content kept in RAM, the rest is streamed from flash
+        :param chunk_size: size of the buffer used to stream and hash files
+        '''
+        self.ram_budget = ram_budget
+        self.ram_used = 0
+        self._chunk = bytearray(chunk_size)
+        self._chunk_mv = memoryview(self._chunk)
+
+        self.assets = {}
+        for name in names:
+            asset = self.index(name)
+            if asset is not None:
+                self.assets[name] = asset
+            else:
+                print(f"Static asset not found: {name}")
+
+    @property
+    def names(self):
+        return tuple(self.assets.keys())
+
+    def index(self, name: str) -> StaticAsset:
+        '''
+        returns the StaticAsset of name, the gzip variant wins if it exists, with the plain file as its `plain`
+        returns None if neither exists
+        '''
+        content_type = self.CONTENT_TYPES.get(name.split('.')[-1], self.DEFAULT_CONTENT_TYPE)
+        # the gzip variant is loaded first, it gets the RAM budget before the plain file
+        asset = self.load(name + self.GZIP_SUFFIX, content_type, True)
+        plain = self.load(name, content_type, False)
+        if asset is None:
+            return plain
+        asset.plain = plain
+        return asset
+
+    def load(self, path: str, content_type: str, gzipped: bool) -> StaticAsset:
+        '''
+        StaticAsset of the file at path, cached in RAM if it fits the budget, None if it doesn't exist
+        '''
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        size = stat[6]
+        asset = StaticAsset(path, content_type, gzipped, size, self.etag(path, stat))
+        if self.ram_used + size <= self.ram_budget:
+            with open(path, 'rb') as f:
+                asset.data = f.read()
+            self.ram_used += size
+        return asset
+
+    def etag(self, path: str, stat: tuple) -> str:
+        '''
+        content hash of the file, falls back to size and mtime if crc32 isn't available
+        '''
+        if crc32 is None:
+            return f'"{stat[6]:x}-{stat[8]:x}"'
+
+        crc = 0
+        with open(path, 'rb') as f:
+            while True:
+                n = f.readinto(self._chunk)
+                if not n:
+                    break
+                crc = crc32(self._chunk_mv[:n], crc)
+        return f'"{crc & 0xffffffff:08x}"'
+
+    def get(self, url_path: str) -> StaticAsset:
+        '''
+        returns the indexed asset for the url path or None,
+        anything that wasn't indexed at boot can't be served
+        '''
+        return self.assets.get(url_path.lstrip('/'), None)
+
+    def select(self, asset: StaticAsset, accept_encoding: str) -> StaticAsset:
+        '''
+        the variant of asset to send to a client with the given Accept-Encoding value,
+        None if the client accepts none of the deployed ones
+        without the header any coding is acceptable, the plain file is still preferred then
+        '''
+        if not asset.gzipped or accepts_gzip(accept_encoding):
+            return asset
+        if asset.plain is not None:
+            return asset.plain
+        return asset if accept_encoding is None else None
+
+    def chunks(self, asset: StaticAsset):
+        '''
+        yields the body of asset, from RAM at once or from flash one chunk at a time
+        the chunk buffer is shared, each chunk must be sent before the next one is asked for
+        '''
+        if asset.data is not None:
+            yield asset.data
+            return
+
+        with open(asset.path, 'rb') as f:
+            while True:
+                n = f.readinto(self._chunk)
+                if not n:
+                    break
+                yield self._chunk_mv[:n]
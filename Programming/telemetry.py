@@ -0,0 +1,75 @@
+'''
+Binary Telemetry
+Fixed size struct-packed record of all values for machine clients, served on /telemetry.bin
+    -   The sensor values are scaled to int16 like the DataLogger records, the actuators are one bitmap
+    -   The record is packed into a preallocated buffer, nothing is allocated per request
+    -   The layout is described by SCHEMA, served on /telemetry/schema, bumped with FORMAT_VERSION
+'''
+import json
+import struct
+import time
+from datalogger import DataLogger
+
+class Telemetry:
+    '''
+    Packs sensor and actuator snapshots into RECORD
+    '''
+    # header: magic, format version, record size, then seq (values version), boot id, timestamp,
+    # the SENSOR_FIELDS scaled to int16, actuator bitmap and a reserved byte
+    # seq restarts at 0 on every boot, the boot id tells collectors when it did
+    RECORD = '<4sBBIIIhhhhhhBB'
+    RECORD_SIZE = struct.calcsize(RECORD)
+    MAGIC = b'TLMY'
+    FORMAT_VERSION = 2
+    SENSOR_FIELDS = DataLogger.SENSOR_FIELDS
+    SENSOR_SCALES = DataLogger.SENSOR_SCALES
+    # bit of every actuator in the bitmap, the first ones match Actuators.bitmap
+    ACTUATOR_FIELDS = ('psuControl', 'blueLight', 'uvLight', 'buzzer', 'humidifier', 'autoManualSwitch')
+
+    def __init__(self, boot: int=0):
+        '''
+        :param boot: id drawn once per boot, the one in the /get_values ETag
+        '''
+        self.boot = boot
+        self.buffer = bytearray(self.RECORD_SIZE)
+        self.scaled = [0] * len(self.SENSOR_FIELDS)
+        self.schema_json = json.dumps(self.schema()).encode()
+
+    @classmethod
+    def schema(cls) -> dict:
+        '''
+        layout of RECORD, enough for a client to decode it without this file
+        '''
+        fields = [{'name': 'magic', 'type': '4s'}, {'name': 'version', 'type': 'B'}, {'name': 'size', 'type': 'B'},
+                  {'name': 'seq', 'type': 'I'}, {'name': 'boot', 'type': 'I'}, {'name': 'timestamp', 'type': 'I'}]
+        fields += [{'name': name, 'type': 'h', 'scale': scale} for name, scale in zip(cls.SENSOR_FIELDS, cls.SENSOR_SCALES)]
+        fields += [{'name': 'actuators', 'type': 'B', 'bits': list(cls.ACTUATOR_FIELDS)}, {'name': 'reserved', 'type': 'B'}]
+        return {'magic': cls.MAGIC.decode(), 'version': cls.FORMAT_VERSION, 'format': cls.RECORD,
+                'size': cls.RECORD_SIZE, 'fields': fields}
+
+    def encode(self, seq: int, sensors: dict, actuators: dict, timestamp: int=None) -> bytearray:
+        '''
+        packs one record into the reused buffer and returns it
+        :param seq: values version of the snapshots, the version part of the /get_values ETag
+        :param sensors: sensor snapshot keyed like SENSOR_FIELDS
+        :param actuators: actuator snapshot with 'on'/'off' values keyed like ACTUATOR_FIELDS
+        :param timestamp: seconds, defaults to time.time()
+        '''
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        scaled = self.scaled
+        for i in range(len(scaled)):
+            value = int(sensors[self.SENSOR_FIELDS[i]] * self.SENSOR_SCALES[i])
+            scaled[i] = min(max(value, -32768), 32767)
+
+        bitmap = 0
+        for bit in range(len(self.ACTUATOR_FIELDS)):
+            if actuators.get(self.ACTUATOR_FIELDS[bit], 'off') == 'on':
+                bitmap |= 1 << bit
+
+        # one argument per RECORD field, star-args would allocate
+        struct.pack_into(self.RECORD, self.buffer, 0, self.MAGIC, self.FORMAT_VERSION, self.RECORD_SIZE,
+                         seq & 0xffffffff, self.boot, timestamp & 0xffffffff,
+                         scaled[0], scaled[1], scaled[2], scaled[3], scaled[4], scaled[5], bitmap, 0)
+        return self.buffer
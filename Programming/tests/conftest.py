@@ -0,0 +1,27 @@
+'''
+Host tests of the firmware modules, run against the stand-ins of the host simulation
+
+    cd Programming && python -m pytest tests
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import sim
+from sim import board as sim_board
+
+# once for the whole session, the firmware modules bind machine and the time functions at import
+sim.install()
+
+@pytest.fixture
+def board():
+    '''
+    the simulated Board, shared by all tests, its buses and pins reset
+    '''
+    current = sim_board.current
+    current.pins.clear()
+    current.i2c_buses.clear()
+    current.spi_buses.clear()
+    return current
@@ -0,0 +1,87 @@
+'''
+Actuator changes as the server core publishes them, a bad one is rejected with 400 and never reaches the pins
+'''
+import json
+import pytest
+from actuators import Actuators
+from server2 import Server
+from shared_state import SharedState
+
+PINS = {'psuControl': 1, 'blueLight': 3, 'uvLight': 4, 'buzzer': 14, 'humidifier': 7}
+
+class FakeClient:
+    '''
+    socket stand-in for the request handlers, reads the request in one piece and keeps what the handlers send
+    '''
+    def __init__(self, request: bytes=b''):
+        self.request = request
+        self.data = b''
+
+    def recv(self, bufsize: int) -> bytes:
+        data = self.request[:bufsize]
+        self.request = self.request[bufsize:]
+        return data
+
+    def send(self, data) -> int:
+        self.data += data.encode() if isinstance(data, str) else bytes(data)
+        return len(data)
+
+    sendall = send
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def actuators(board):
+    return Actuators(PINS['psuControl'], PINS['blueLight'], PINS['uvLight'], PINS['buzzer'], PINS['humidifier'])
+
+@pytest.fixture
+def server(board):
+    actuators_state = SharedState({actuator_id: 'off' for actuator_id in Server.ACTUATOR_IDS})
+    # asyncio mode binds no socket until run(), the handlers are called directly
+    return Server(use_asyncio=True, sensors_state=SharedState({'temperature': 0}), actuators_state=actuators_state)
+
+def post(server: Server, path: str, body: bytes) -> tuple:
+    '''
+    (status code, body) of the response to a POST of body
+    '''
+    server.client = FakeClient(f'POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+    server.handle_html_request(server.identify_html_request())
+    head, _, content = server.client.data.partition(b'\r\n\r\n')
+    return int(head.split()[1]), content
+
+def test_update_skips_invalid_states(board, actuators):
+    actuators.update({'psuControl': 'on', 'buzzer': 'maybe', 'uvLight': None, 'blueLight': 1})
+
+    assert board.pins[PINS['psuControl']].level == 1
+    assert board.pins[PINS['blueLight']].level == 1
+    assert board.pins[PINS['buzzer']].level == 0
+    assert board.pins[PINS['uvLight']].level == 0
+
+@pytest.mark.parametrize('body', [
+    b'{"id": "psuControl", "state": "maybe"}',
+    b'{"id": "heater", "state": "on"}',
+    b'{"id": "psuControl"}',
+    b'["psuControl", "on"]',
+    b'not json',
+])
+def test_set_switch_state_rejects(server, body):
+    version = server.actuators_state.version
+
+    status, content = post(server, '/set_switch_state', body)
+
+    assert status == 400
+    assert 'error' in json.loads(content)
+    assert server.actuators_state.version == version
+
+def test_set_switch_state_publishes(server):
+    status, _ = post(server, '/set_switch_state', b'{"id": "psuControl", "state": "on"}')
+
+    assert status == 200
+    assert server.actuators_state.snapshot['psuControl'] == 'on'
+
+def test_actuators_rejects_whole_batch(server):
+    status, _ = post(server, '/actuators', b'{"buzzer": "on", "uvLight": "maybe"}')
+
+    assert status == 400
+    assert server.actuators_state.snapshot['buzzer'] == 'off'
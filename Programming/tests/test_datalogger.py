@@ -0,0 +1,60 @@
+'''
+DataLogger recovery and retention across reboots, on the host filesystem
+'''
+import os
+from datalogger import DataLogger
+
+VALUES = {'skinTemperature': 36.5, 'coverClosed': 1, 'humidity': 55.2, 'temperature': 37.1, 'motionSensor': 0, 'o2Level': 412}
+
+def boot(root, **options) -> DataLogger:
+    return DataLogger(str(root), page_size=4 * DataLogger.RECORD_SIZE, **options)
+
+def test_reboots_append_to_newest_segment(tmp_path):
+    for reboot in range(20):
+        logger = boot(tmp_path)
+        logger.log(VALUES, reboot, timestamp=reboot)
+        logger.flush()
+
+    assert logger.segments() == [1]
+    assert logger.segments_created == 0
+    assert [bitmap for _, _, bitmap in logger.records()] == list(range(20))
+
+def test_torn_record_skipped(tmp_path):
+    logger = boot(tmp_path)
+    for i in range(3):
+        logger.log(VALUES, i, timestamp=i)
+    logger.flush()
+    # power cut halfway through the fourth record
+    with open(logger.segment_path(logger.seq), 'ab') as f:
+        f.write(b'\x07' * (DataLogger.RECORD_SIZE // 2))
+
+    logger = boot(tmp_path)
+    assert logger.segment_records == 4
+    logger.log(VALUES, 3, timestamp=3)
+    logger.flush()
+
+    records = list(logger.records())
+    assert [bitmap for _, _, bitmap in records] == [0, 1, 2, 3]
+    assert records[0][1] == (36.5, 1, 55.2, 37.1, 0, 412)
+    assert os.stat(logger.segment_path(logger.seq))[6] == DataLogger.HEADER_SIZE + 5 * DataLogger.RECORD_SIZE
+
+def test_full_segment_starts_new_one(tmp_path):
+    segment_size = DataLogger.HEADER_SIZE + 8 * DataLogger.RECORD_SIZE
+    logger = boot(tmp_path, segment_size=segment_size)
+    for i in range(8):
+        logger.log(VALUES, i, timestamp=i)
+    logger.flush()
+
+    logger = boot(tmp_path, segment_size=segment_size)
+    assert logger.segments() == [1, 2]
+    assert logger.segment_records == 0
+
+def test_retention(tmp_path):
+    segment_size = DataLogger.HEADER_SIZE + 4 * DataLogger.RECORD_SIZE
+    logger = boot(tmp_path, segment_size=segment_size, max_segments=3)
+    for i in range(40):
+        logger.log(VALUES, i, timestamp=i)
+    logger.flush()
+
+    assert logger.segments() == [8, 9, 10]
+    assert [bitmap for _, _, bitmap in logger.records()] == list(range(28, 40))
@@ -0,0 +1,50 @@
+'''
+/history bodies against the head they were announced with, while the controller core keeps adding samples
+'''
+import struct
+from history import History
+from server2 import Server
+from shared_state import SharedState
+
+class FakeClient:
+    '''
+    socket stand-in for the request handlers, keeps what the handlers send
+    '''
+    def __init__(self, request: bytes):
+        self.request = request
+        self.data = b''
+
+    def recv(self, bufsize: int) -> bytes:
+        data = self.request[:bufsize]
+        self.request = self.request[bufsize:]
+        return data
+
+    def send(self, data) -> int:
+        self.data += data.encode() if isinstance(data, str) else bytes(data)
+        return len(data)
+
+    sendall = send
+
+    def close(self):
+        pass
+
+def test_bucket_closed_after_head(board):
+    history = History(('temperature',))
+    for now in range(10):
+        history.add({'temperature': 36.5}, now)
+    # asyncio mode leaves the body to handle_client, which drains the writer after the head
+    server = Server(use_asyncio=True, sensors_state=SharedState({'temperature': 0}), history=history)
+    server.client = FakeClient(b'GET /history?sensor=temperature&tier=0 HTTP/1.1\r\n\r\n')
+    server.handle_html_request(server.identify_html_request())
+
+    # the controller core closes two more buckets before the body is asked for
+    history.add({'temperature': 37.0}, 10)
+    history.add({'temperature': 37.5}, 11)
+    server.send_body()
+
+    head, _, body = server.client.data.partition(b'\r\n\r\n')
+    length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+    _, _, _, _, count, _, end = struct.unpack_from(History.HEADER, body)
+    assert len(body) == length
+    assert count == 9
+    assert end == 9
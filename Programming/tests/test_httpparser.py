@@ -0,0 +1,202 @@
+'''
+httpparser.RequestParser on fixed requests and seeded random ones
+
+    -   Generated valid requests must parse to what was generated, however they are split into reads
+    -   Mutated requests may only be rejected with HTTPError or left incomplete
+'''
+import random
+import pytest
+from httpparser import RequestParser, HTTPError
+
+FUZZ_SEEDS = range(4)
+FUZZ_ITERATIONS = 500
+
+METHODS = ('GET', 'POST', 'PUT', 'DELETE', 'HEAD')
+PATH_CHARS = 'abcdefghijklmnopqrstuvwxyz0123456789_-./'
+HEADER_NAMES = ('Host', 'Accept', 'User-Agent', 'Connection', 'If-None-Match', 'Accept-Encoding', 'X-Filler')
+
+class Pieces:
+    '''
+    socket stand-in handing out data in pieces of random lengths
+    '''
+    def __init__(self, data: bytes, rng: random.Random):
+        self.data = data
+        self.rng = rng
+
+    def recv(self, bufsize: int) -> bytes:
+        n = min(bufsize, self.rng.randint(1, 64))
+        data = self.data[:n]
+        self.data = self.data[n:]
+        return data
+
+def random_case(name: str, rng: random.Random) -> str:
+    return ''.join(c.upper() if rng.random() < 0.5 else c.lower() for c in name)
+
+def generate(rng: random.Random) -> tuple:
+    '''
+    returns (request bytes, expected fields)
+    '''
+    method = rng.choice(METHODS)
+    path = '/' + ''.join(rng.choice(PATH_CHARS) for _ in range(rng.randint(0, 40)))
+    query = {f'k{i}': ''.join(rng.choice(PATH_CHARS) for _ in range(rng.randint(0, 8))) for i in range(rng.randint(0, 3))}
+    target = path + ('?' + '&'.join(f'{k}={v}' for k, v in query.items()) if query else '')
+    body = bytes(rng.randint(0, 255) for _ in range(rng.randint(0, 300))) if method in ('POST', 'PUT') else b''
+
+    headers = []
+    expected_headers = {}
+    for name in rng.sample(HEADER_NAMES, rng.randint(0, len(HEADER_NAMES))):
+        value = ''.join(rng.choice(PATH_CHARS) for _ in range(rng.randint(0, 30)))
+        headers.append(f'{random_case(name, rng)}:{" " * rng.randint(0, 2)}{value}')
+        expected_headers[name.lower()] = value
+    if body or rng.random() < 0.3:
+        headers.append(f'{random_case("Content-Length", rng)}: {len(body)}')
+    rng.shuffle(headers)
+
+    newline = '\r\n' if rng.random() < 0.9 else '\n'
+    head = f'{method} {target} HTTP/1.{rng.randint(0, 1)}{newline}' + ''.join(h + newline for h in headers) + newline
+    expected = {'route': f'{method} {path}', 'query': query, 'headers': expected_headers, 'body': body}
+    return head.encode() + body, expected
+
+def check_valid(parser: RequestParser, request: bytes, expected: dict, rng: random.Random):
+    parser.reset()
+    assert parser.read(Pieces(request, rng)), 'incomplete'
+    assert parser.route == expected['route'], (parser.route, expected['route'])
+    for key, value in expected['query'].items():
+        assert parser.query(key) == value, (key, parser.query(key), value)
+    for name in (b'connection', b'if-none-match', b'accept-encoding'):
+        assert parser.header(name) == expected['headers'].get(name.decode(), None), name
+    assert bytes(parser.body) == expected['body']
+
+def mutate(request: bytes, rng: random.Random) -> bytes:
+    data = bytearray(request)
+    for _ in range(rng.randint(1, 8)):
+        choice = rng.random()
+        position = rng.randint(0, len(data))
+        if choice < 0.4 and data:
+            data[min(position, len(data) - 1)] = rng.randint(0, 255)
+        elif choice < 0.7:
+            data[position:position] = bytes(rng.choice((b'\r\n', b':', b' ', b'?', b'\x00', b'9' * 8)))
+        elif choice < 0.9:
+            del data[position:position + rng.randint(1, 16)]
+        else:
+            data[position:position] = b'A' * rng.randint(100, 2000)
+    return bytes(data)
+
+def check_mutated(parser: RequestParser, request: bytes, rng: random.Random):
+    parser.reset()
+    try:
+        if parser.read(Pieces(request, rng)):
+            parser.route
+            parser.body
+    except HTTPError:
+        pass
+
+@pytest.mark.parametrize('seed', FUZZ_SEEDS)
+def test_fuzz(seed):
+    rng = random.Random(seed)
+    parser = RequestParser()
+    for _ in range(FUZZ_ITERATIONS):
+        request, expected = generate(rng)
+        check_valid(parser, request, expected, rng)
+        check_mutated(parser, mutate(request, rng), rng)
+
+class Chunks:
+    '''
+    socket stand-in whose recv returns the given chunks, one per call, then nothing
+    '''
+    def __init__(self, *chunks):
+        self.chunks = list(chunks)
+
+    def recv(self, bufsize: int) -> bytes:
+        if not self.chunks:
+            return b''
+        chunk = self.chunks.pop(0)
+        if bufsize < len(chunk):
+            self.chunks.insert(0, chunk[bufsize:])
+        return chunk[:bufsize]
+
+def parse(*chunks, parser: RequestParser=None) -> RequestParser:
+    parser = parser or RequestParser()
+    assert parser.read(Chunks(*chunks))
+    return parser
+
+def test_request_line_and_headers():
+    parser = parse(b'GET /history?sensor=temperature&tier=1 HTTP/1.1\r\nHost: pico\r\nIF-NONE-MATCH:  "abc" \r\n\r\n')
+    assert parser.method == 'GET'
+    assert parser.route == 'GET /history'
+    assert parser.path == '/history'
+    assert parser.http11
+    assert parser.header(b'if-none-match') == '"abc"'
+    assert parser.header_equals(b'if-none-match', b'"abc"')
+    assert parser.header(b'connection') is None
+    assert bytes(parser.body) == b''
+
+def test_query():
+    parser = parse(b'GET /get_values?since=abc-3&flag&empty=&a=1=2 HTTP/1.0\r\n\r\n')
+    assert not parser.http11
+    assert parser.query('since') == 'abc-3'
+    assert parser.query('flag') == ''
+    assert parser.query('empty') == ''
+    assert parser.query('a') == '1=2'
+    assert parser.query('since=abc') is None
+    assert parser.query('missing') is None
+    assert parse(b'GET /get_values HTTP/1.1\r\n\r\n').query('since') is None
+
+def test_split_reads():
+    request = b'POST /actuators HTTP/1.1\r\nContent-Length: 17\r\n\r\n{"buzzer": "on"}\n'
+    parser = parse(*(request[i:i + 1] for i in range(len(request))))
+    assert parser.route == 'POST /actuators'
+    assert bytes(parser.body) == b'{"buzzer": "on"}\n'
+
+def test_bare_line_feeds_and_leading_blank_lines():
+    parser = parse(b'\r\n\nGET / HTTP/1.1\nConnection: close\n\n')
+    assert parser.route == 'GET /'
+    assert parser.header(b'connection') == 'close'
+
+def test_pipelined_requests():
+    first = b'POST /set_switch_state HTTP/1.1\r\nContent-Length: 4\r\n\r\nbody'
+    second = b'GET /get_values HTTP/1.1\r\n\r\n'
+    third = b'GET / HTTP/1.1\r\n'
+    parser = parse(first + second + third)
+    assert parser.route == 'POST /set_switch_state'
+    assert bytes(parser.body) == b'body'
+
+    parser.next()
+    assert parser.complete
+    assert parser.route == 'GET /get_values'
+
+    # the rest of the third request arrives later
+    parser.next()
+    assert not parser.complete
+    parse(b'Connection: close\r\n\r\n', parser=parser)
+    assert parser.route == 'GET /'
+    assert parser.header(b'connection') == 'close'
+
+def test_closed_before_request():
+    assert not RequestParser().read(Chunks())
+
+@pytest.mark.parametrize('chunks, status', [
+    ((b'GET / HTTP/1.1\r\nHost: pi',), 400),  # closed mid request
+    ((b'GET  / HTTP/1.1\r\n\r\n',), 400),
+    ((b'GET index.html HTTP/1.1\r\n\r\n',), 400),
+    ((b'GET / HTTP/1.1\r\nno colon\r\n\r\n',), 400),
+    ((b'POST / HTTP/1.1\r\nContent-Length: 1x\r\n\r\n',), 400),
+    ((b'POST / HTTP/1.1\r\nContent-Length: 100000\r\n\r\n',), 413),
+    ((b'GET / HTTP/1.1\r\nX-Filler: ' + b'a' * 2000 + b'\r\n\r\n',), 431),
+    ((b'GET / HTTP/1.1\r\n' + b'X: y\r\n' * 40 + b'\r\n',), 431),
+    ((b'GET / HTTP/2.0\r\n\r\n',), 505),
+    ((b'GET / FTP/1.1\r\n\r\n',), 505),
+    ((b'POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n',), 501),
+])
+def test_rejected(chunks, status):
+    with pytest.raises(HTTPError) as error:
+        RequestParser().read(Chunks(*chunks))
+    assert error.value.status == status
+
+def test_body_limit():
+    size = RequestParser.DEFAULT_BODY_SIZE
+    head = b'POST /actuators HTTP/1.1\r\nContent-Length: %d\r\n\r\n'
+    assert len(parse(head % size + b'x' * size).body) == size
+    with pytest.raises(HTTPError) as error:
+        RequestParser().read(Chunks(head % (RequestParser.DEFAULT_HEAD_SIZE + size)))
+    assert error.value.status == 413
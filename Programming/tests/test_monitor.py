@@ -0,0 +1,48 @@
+'''
+Monitor refresh on the simulated timer, the timer only flags the refresh and tick() does the drawing
+'''
+from types import SimpleNamespace
+import pytest
+from monitor import Monitor
+
+class FakeSensors:
+    def __init__(self):
+        for name in ('ntc3950', 'limit_switch', 'motion_sensor', 'mq135', 'dht22_temp', 'dht22_humidity'):
+            setattr(self, name, SimpleNamespace(latest_value=0))
+
+@pytest.fixture
+def monitor(board):
+    monitor = Monitor(FakeSensors(), 19, 18)
+    # the first screen is queued by the constructor, sent before the tests start
+    while not monitor.tick():
+        pass
+    yield monitor
+    monitor.stop()
+
+def test_timer_does_not_draw(board, monitor):
+    bus = monitor.display.i2c
+    buffer = bytes(monitor.display.buffer)
+    transactions = bus.transactions
+
+    board.clock.advance(3 * Monitor.DEFAULT_REFRESH_PERIOD * 1000)
+
+    assert bus.transactions == transactions
+    assert monitor.display.buffer == buffer
+    assert monitor.display.frame_complete
+
+def test_tick_refreshes(board, monitor):
+    # fields on the first and last page of the first screen
+    monitor.sensors.ntc3950.latest_value = 37.2
+    monitor.sensors.mq135.latest_value = 415
+    board.clock.advance(Monitor.DEFAULT_REFRESH_PERIOD * 1000)
+    transactions = monitor.display.i2c.transactions
+
+    # virtual time doesn't pass during the transfers, the whole frame fits any budget
+    assert monitor.tick()
+    assert monitor.display.i2c.transactions == transactions + 4  # window and data of both pages
+    assert monitor.display.back_buffer == monitor.display.buffer
+
+def test_refreshes_merge(board, monitor):
+    board.clock.advance(2 * Monitor.DEFAULT_REFRESH_PERIOD * 1000)
+    monitor.tick()
+    assert monitor._ticks == Monitor.DEFAULT_REFRESH_PERIOD
@@ -0,0 +1,99 @@
+'''
+MQ135 reading path on a fake ADC with known codes, temperatures and humidities
+'''
+import pytest
+from machine import ADC
+from mq135 import MQ135
+from filters import MovingAverage
+from sampler import Sampler
+import main as firmware
+
+class FakeADC:
+    '''
+    read_u16 returns the given codes in turn, the last one forever
+    '''
+    def __init__(self, *codes):
+        self.codes = list(codes)
+        self.reads = 0
+
+    def read_u16(self) -> int:
+        self.reads += 1
+        return self.codes.pop(0) if len(self.codes) > 1 else self.codes[0]
+
+def mq135(*codes, **options) -> MQ135:
+    sensor = MQ135(26, **options)
+    sensor.adc = FakeADC(*codes)
+    return sensor
+
+def code_of(ppm: float, temperature: float, humidity: float) -> int:
+    '''
+    load resistor code of a sensor at ppm, from the datasheet curve and the balk77 correction
+    '''
+    if temperature < 20:
+        correction = 0.00035 * temperature ** 2 - 0.02718 * temperature + 1.39538 - (humidity - 33) * 0.0018
+    else:
+        correction = -0.003333333 * temperature - 0.001923077 * humidity + 1.130128205
+    resistance = correction * 76.63 * (ppm / 116.6020682) ** (-1 / 2.769034857)
+    return round(65535 / (resistance / 10 + 1))
+
+def test_known_code():
+    # R = (65535 / 32768 - 1) * 10 kOhm, corrected by 0.95064 at 25'C 50%
+    assert mq135(32768).read_corrected_ppm(25, 50) == pytest.approx(28497.1, abs=0.1)
+
+@pytest.mark.parametrize('ppm', (400, 1000, 5000))
+@pytest.mark.parametrize('temperature, humidity', ((10, 30), (19.9, 60), (20, 40), (37, 55)))
+def test_temperature_humidity_compensation(ppm, temperature, humidity):
+    code = code_of(ppm, temperature, humidity)
+    # the code is rounded to an integer, about 0.03% of ppm at these codes
+    assert mq135(code).read_corrected_ppm(temperature, humidity) == pytest.approx(ppm, rel=1e-3)
+
+def test_no_value_on_pin():
+    assert mq135(0).read_corrected_ppm(25, 50) == -1
+    assert mq135(0, 0, 0, 0, num_samples=4).read_corrected_ppm(25, 50) == -1
+
+def test_samples_averaged():
+    sensor = mq135(30000, 30010, 29990, 30000, num_samples=4)
+    assert sensor.read_corrected_ppm(21, 33) == pytest.approx(mq135(30000).read_corrected_ppm(21, 33))
+    assert sensor.adc.reads == 4
+
+def test_samples_filtered():
+    sensor = mq135(30000, num_samples=4, adc_filter=MovingAverage(16))
+    assert sensor.read_corrected_ppm(21, 33) == pytest.approx(mq135(30000).read_corrected_ppm(21, 33))
+    assert sensor.adc.reads == 4
+
+def test_adc_created_once():
+    sensor = MQ135(26)
+    adc = sensor.adc
+    sensor.read_corrected_ppm(25, 50)
+    sensor.read_corrected_ppm(25, 50)
+    assert sensor.adc is adc
+
+def test_full_scale_code():
+    # a resistance of 0 is off the ppm curve
+    assert mq135(65535).read_corrected_ppm(25, 50) == -1
+    assert mq135(65535).get_resistance() == -1
+
+def test_digital_fallback(board, monkeypatch):
+    def no_adc(pin):
+        raise ValueError('Pin doesn\'t have ADC capabilities')
+    monkeypatch.setattr('mq135.ADC', no_adc)
+    sensor = MQ135(8)
+
+    assert sensor.adc is None
+    assert sensor.read_corrected_ppm(25, 50) == -1
+    board.pins[8].level = 1
+    assert sensor.gas_detected() is False
+    board.pins[8].level = 0
+    assert sensor.gas_detected() is True
+
+def test_board_wiring(board):
+    # GP8 has no ADC, like on the rp2 port the simulated ADC rejects it
+    with pytest.raises(ValueError):
+        ADC(8)
+    assert ADC(2).pin_id == 28
+
+    sensors = firmware.make_sensors(Sampler(100))
+    assert sensors.mq135.handler.adc is None
+    assert sensors.mq135_read() == -1
+    board.clock.advance(100000)
+    assert sensors.mq135.handler.gas_detected() is False
@@ -0,0 +1,49 @@
+'''
+LUT mode of ntc3950.Thermistor against the exact equation, over every raw read_u16 code
+'''
+import pytest
+from ntc3950 import Thermistor
+
+# as wired in main.make_sensors
+R_DIVIDER = 100200
+VCC = 3.274
+B_FACTOR = 3950
+R_NOMINAL = 100000
+ROOM_TEMP = 25
+
+def thermistor(**lut_options) -> Thermistor:
+    return Thermistor(28, R_DIVIDER, VCC, 5, B_FACTOR, R_NOMINAL, ROOM_TEMP, **lut_options)
+
+@pytest.mark.parametrize('lut_max_error', (0.2, 0.05, 0.02))
+def test_lut_error_inside_rated_range(lut_max_error):
+    ntc = thermistor(lut_bits=8, lut_max_error=lut_max_error)
+    T_min, T_max = Thermistor.LUT_TEMP_RANGE
+
+    error = 0
+    for code in range(65536):
+        T = ntc.code_to_T(code)
+        if T_min <= T <= T_max:
+            error = max(error, abs(ntc.lookup_T(code) / 100 - T))
+
+    assert error <= lut_max_error
+    assert error <= ntc.lut_error_bound
+    assert error == ntc.lut_error()
+
+def test_lut_over_full_adc_range():
+    '''
+    outside the rated range the LUT stays monotonic and exact at its entries
+    '''
+    ntc = thermistor(lut_bits=8)
+    previous = ntc.lookup_T(0)
+    for code in range(65536):
+        T = ntc.lookup_T(code)
+        assert T <= previous
+        previous = T
+        if code & ntc.lut_mask == 0:
+            assert T == round(ntc.code_to_T(code) * 100)
+
+def test_lut_grows_until_bound_met():
+    coarse = thermistor(lut_bits=6, lut_max_error=0.5)
+    fine = thermistor(lut_bits=6, lut_max_error=0.05)
+    assert fine.lut_shift < coarse.lut_shift
+    assert fine.lut_error_bound <= 0.05
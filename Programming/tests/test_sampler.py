@@ -0,0 +1,99 @@
+'''
+Sampler on the simulated machine.Timer, driven by the virtual clock
+'''
+import pytest
+import micropython
+from sampler import Sampler, SampleChannel
+
+class Source:
+    '''
+    read() returns 1, 2, 3... and records the virtual time of every read
+    '''
+    def __init__(self, clock):
+        self.clock = clock
+        self.times = []
+
+    def read(self) -> int:
+        self.times.append(self.clock.now_us)
+        return len(self.times)
+
+@pytest.fixture
+def clock(board):
+    return board.clock
+
+@pytest.fixture
+def sampler():
+    sampler = Sampler(100)
+    yield sampler
+    sampler.stop()
+
+def test_sample_spacing(clock, sampler):
+    fast = Source(clock)
+    slow = Source(clock)
+    sampler.add_channel(fast.read, 128)
+    sampler.add_channel(slow.read, 16, divider=10)
+    sampler.start()
+    clock.advance(1000000)
+
+    assert len(fast.times) == 100
+    assert len(slow.times) == 10
+    assert {b - a for a, b in zip(fast.times, fast.times[1:])} == {10000}
+    assert {b - a for a, b in zip(slow.times, slow.times[1:])} == {100000}
+    assert sampler.missed == 0
+
+def test_drain_in_bulk(clock, sampler):
+    source = Source(clock)
+    channel = sampler.add_channel(source.read, 16)
+    sampler.start()
+
+    clock.advance(50000)
+    assert channel.count == 5
+    assert channel.drain() == 3  # mean of 1..5
+    assert channel.count == 0
+    assert channel.drain() == 3  # nothing new, the previous value
+
+    clock.advance(30000)
+    assert channel.drain() == 7  # mean of 6..8
+
+def test_overflow(clock, sampler):
+    source = Source(clock)
+    channel = sampler.add_channel(source.read, 8)
+    sampler.start()
+    clock.advance(200000)
+
+    assert channel.captured == 20
+    assert channel.count == 8
+    assert channel.overflows == 12
+    assert channel.drain() == 16  # mean of the newest 13..20
+    assert channel.count == 0
+
+def test_capture_during_drain():
+    '''
+    a sample captured on the other core while draining stays for the next drain
+    '''
+    values = iter(range(1, 100))
+    channel = SampleChannel(lambda: next(values), 8)
+    for _ in range(4):
+        channel.capture()
+
+    class CapturingFilter:
+        value = 0
+        def add(self, code):
+            if code == 1:
+                channel.capture()
+            self.value = code
+
+    channel.drain(CapturingFilter())
+    assert channel.count == 1
+    assert channel.drain() == 5
+
+def test_missed_ticks(sampler):
+    '''
+    a tick is counted as missed when the schedule queue is full
+    '''
+    sampler.start()
+    for _ in range(micropython.SCHEDULE_DEPTH):
+        micropython.schedule(lambda _: None, None)
+    sampler._on_timer(None)
+    assert sampler.missed == 1
+    micropython.scheduler.run()
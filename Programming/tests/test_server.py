@@ -0,0 +1,162 @@
+'''
+The asyncio mode of server2.Server over a local socket, with real connections and the event loop of the test
+'''
+import asyncio
+import json
+import os
+import pytest
+from server2 import Server
+from shared_state import SharedState
+
+PROGRAMMING = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def request(reader, writer, target: str, headers: str='') -> tuple:
+    writer.write(f'GET {target} HTTP/1.1\r\nHost: pico\r\n{headers}\r\n'.encode())
+    return await response(reader)
+
+async def response(reader) -> tuple:
+    '''
+    (status code, {lowercase header: value}, body) of the next response, the body read by its Content-Length
+    '''
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode().split('\r\n')[:-2]
+    fields = {}
+    for line in lines[1:]:
+        name, value = line.split(': ', 1)
+        fields[name.lower()] = value
+    body = await reader.readexactly(int(fields.get('content-length', 0)))
+    return int(lines[0].split()[1]), fields, body
+
+async def closed(reader) -> bool:
+    return await asyncio.wait_for(reader.read(1), 2) == b''
+
+def serve(scenario):
+    '''
+    runs scenario(server, connect) against a server listening on a free port of localhost
+    '''
+    async def main():
+        sensors_state = SharedState({'temperature': 36.5, 'humidity': 50})
+        actuators_state = SharedState({'psuControl': 'off'})
+        server = Server(use_asyncio=True, sensors_state=sensors_state, actuators_state=actuators_state)
+        await server.start('127.0.0.1', 0)
+        port = server.async_server.sockets[0].getsockname()[1]
+        try:
+            await scenario(server, lambda: asyncio.open_connection('127.0.0.1', port))
+        finally:
+            server.async_server.close()
+    asyncio.run(main())
+
+@pytest.fixture(autouse=True)
+def web_files(board, monkeypatch):
+    # index.html is served from the working directory, like from the root of the flash
+    monkeypatch.chdir(PROGRAMMING)
+
+def test_get_web():
+    async def scenario(server, connect):
+        reader, writer = await connect()
+        status, fields, body = await request(reader, writer, '/')
+        assert status == 200
+        assert fields['content-type'] == 'text/html'
+        with open('index.html', 'rb') as f:
+            assert body == f.read()
+        writer.close()
+    serve(scenario)
+
+def test_values_kept_alive():
+    async def scenario(server, connect):
+        reader, writer = await connect()
+        status, fields, body = await request(reader, writer, '/get_values')
+        assert status == 200
+        assert fields['connection'] == 'keep-alive'
+        assert json.loads(body)['temperature'] == 36.5
+
+        # same connection, the client already has these values
+        status, fields, body = await request(reader, writer, '/get_values', f'If-None-Match: {fields["etag"]}\r\n')
+        assert status == 304
+        assert body == b''
+
+        server.sensors_state.update({'temperature': 37.0})
+        status, _, body = await request(reader, writer, '/get_values', f'If-None-Match: {fields["etag"]}\r\n')
+        assert status == 200
+        assert json.loads(body)['temperature'] == 37.0
+
+        status, fields, _ = await request(reader, writer, '/get_values', 'Connection: close\r\n')
+        assert fields['connection'] == 'close'
+        assert await closed(reader)
+        writer.close()
+    serve(scenario)
+
+def test_pipelined_requests():
+    async def scenario(server, connect):
+        reader, writer = await connect()
+        writer.write(b'GET /get_values HTTP/1.1\r\n\r\nGET /get_values?since= HTTP/1.1\r\n\r\nGET /missing HTTP/1.1\r\nConnection: close\r\n\r\n')
+        status, _, body = await response(reader)
+        assert status == 200
+        assert json.loads(body)['humidity'] == 50
+        status, _, body = await response(reader)
+        assert status == 200
+        assert json.loads(body)['full'] is True
+        status, _, _ = await response(reader)
+        assert status == 404
+        assert await closed(reader)
+        writer.close()
+    serve(scenario)
+
+def test_parser_pool_exhausted():
+    async def scenario(server, connect):
+        # every idle connection holds a parser until it sends its request
+        held = [await connect() for _ in range(Server.REQUEST_PARSERS)]
+        await asyncio.sleep(0.1)
+        assert not server.free_parsers
+
+        reader, writer = await connect()
+        status, fields, _ = await response(reader)
+        assert status == 503
+        assert fields['retry-after'] == '1'
+        assert await closed(reader)
+        writer.close()
+
+        # a parser is back once one of the held connections is served
+        held_reader, held_writer = held.pop()
+        held_writer.write(b'GET /get_values HTTP/1.1\r\nConnection: close\r\n\r\n')
+        status, _, _ = await response(held_reader)
+        assert status == 200
+        assert await closed(held_reader)
+        held_writer.close()
+        await asyncio.sleep(0.1)
+        reader, writer = await connect()
+        status, _, _ = await request(reader, writer, '/get_values')
+        assert status == 200
+
+        for _, held_writer in held:
+            held_writer.close()
+        writer.close()
+    serve(scenario)
+
+async def event(reader) -> dict:
+    '''
+    data of the next event, keep-alive comments skipped
+    '''
+    while True:
+        block = await asyncio.wait_for(reader.readuntil(b'\n\n'), 2)
+        for line in block.decode().split('\n'):
+            if line.startswith('data: '):
+                return json.loads(line[6:])
+
+def test_events():
+    async def scenario(server, connect):
+        reader, writer = await connect()
+        writer.write(b'GET /events HTTP/1.1\r\n\r\n')
+        head = await reader.readuntil(b'\r\n\r\n')
+        assert head.startswith(b'HTTP/1.1 200 OK\r\n')
+        assert b'Content-Type: text/event-stream\r\n' in head
+
+        # all values first, then only the changed ones
+        values = await event(reader)
+        assert values['temperature'] == 36.5
+        assert values['psuControl'] == 'off'
+        server.actuators_state.update({'psuControl': 'on'})
+        assert await event(reader) == {'psuControl': 'on'}
+        assert server.event_streams == 1
+        writer.close()
+    serve(scenario)
@@ -0,0 +1,205 @@
+'''
+SSD1306 driver traffic on the simulated buses
+The buses decode the commands and data into an emulated display RAM (GDDRAM),
+so partial refreshes are checked against what the panel would show as well as counted
+'''
+import pytest
+from machine import I2C, SPI, Pin
+import ssd1306
+
+# number of argument bytes of the commands that take any
+COMMAND_ARGS = {0x20: 1, 0x21: 2, 0x22: 2, 0x81: 1, 0x8D: 1, 0xA8: 1, 0xD3: 1, 0xD5: 1, 0xD9: 1, 0xDA: 1, 0xDB: 1}
+
+class GDDRAM:
+    '''
+    display RAM written in horizontal addressing mode through the column and page address window
+    '''
+    def __init__(self, width: int=128, pages: int=8):
+        self.width = width
+        self.pages = pages
+        self.ram = bytearray(width * pages)
+        self.window = (0, width - 1, 0, pages - 1)
+        self.column = 0
+        self.page = 0
+        self.command = None
+        self.args = []
+        self.commands = 0
+        self.data_bytes = 0
+
+    def write_command(self, byte: int):
+        if self.command is None:
+            self.commands += 1
+            if COMMAND_ARGS.get(byte, 0):
+                self.command = byte
+                self.args = []
+            return
+        self.args.append(byte)
+        if len(self.args) < COMMAND_ARGS[self.command]:
+            return
+        x0, x1, page0, page1 = self.window
+        if self.command == 0x21:
+            x0, x1 = self.args
+            self.column = x0
+        elif self.command == 0x22:
+            page0, page1 = self.args
+            self.page = page0
+        self.window = (x0, x1, page0, page1)
+        self.command = None
+
+    def write_data(self, data):
+        x0, x1, page0, page1 = self.window
+        for byte in bytes(data):
+            self.ram[self.page * self.width + self.column] = byte
+            self.data_bytes += 1
+            self.column += 1
+            if self.column > x1:
+                self.column = x0
+                self.page = page0 if self.page >= page1 else self.page + 1
+
+class GDDRAMI2C(I2C):
+    '''
+    sim I2C bus with a display at 0x3C, a control byte of 0x00/0x80 is followed by commands, 0x40 by data
+    '''
+    def __init__(self, id: int=1):
+        super().__init__(id)
+        self.gddram = GDDRAM()
+
+    def writeto(self, addr: int, buf, stop: bool=True) -> int:
+        self.decode(bytes(buf))
+        return super().writeto(addr, buf, stop)
+
+    def writevto(self, addr: int, vector, stop: bool=True) -> int:
+        self.decode(b''.join(bytes(buf) for buf in vector))
+        return super().writevto(addr, vector, stop)
+
+    def decode(self, message: bytes):
+        if message[0] == 0x40:
+            self.gddram.write_data(message[1:])
+        elif message[0] == 0x80:
+            self.gddram.write_command(message[1])
+        else:
+            for byte in message[1:]:
+                self.gddram.write_command(byte)
+
+class GDDRAMSPI(SPI):
+    '''
+    sim SPI bus with a display whose D/C pin selects commands (0) or data (1)
+    '''
+    def __init__(self, dc: Pin, id: int=0):
+        super().__init__(id)
+        self.dc = dc
+        self.inits = 0
+        self.gddram = GDDRAM()
+
+    def init(self, *args, **kwargs):
+        self.inits += 1
+        super().init(*args, **kwargs)
+
+    def write(self, buf):
+        if self.dc.value():
+            self.gddram.write_data(buf)
+        else:
+            for byte in bytes(buf):
+                self.gddram.write_command(byte)
+        super().write(buf)
+
+def reset_counters(bus):
+    bus.bytes_written = 0
+    bus.transactions = 0
+    bus.gddram.commands = 0
+    bus.gddram.data_bytes = 0
+
+@pytest.fixture
+def i2c_display(board):
+    bus = GDDRAMI2C()
+    display = ssd1306.SSD1306_I2C(128, 64, bus)
+    reset_counters(bus)
+    return display, bus
+
+def test_i2c_full_frame(i2c_display):
+    display, bus = i2c_display
+    display.text('Temp: 37.1', 0, 0)
+    display.show_all()
+
+    assert bus.gddram.data_bytes == 1024
+    assert bus.transactions == 2  # one window, one run of all pages
+    assert bus.gddram.ram == display.buffer
+
+def test_i2c_partial_refresh(i2c_display):
+    '''
+    one changed digit sends its 8 columns of one page instead of the whole 1024 byte frame
+    '''
+    display, bus = i2c_display
+    display.text('Temp: 37.1', 0, 16)
+    display.show()
+    reset_counters(bus)
+
+    display.fill_rect(64, 16, 8, 8, 0)
+    display.text('2', 64, 16)
+    display.show()
+
+    assert bus.gddram.data_bytes == 8
+    assert bus.transactions == 2
+    assert bus.bytes_written == (1 + 6) + (1 + 8)  # control byte and window, control byte and data
+    assert bus.gddram.ram == display.buffer
+
+def test_i2c_nothing_changed(i2c_display):
+    display, bus = i2c_display
+    display.show()
+    assert bus.transactions == 0
+
+def test_i2c_scattered_changes(i2c_display):
+    display, bus = i2c_display
+    display.pixel(3, 5, 1)
+    display.text('ab', 100, 40)
+    display.hline(0, 63, 128, 1)
+    display.show()
+
+    assert bus.gddram.data_bytes == 1 + 16 + 128
+    assert bus.gddram.ram == display.buffer
+
+def spi_display(shared_bus: bool=False) -> tuple:
+    dc = Pin(20)
+    bus = GDDRAMSPI(dc)
+    display = ssd1306.SSD1306_SPI(128, 64, bus, dc, Pin(21), Pin(17), shared_bus=shared_bus)
+    return display, bus
+
+def test_spi_command_batches(board):
+    display, bus = spi_display()
+    # init_display: 16 commands, 25 bytes with their arguments, in one transfer, then the window and the frame
+    assert bus.gddram.commands == 16 + 2
+    assert bus.bytes_written == 25 + 6 + 1024
+    assert bus.transactions == 3
+    assert bus.inits == 1
+    assert bus.gddram.ram == display.buffer
+
+    reset_counters(bus)
+    display.set_window(0, 127, 0, 7)
+    assert bus.transactions == 1
+    # the per command path the batching replaced
+    ssd1306.SSD1306.write_cmds(display, display.window_cmds)
+    assert bus.transactions == 1 + len(display.window_cmds)
+
+def test_spi_partial_refresh(board):
+    display, bus = spi_display()
+    reset_counters(bus)
+    bus.inits = 0
+    cs = board.pins[17]
+    cs_writes = cs.writes
+
+    display.text('42', 32, 24)
+    display.show()
+
+    assert bus.transactions == 2
+    assert bus.bytes_written == 6 + 16
+    assert bus.inits == 0
+    assert cs.writes - cs_writes == 2 * 3  # every transfer is framed by one CS cycle
+    assert bus.gddram.ram == display.buffer
+
+def test_spi_shared_bus(board):
+    display, bus = spi_display(shared_bus=True)
+    reset_counters(bus)
+    bus.inits = 0
+    display.text('1', 0, 0)
+    display.show()
+    assert bus.inits == bus.transactions == 2
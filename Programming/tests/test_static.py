@@ -0,0 +1,120 @@
+'''
+Static assets and the content coding of GET / against the client's Accept-Encoding
+'''
+import gzip
+import pytest
+from static import StaticAssets, accepts_gzip
+from server2 import Server
+from shared_state import SharedState
+
+PAGE = b'<html>' + b'incubator ' * 100 + b'</html>'
+
+class FakeClient:
+    '''
+    socket stand-in for the request handlers, keeps what the handlers send
+    '''
+    def __init__(self, request: bytes):
+        self.request = request
+        self.data = b''
+
+    def recv(self, bufsize: int) -> bytes:
+        data = self.request[:bufsize]
+        self.request = self.request[bufsize:]
+        return data
+
+    def send(self, data) -> int:
+        self.data += data.encode() if isinstance(data, str) else bytes(data)
+        return len(data)
+
+    sendall = send
+
+    def close(self):
+        pass
+
+def deploy(path, plain: bool=True, gzipped: bool=True):
+    if plain:
+        (path / 'index.html').write_bytes(PAGE)
+    if gzipped:
+        (path / 'index.html.gz').write_bytes(gzip.compress(PAGE, mtime=0))
+
+def get(server: Server, headers: str='') -> tuple:
+    '''
+    (status code, {lowercase header: value}, body) of GET /
+    '''
+    server.client = FakeClient(f'GET / HTTP/1.1\r\n{headers}\r\n'.encode())
+    server.handle_html_request(server.identify_html_request())
+    server.send_body()
+    head, _, body = server.client.data.partition(b'\r\n\r\n')
+    lines = head.decode().split('\r\n')
+    fields = dict(line.lower().split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), fields, body
+
+@pytest.fixture
+def server(board, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    def make(**variants):
+        deploy(tmp_path, **variants)
+        # asyncio mode binds no socket until run(), the handlers are called directly
+        return Server(use_asyncio=True, sensors_state=SharedState({'temperature': 0}))
+    return make
+
+@pytest.mark.parametrize('value, expected', [
+    (None, False),
+    ('gzip', True),
+    ('gzip, deflate, br', True),
+    ('deflate, GZIP;q=0.5', True),
+    ('*', True),
+    ('identity', False),
+    ('gzip;q=0, *', False),
+    ('br, *;q=0', False),
+])
+def test_accepts_gzip(value, expected):
+    assert accepts_gzip(value) == expected
+
+def test_both_variants_indexed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    deploy(tmp_path)
+    asset = StaticAssets(('index.html',)).get('/index.html')
+    assert asset.gzipped
+    assert asset.plain.size == len(PAGE)
+    assert asset.plain.etag != asset.etag
+
+def test_gzip_to_clients_accepting_it(server):
+    status, fields, body = get(server(), 'Accept-Encoding: gzip, deflate\r\n')
+    assert status == 200
+    assert fields['content-encoding'] == 'gzip'
+    assert fields['vary'] == 'accept-encoding'
+    assert gzip.decompress(body) == PAGE
+
+def test_plain_to_other_clients(server):
+    status, fields, body = get(server(), 'Accept-Encoding: identity\r\n')
+    assert status == 200
+    assert 'content-encoding' not in fields
+    assert fields['vary'] == 'accept-encoding'
+    assert body == PAGE
+
+def test_etag_of_the_sent_variant(server):
+    srv = server()
+    _, fields, _ = get(srv)
+    status, fields, body = get(srv, f'If-None-Match: {fields["etag"]}\r\n')
+    assert status == 304
+    assert fields['vary'] == 'accept-encoding'
+    # the plain file's ETag doesn't validate the gzip variant
+    status, _, _ = get(srv, f'If-None-Match: {fields["etag"]}\r\nAccept-Encoding: gzip\r\n')
+    assert status == 200
+
+def test_gzip_only_deploy(server):
+    srv = server(plain=False)
+    status, fields, body = get(srv, 'Accept-Encoding: identity\r\n')
+    assert status == 406
+    assert fields['vary'] == 'accept-encoding'
+    # without Accept-Encoding any coding is acceptable
+    status, fields, body = get(srv)
+    assert status == 200
+    assert gzip.decompress(body) == PAGE
+
+def test_plain_only_deploy(server):
+    status, fields, body = get(server(gzipped=False), 'Accept-Encoding: gzip\r\n')
+    assert status == 200
+    assert 'vary' not in fields
+    assert body == PAGE
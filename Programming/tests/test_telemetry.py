@@ -0,0 +1,39 @@
+'''
+/telemetry.bin records decoded with the served schema, as a collector without the firmware would
+'''
+import json
+import os
+import struct
+import sys
+from server2 import Server
+from shared_state import SharedState
+from telemetry import Telemetry
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+import telemetry_decode
+
+SENSORS = {'skinTemperature': 36.5, 'coverClosed': 1, 'humidity': 55.2, 'temperature': 37.1, 'motionSensor': 0, 'o2Level': 412}
+ACTUATORS = {'psuControl': 'on', 'blueLight': 'off', 'uvLight': 'off', 'buzzer': 'on', 'humidifier': 'off', 'autoManualSwitch': 'off'}
+
+def test_schema_matches_record():
+    schema = json.loads(Telemetry().schema_json)
+    assert struct.calcsize(schema['format']) == schema['size'] == Telemetry.RECORD_SIZE
+    assert len(schema['fields']) == len(struct.unpack(schema['format'], bytes(schema['size'])))
+
+def test_decode():
+    telemetry = Telemetry(0xdeadbeef)
+    schema = telemetry.schema()
+    record = bytes(telemetry.encode(7, SENSORS, ACTUATORS, 1000))
+    columns = telemetry_decode.values(telemetry_decode.decode(record, schema), schema)
+    assert columns['seq'][0] == 7
+    assert columns['boot'][0] == 0xdeadbeef
+    assert columns['timestamp'][0] == 1000
+    assert columns['skinTemperature'][0] == 36.5
+    assert bool(columns['psuControl'][0]) and bool(columns['buzzer'][0]) and not bool(columns['uvLight'][0])
+
+def test_boot_of_the_etag(board):
+    server = Server(use_asyncio=True, sensors_state=SharedState(SENSORS), actuators_state=SharedState(ACTUATORS))
+    schema = server.telemetry.schema()
+    record = bytes(server.telemetry.encode(0, SENSORS, ACTUATORS))
+    boot = telemetry_decode.values(telemetry_decode.decode(record, schema), schema)['boot'][0]
+    assert f'{int(boot):08x}' == server.boot_id
@@ -0,0 +1,34 @@
+'''
+Deploy-time step producing the <name>.gz variants served by static.StaticAssets
+Runs on the host, upload the .gz files next to (or instead of) the originals
+
+    python tools/compress_assets.py index.html
+'''
+import argparse
+import gzip
+import os
+
+def compress(path: str, level: int=9) -> str:
+    '''
+    writes path + '.gz' and returns its name
+    mtime is fixed so the output, and with it the ETag, only changes with the content
+    '''
+    out_path = path + '.gz'
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(out_path, 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=level, mtime=0))
+    return out_path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='+', help='web files to compress')
+    parser.add_argument('--level', type=int, default=9, help='gzip compression level')
+    args = parser.parse_args()
+
+    for path in args.files:
+        out_path = compress(path, args.level)
+        print(f"{path}: {os.path.getsize(path)} -> {os.path.getsize(out_path)} bytes")
+
+if __name__ == '__main__':
+    main()
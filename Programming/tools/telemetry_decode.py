@@ -0,0 +1,124 @@
+'''
+Host-side decoder of the /telemetry.bin records served by telemetry.Telemetry
+Decodes whole batches of concatenated records at once with NumPy, record by record with struct without it
+
+    python tools/telemetry_decode.py --schema schema.json records.bin
+    python tools/telemetry_decode.py --collect 60 --period 1 --url http://192.168.4.1 records.bin
+
+    import telemetry_decode
+    schema = telemetry_decode.fetch_schema('http://192.168.4.1')
+    records = telemetry_decode.decode(data, schema)
+    values = telemetry_decode.values(records, schema)
+'''
+import argparse
+import json
+import struct
+import time
+import urllib.request
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# struct codes of the schema to NumPy dtypes, the records are little endian
+DTYPES = {'B': '<u1', 'b': '<i1', 'H': '<u2', 'h': '<i2', 'I': '<u4', 'i': '<i4', '4s': 'S4'}
+
+def fetch_schema(url: str) -> dict:
+    with urllib.request.urlopen(url.rstrip('/') + '/telemetry/schema') as response:
+        return json.loads(response.read())
+
+def fetch_record(url: str) -> bytes:
+    with urllib.request.urlopen(url.rstrip('/') + '/telemetry.bin') as response:
+        return response.read()
+
+def dtype(schema: dict):
+    '''
+    packed structured dtype of one record
+    '''
+    return np.dtype([(field['name'], DTYPES[field['type']]) for field in schema['fields']])
+
+def decode(data: bytes, schema: dict):
+    '''
+    decodes concatenated records, returns a structured array with NumPy, a list of dicts without it
+    raises ValueError on a partial record or a record of another format
+    '''
+    size = schema['size']
+    if len(data) % size:
+        raise ValueError(f'{len(data)} bytes is not a whole number of {size} byte records')
+
+    if np is None:
+        names = [field['name'] for field in schema['fields']]
+        records = [dict(zip(names, record)) for record in struct.iter_unpack(schema['format'], data)]
+        for record in records:
+            if record['magic'] != schema['magic'].encode() or record['version'] != schema['version']:
+                raise ValueError('record of another format')
+        return records
+
+    records = np.frombuffer(data, dtype=dtype(schema))
+    if not (np.all(records['magic'] == schema['magic'].encode()) and np.all(records['version'] == schema['version'])):
+        raise ValueError('record of another format')
+    return records
+
+def values(records, schema: dict) -> dict:
+    '''
+    {name: column} of seq, boot, timestamp, the sensors divided by their scale and every actuator bit
+    seq restarts at 0 whenever boot changes
+    columns are arrays with NumPy, lists without it
+    '''
+    columns = {}
+    for field in schema['fields']:
+        name = field['name']
+        if name in ('seq', 'boot', 'timestamp'):
+            columns[name] = records[name] if np is not None else [record[name] for record in records]
+        elif 'scale' in field:
+            if np is not None:
+                columns[name] = records[name] / field['scale']
+            else:
+                columns[name] = [record[name] / field['scale'] for record in records]
+        elif 'bits' in field:
+            for bit, bit_name in enumerate(field['bits']):
+                if np is not None:
+                    columns[bit_name] = (records[name] >> bit) & 1 == 1
+                else:
+                    columns[bit_name] = [bool(record[name] >> bit & 1) for record in records]
+    return columns
+
+def collect(url: str, path: str, count: int, period: float):
+    '''
+    appends count records polled every period seconds to path
+    '''
+    with open(path, 'ab') as f:
+        for _ in range(count):
+            f.write(fetch_record(url))
+            f.flush()
+            time.sleep(period)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('records', help='file of concatenated records')
+    parser.add_argument('--url', default='http://192.168.4.1', help='address of the incubator')
+    parser.add_argument('--schema', help='schema file, fetched from --url if not given')
+    parser.add_argument('--collect', type=int, default=0, metavar='N', help='first append N records polled from --url')
+    parser.add_argument('--period', type=float, default=1.0, help='seconds between collected records')
+    args = parser.parse_args()
+
+    if args.collect:
+        collect(args.url, args.records, args.collect, args.period)
+
+    if args.schema:
+        with open(args.schema) as f:
+            schema = json.load(f)
+    else:
+        schema = fetch_schema(args.url)
+
+    with open(args.records, 'rb') as f:
+        records = decode(f.read(), schema)
+    columns = values(records, schema)
+    print(f'{len(records)} records')
+    for name, column in columns.items():
+        if len(column):
+            print(f'{name:18} first {column[0]} last {column[-1]}')
+
+if __name__ == '__main__':
+    main()